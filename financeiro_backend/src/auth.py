@@ -0,0 +1,17 @@
+from flask import jsonify, session
+from functools import wraps
+
+
+def login_required(view):
+    """Decorator para verificar autenticação (a sessão fica no servidor, sem consulta ao banco)"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Não autenticado'}), 401
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def current_user():
+    """Registro do usuário autenticado guardado na sessão durante o login"""
+    return session.get('user')
@@ -0,0 +1,280 @@
+import click
+import time
+from datetime import datetime
+
+
+def register_commands(app):
+    """Registra os comandos de manutenção no CLI do Flask (flask --app app <comando>)"""
+
+    @app.cli.command('materialize-recurring')
+    @click.option('--date', 'until', default=None, help='Data de referência (YYYY-MM-DD), padrão hoje')
+    @click.option('--batch-size', default=200, show_default=True, help='Regras processadas por commit')
+    def materialize_recurring_command(until, batch_size):
+        """Grava as ocorrências vencidas dos lançamentos recorrentes"""
+        from src.services.recurring import materialize_all
+
+        today = datetime.strptime(until, '%Y-%m-%d').date() if until else None
+        result = materialize_all(today=today, batch_size=batch_size)
+        click.echo(
+            f"{result['rules_processed']} regras processadas, "
+            f"{result['transactions_created']} transações criadas"
+        )
+
+    @app.cli.command('reconcile-balances')
+    @click.option('--repair', is_flag=True, help='Corrige os saldos divergentes')
+    @click.option('--chunk-size', default=500, show_default=True, help='Usuários por consulta agrupada')
+    @click.option('--workers', default=4, show_default=True, help='Lotes processados em paralelo')
+    def reconcile_balances_command(repair, chunk_size, workers):
+        """Confere os saldos de contas e cartões contra os lançamentos"""
+        from src.services.reconciliation import reconcile_all
+
+        started = time.perf_counter()
+        result = reconcile_all(repair=repair, chunk_size=chunk_size, workers=workers)
+        elapsed = time.perf_counter() - started
+
+        for item in result['discrepancies']:
+            click.echo(
+                f"{item['kind']} #{item['id']} (usuário {item['user_id']}, {item['name']}): "
+                f"armazenado {item['stored']:.2f}, esperado {item['expected']:.2f}"
+            )
+        click.echo(
+            f"{result['users_checked']} usuários, {result['accounts_checked']} contas, "
+            f"{result['credit_cards_checked']} cartões verificados em {elapsed:.2f}s; "
+            f"{len(result['discrepancies'])} divergências, {result['repaired']} corrigidas"
+        )
+
+    @app.cli.command('convert-installments')
+    @click.option('--batch-size', default=500, show_default=True, help='Parcelamentos convertidos por commit')
+    def convert_installments_command(batch_size):
+        """Converte parcelamentos antigos (linhas filhas) em InstallmentPlan"""
+        from src.services.installments import convert_legacy_installments
+
+        result = convert_legacy_installments(batch_size=batch_size)
+        click.echo(
+            f"{result['plans_created']} parcelamentos convertidos, "
+            f"{result['rows_removed']} linhas filhas removidas"
+        )
+
+    @app.cli.command('benchmark-login')
+    @click.option('--requests', 'total', default=50, show_default=True, help='Verificações de senha executadas')
+    @click.option('--threads', default=1, show_default=True, help='Verificações simultâneas')
+    @click.option('--method', type=click.Choice(['scrypt', 'pbkdf2_sha256']), default=None, help='Método (padrão: configuração atual)')
+    @click.option('--scrypt-n', type=int, default=None, help='Custo de CPU/memória do scrypt (potência de 2)')
+    @click.option('--iterations', type=int, default=None, help='Iterações do PBKDF2')
+    @click.option('--target-qps', type=float, default=None, help='Logins por segundo que o servidor precisa sustentar')
+    def benchmark_login_command(total, threads, method, scrypt_n, iterations, target_qps):
+        """Mede a vazão do login no custo de hash escolhido"""
+        from src.services.passwords import benchmark_verify
+
+        overrides = {}
+        if method:
+            overrides['PASSWORD_HASH_METHOD'] = method
+        if scrypt_n:
+            overrides['PASSWORD_SCRYPT_N'] = scrypt_n
+        if iterations:
+            overrides['PASSWORD_PBKDF2_ITERATIONS'] = iterations
+
+        result = benchmark_verify(overrides, requests=total, threads=threads)
+        params = ','.join(str(value) for value in result['params'])
+        click.echo(
+            f"{result['method']} ({params}): {result['per_second']:.1f} logins/s com {threads} thread(s), "
+            f"p50 {result['p50_ms']:.1f}ms, p95 {result['p95_ms']:.1f}ms"
+        )
+        if 'memory_per_login_mb' in result:
+            click.echo(f"Memória por login simultâneo: {result['memory_per_login_mb']:.1f} MB")
+        if target_qps:
+            status = 'atende' if result['per_second'] >= target_qps else 'NÃO atende'
+            click.echo(f"Meta de {target_qps:.1f} logins/s: {status}")
+
+    @app.cli.command('benchmark-reads')
+    @click.option('--username', default='admin', show_default=True, help='Usuário usado nas consultas')
+    @click.option('--rows', default=5000, show_default=True, help='Cartões, transações e regras gerados (desfeitos ao final)')
+    @click.option('--repeat', default=5, show_default=True, help='Execuções cronometradas por caso')
+    def benchmark_reads_command(username, rows, repeat):
+        """Compara entidades ORM e as linhas da camada de leitura (tempo e memória por consulta)"""
+        from src.models.user import User
+        from src.services.read_models import benchmark_read_rows
+
+        user = User.query.filter_by(username=username).first()
+        if not user:
+            raise click.ClickException(f'Usuário {username} não encontrado')
+        try:
+            result = benchmark_read_rows(user.id, rows=rows, repeat=repeat)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        click.echo(f"{result['rows']} linhas, média de {result['repeat']} execuções")
+        for item in result['results']:
+            click.echo(
+                f"{item['case']}: ORM {item['orm_ms']:.1f}ms / {item['orm_kb']:.0f} KB, "
+                f"linhas {item['rows_ms']:.1f}ms / {item['rows_kb']:.0f} KB "
+                f"({item['orm_ms'] / item['rows_ms']:.1f}x mais rápido, {item['orm_kb'] / item['rows_kb']:.1f}x menos memória)"
+            )
+
+    @app.cli.command('compress-static')
+    @click.option('--min-size', default=1024, show_default=True, help='Tamanho mínimo (bytes) para comprimir')
+    def compress_static_command(min_size):
+        """Gera os arquivos .gz/.br servidos pelo manifesto de estáticos"""
+        from src.services.static_files import compress_static, brotli
+
+        created = compress_static(app.static_folder, min_size=min_size)
+        click.echo(f"{created} arquivos comprimidos gerados")
+        if brotli is None:
+            click.echo("Pacote brotli não instalado: apenas .gz foi gerado")
+
+    @app.cli.command('split-shards')
+    @click.option('--purge', is_flag=True, help='Remove do banco principal as linhas copiadas')
+    @click.option('--batch-size', default=1000, show_default=True, help='Linhas inseridas por lote')
+    def split_shards_command(purge, batch_size):
+        """Copia os dados de cada usuário do banco principal para o seu shard (SHARDING_MODE)"""
+        from src.services.sharding import split_database
+
+        try:
+            result = split_database(purge=purge, batch_size=batch_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for table, count in result['rows_copied'].items():
+            click.echo(f"{table}: {count} linhas copiadas")
+        click.echo(
+            f"{result['users']} usuários distribuídos em {result['shards']} shards"
+            + (", banco principal limpo" if result['purged'] else "")
+        )
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Remove as Idempotency-Keys expiradas (rodar periodicamente, ex.: cron a cada hora)"""
+        from src.services.idempotency import purge_expired_keys
+        from src.services.sharding import for_each_shard
+
+        removed = sum(for_each_shard(purge_expired_keys))
+        click.echo(f"{removed} chaves de idempotência expiradas removidas")
+
+    @app.cli.command('purge-sessions')
+    def purge_sessions_command():
+        """Remove as sessões de login expiradas (rodar periodicamente, ex.: cron diário)"""
+        from src.services.sessions import purge_expired_sessions
+
+        removed = purge_expired_sessions()
+        click.echo(f"{removed} sessões expiradas removidas")
+
+    @app.cli.command('purge-sync-tombstones')
+    @click.option('--days', default=None, type=int, help='Idade mínima das lápides removidas (padrão: SYNC_TOMBSTONE_DAYS)')
+    def purge_sync_tombstones_command(days):
+        """Remove as lápides antigas do log de sincronização (rodar periodicamente, ex.: cron diário)"""
+        from src.services.sync import purge_tombstones
+        from src.services.sharding import for_each_shard
+
+        removed = sum(for_each_shard(purge_tombstones, days))
+        click.echo(f"{removed} lápides removidas do log de sincronização")
+
+    @app.cli.command('archive-transactions')
+    @click.option('--months', default=None, type=int, help='Meses fechados mantidos na tabela quente (padrão: ARCHIVE_AFTER_MONTHS)')
+    @click.option('--before', default=None, help='Data de corte (YYYY-MM-DD); tem precedência sobre --months')
+    @click.option('--batch-size', default=500, show_default=True, help='Transações arquivadas por commit')
+    def archive_transactions_command(months, before, batch_size):
+        """Move os lançamentos de períodos fechados para transaction_archive (rodar periodicamente, ex.: cron mensal)"""
+        from src.services.archive import archive_transactions, default_archive_cutoff
+
+        if before:
+            cutoff = datetime.strptime(before, '%Y-%m-%d').date()
+        else:
+            cutoff = default_archive_cutoff(months=months) if months is not None else None
+
+        started = time.perf_counter()
+        result = archive_transactions(before=cutoff, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        click.echo(
+            f"{result['transactions_archived']} transações arquivadas antes de {result['before']} "
+            f"({result['rows_written']} lançamentos) em {elapsed:.2f}s"
+        )
+
+    @app.cli.command('backup-database')
+    @click.option('--pages', default=None, type=int, help='Páginas copiadas por passo (padrão: BACKUP_PAGES_PER_STEP)')
+    @click.option('--sleep', default=None, type=float, help='Pausa em segundos entre os passos (padrão: BACKUP_STEP_SLEEP)')
+    @click.option('--keep', default=None, type=int, help='Snapshots mantidos (padrão: BACKUP_RETENTION)')
+    def backup_database_command(pages, sleep, keep):
+        """Grava um snapshot dos bancos sem bloquear as escritas (rodar periodicamente, ex.: cron diário)"""
+        from src.services.backup import create_snapshot
+
+        result = create_snapshot(pages=pages, sleep=sleep, keep=keep)
+        for item in result['files']:
+            click.echo(
+                f"{item['file']}: {item['pages']} páginas ({item['bytes'] / 1024 / 1024:.2f} MB) "
+                f"em {item['steps']} passos, {item['seconds']:.2f}s"
+                + (f" ({item['restarts']} reinícios, concluído em passo único)" if item['single_step'] else '')
+            )
+        click.echo(
+            f"Snapshot {result['snapshot']}: {result['bytes'] / 1024 / 1024:.2f} MB em "
+            f"{result['seconds']:.2f}s ({result['throughput_mb_s']:.2f} MB/s)"
+        )
+        if result['removed']:
+            click.echo(f"Snapshots removidos pela retenção: {', '.join(result['removed'])}")
+
+    @app.cli.command('list-backups')
+    def list_backups_command():
+        """Lista os snapshots disponíveis, do mais recente ao mais antigo"""
+        from src.services.backup import list_snapshots
+
+        for item in list_snapshots():
+            click.echo(f"{item['snapshot']}  {item['bytes'] / 1024 / 1024:.2f} MB")
+
+    @app.cli.command('restore-backup')
+    @click.argument('snapshot')
+    @click.option('--no-safety-snapshot', is_flag=True, help='Não grava um snapshot do estado atual antes')
+    @click.option('--yes', is_flag=True, help='Não pede confirmação')
+    def restore_backup_command(snapshot, no_safety_snapshot, yes):
+        """Restaura um snapshot sobre os bancos atuais (pare o servidor antes)"""
+        from src.services.backup import restore_snapshot
+
+        if not yes:
+            click.confirm(f'Substituir os bancos atuais pelo snapshot {snapshot}?', abort=True)
+        try:
+            result = restore_snapshot(snapshot, safety_snapshot=not no_safety_snapshot)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if result['safety_snapshot']:
+            click.echo(f"Estado anterior salvo em {result['safety_snapshot']}")
+        if result['displaced']:
+            click.echo(f"{len(result['displaced'])} shards fora do snapshot movidos para o diretório de backups (.displaced)")
+        click.echo(
+            f"Snapshot {result['snapshot']} restaurado: {len(result['files'])} arquivos, "
+            f"{result['bytes'] / 1024 / 1024:.2f} MB em {result['seconds']:.2f}s"
+        )
+
+    @app.cli.command('stress-test')
+    @click.option('--users', default=20, show_default=True, help='Usuários simulados (uma thread cliente cada)')
+    @click.option('--duration', default=30.0, show_default=True, help='Duração da carga em segundos')
+    @click.option('--mix', default=None, help='Pesos das operações, ex.: create=30,dashboard=20 (padrão: DEFAULT_MIX)')
+    @click.option('--workers', default=1, show_default=True, help='Processos servidores sobre o mesmo banco')
+    @click.option('--port', default=5900, show_default=True, help='Porta do primeiro processo servidor')
+    @click.option('--think-time', default=0.0, show_default=True, help='Pausa média (s) entre operações de um usuário')
+    @click.option('--seed', type=int, default=None, help='Semente para repetir a mesma sequência de operações')
+    @click.option('--database-dir', default=None, help='Diretório do banco de teste, mantido ao final (padrão: temporário)')
+    def stress_test_command(users, duration, mix, workers, port, think_time, seed, database_dir):
+        """Carga mista concorrente (logins, criações, exclusões, dashboard e relatórios) contra um banco descartável"""
+        from src.services.stress import run_stress, parse_mix
+
+        try:
+            mix = parse_mix(mix)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        result = run_stress(
+            users=users, duration=duration, mix=mix, workers=workers, port=port,
+            seed=seed, database_dir=database_dir, think_time=think_time
+        )
+
+        click.echo(f"{'operação':<22}{'req':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'máx':>9}{'5xx':>6}")
+        rows = list(result['operations'].items()) + [('total', result['total'])]
+        for name, item in rows:
+            click.echo(
+                f"{name:<22}{item['requests']:>7}{item['per_second']:>9.1f}{item['p50_ms']:>9.1f}"
+                f"{item['p95_ms']:>9.1f}{item['p99_ms']:>9.1f}{item['max_ms']:>9.1f}{item['server_errors']:>6}"
+            )
+        total = result['total']
+        click.echo(
+            f"{users} usuários, {workers} processo(s), {result['elapsed']:.1f}s: "
+            f"{total['lock_errors']} erros de lock ({total['lock_error_rate']:.2%} das requisições), "
+            f"{total['error_rate']:.2%} de respostas com erro"
+        )
+        if result['database_dir']:
+            click.echo(f"Banco de teste mantido em {result['database_dir']}")
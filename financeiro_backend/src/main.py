@@ -3,23 +3,43 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, send_from_directory, request
 from flask_cors import CORS
 from src.models.user import db
 from src.models.account import Account
 from src.models.credit_card import CreditCard
 from src.models.category import Category
-from src.models.transaction import Transaction
 from src.routes.user import user_bp
 from src.routes.accounts import accounts_bp
 from src.routes.credit_cards import credit_cards_bp
 from src.routes.categories import categories_bp
 from src.routes.transactions import transactions_bp
 from src.routes.dashboard import dashboard_bp
+from src.routes.recurring import recurring_bp
+from src.routes.jobs import jobs_bp
+from src.routes.reconciliation import reconciliation_bp
+from src.routes.events import events_bp
+from src.routes.budgets import budgets_bp
+from src.routes.sync import sync_bp
+from src.services.jobs import job_runner
+from src.services.sessions import session_store
+from src.services.admission import admission_controller
+from src.services.passwords import hash_password
+from src.services.static_files import StaticManifest
+from src.services.sharding import shard_router, use_user_shard, for_each_shard
+import src.services.tasks  # Registra os tipos de job
+from src.commands import register_commands
+from src.migrations import run_migrations
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
+# Sessões guardadas no servidor (o cookie carrega apenas o identificador)
+session_store.init_app(app)
+
+# Controle de admissão das rotas caras (custo por rota, limites por usuário e fila)
+admission_controller.init_app(app)
+
 # Configurar CORS para permitir comunicação com frontend
 CORS(app)
 
@@ -30,50 +50,89 @@ app.register_blueprint(credit_cards_bp, url_prefix='/api')
 app.register_blueprint(categories_bp, url_prefix='/api')
 app.register_blueprint(transactions_bp, url_prefix='/api')
 app.register_blueprint(dashboard_bp, url_prefix='/api')
+app.register_blueprint(recurring_bp, url_prefix='/api')
+app.register_blueprint(jobs_bp, url_prefix='/api')
+app.register_blueprint(reconciliation_bp, url_prefix='/api')
+app.register_blueprint(events_bp, url_prefix='/api')
+app.register_blueprint(budgets_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+
+# Comandos de manutenção (flask --app app <comando>)
+register_commands(app)
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Configuração do banco de dados (DATABASE_DIR troca o diretório dos arquivos, ex.: no stress-test)
+database_dir = os.environ.get('DATABASE_DIR') or os.path.join(os.path.dirname(__file__), 'database')
+app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(database_dir, 'app.db')}"
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# Sharding opcional: SHARDING_MODE=user (um arquivo por usuário) ou hash (SHARD_COUNT arquivos)
+app.config['SHARDING_MODE'] = os.environ.get('SHARDING_MODE') or None
+app.config['SHARD_COUNT'] = int(os.environ.get('SHARD_COUNT', 8))
+app.config['SHARD_DIR'] = os.path.join(database_dir, 'shards')
+app.config['MAX_SHARD_ENGINES'] = int(os.environ.get('MAX_SHARD_ENGINES', 64))
+shard_router.init_app(app, db)
+
+# Snapshots online dos bancos (flask backup-database / restore-backup)
+app.config['BACKUP_DIR'] = os.environ.get('BACKUP_DIR') or os.path.join(database_dir, 'backups')
+app.config['BACKUP_RETENTION'] = int(os.environ.get('BACKUP_RETENTION', 14))
+
+# Lápides do log de sincronização (GET /api/sync) mantidas por este número de dias
+app.config['SYNC_TOMBSTONE_DAYS'] = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 90))
+
+# Fila de jobs em segundo plano
+job_runner.init_app(app)
+
 # Criar tabelas e dados iniciais
 with app.app_context():
     db.create_all()
+    run_migrations()
+    if shard_router.enabled:
+        for_each_shard(run_migrations)
+    job_runner.recover_interrupted()
     
     # Verificar se já existe o usuário admin
     from src.models.user import User
     admin_user = User.query.filter_by(username='admin').first()
     if not admin_user:
         # Criar usuário admin
-        admin_user = User(username='admin', password='142066')
+        admin_user = User(username='admin', password=hash_password('142066'))
         db.session.add(admin_user)
         db.session.commit()
         
-        # Criar categorias padrão de receita
-        income_categories = [
-            'Salário', 'Adiantamento', 'PPR', '13º Salário', 'Restituição de IR', 'Outros'
-        ]
-        for cat_name in income_categories:
-            category = Category(user_id=admin_user.id, name=cat_name, type='income', is_default=True)
-            db.session.add(category)
+        # Dados padrão do admin (no shard do usuário quando há sharding)
+        admin_id = admin_user.id
+        with use_user_shard(admin_id):
+            # Criar categorias padrão de receita
+            income_categories = [
+                'Salário', 'Adiantamento', 'PPR', '13º Salário', 'Restituição de IR', 'Outros'
+            ]
+            for cat_name in income_categories:
+                category = Category(user_id=admin_id, name=cat_name, type='income', is_default=True)
+                db.session.add(category)
         
-        # Criar categorias padrão de despesa
-        expense_categories = ['Alimentação', 'Combustível']
-        for cat_name in expense_categories:
-            category = Category(user_id=admin_user.id, name=cat_name, type='expense', is_default=True)
-            db.session.add(category)
+            # Criar categorias padrão de despesa
+            expense_categories = ['Alimentação', 'Combustível']
+            for cat_name in expense_categories:
+                category = Category(user_id=admin_id, name=cat_name, type='expense', is_default=True)
+                db.session.add(category)
         
-        # Criar conta bancária padrão
-        account = Account(user_id=admin_user.id, name='Conta Corrente', balance=0.00)
-        db.session.add(account)
+            # Criar conta bancária padrão
+            account = Account(user_id=admin_id, name='Conta Corrente', balance=0)
+            db.session.add(account)
         
-        # Criar cartões de crédito padrão
-        nubank = CreditCard(user_id=admin_user.id, name='Nubank', closing_day=15)
-        itau = CreditCard(user_id=admin_user.id, name='Itaú', closing_day=10)
-        db.session.add(nubank)
-        db.session.add(itau)
+            # Criar cartões de crédito padrão
+            nubank = CreditCard(user_id=admin_id, name='Nubank', closing_day=15)
+            itau = CreditCard(user_id=admin_id, name='Itaú', closing_day=10)
+            db.session.add(nubank)
+            db.session.add(itau)
         
-        db.session.commit()
+            db.session.commit()
+
+# Manifesto dos arquivos estáticos montado uma vez (desligue com STATIC_MANIFEST=False
+# para servir direto do disco durante o desenvolvimento do frontend)
+app.config.setdefault('STATIC_MANIFEST', os.environ.get('STATIC_MANIFEST', '1') != '0')
+static_manifest = StaticManifest(app.static_folder) if app.config['STATIC_MANIFEST'] else None
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -82,6 +141,12 @@ def serve(path):
     if static_folder_path is None:
             return "Static folder not configured", 404
 
+    if static_manifest is not None:
+        response = static_manifest.response(path, request.accept_encodings)
+        if response is None:
+            return "index.html not found", 404
+        return response
+
     if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
         return send_from_directory(static_folder_path, path)
     else:
@@ -91,6 +156,5 @@ def serve(path):
         else:
             return "index.html not found", 404
 
-
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,216 @@
+from src.models.user import db
+from sqlalchemy import text
+from datetime import date
+
+# Migrações leves para bancos já existentes (db.create_all não altera tabelas).
+# Cada migração é idempotente e roda na inicialização, depois do create_all.
+MIGRATIONS = []
+
+
+def migration(func):
+    MIGRATIONS.append(func)
+    return func
+
+
+def column_exists(table, column):
+    rows = db.session.execute(text(f'PRAGMA table_info("{table}")')).fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def add_column(table, column, definition):
+    """Adiciona a coluna se ela ainda não existir. Retorna True quando criada"""
+    if column_exists(table, column):
+        return False
+    db.session.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}'))
+    return True
+
+
+@migration
+def add_opening_balances():
+    """Saldo de abertura de contas e cartões: o saldo atual é aceito como correto
+    e a diferença para os lançamentos existentes vira o saldo de abertura."""
+    if add_column('account', 'opening_balance', 'NUMERIC(10, 2) DEFAULT 0'):
+        db.session.execute(text('''
+            UPDATE account SET opening_balance = COALESCE(balance, 0) - COALESCE((
+                SELECT SUM(CASE WHEN c.type = 'income' THEN t.amount ELSE -t.amount END)
+                FROM "transaction" t JOIN category c ON c.id = t.category_id
+                WHERE t.account_id = account.id AND t.payment_type IN ('debit', 'pix')
+            ), 0)
+        '''))
+
+    if add_column('credit_card', 'opening_balance', 'NUMERIC(10, 2) DEFAULT 0'):
+        db.session.execute(text('''
+            UPDATE credit_card SET opening_balance = COALESCE(current_balance, 0) - COALESCE((
+                SELECT SUM(t.amount)
+                FROM "transaction" t JOIN category c ON c.id = t.category_id
+                WHERE t.credit_card_id = credit_card.id AND t.payment_type = 'credit_card'
+                  AND c.type = 'expense'
+            ), 0)
+        '''))
+
+
+@migration
+def add_transaction_type():
+    """Tipo desnormalizado nas transações (cópia de Category.type) e o índice
+    usado pelos agregados de receitas/despesas por período."""
+    if add_column('transaction', 'type', 'VARCHAR(20)'):
+        db.session.execute(text('''
+            UPDATE "transaction" SET type = (
+                SELECT c.type FROM category c WHERE c.id = "transaction".category_id
+            )
+        '''))
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_transaction_user_type_date '
+        'ON "transaction" (user_id, type, transaction_date)'
+    ))
+
+
+# Colunas monetárias convertidas de reais (NUMERIC) para centavos inteiros
+MONEY_COLUMNS = {
+    'account': ['balance', 'opening_balance'],
+    'credit_card': ['current_balance', 'opening_balance'],
+    'transaction': ['amount'],
+    'installment_plan': ['total_amount', 'installment_amount', 'last_installment_amount'],
+    'recurring_rule': ['amount'],
+    'budget': ['limit_amount'],
+    'budget_spend': ['spent']
+}
+MONEY_IN_CENTS_VERSION = 1
+
+
+def column_type(table, column):
+    rows = db.session.execute(text(f'PRAGMA table_info("{table}")')).fetchall()
+    return next((row[2].upper() for row in rows if row[1] == column), None)
+
+
+@migration
+def store_money_in_cents():
+    """Valores monetários em centavos inteiros (ver models.money.Money).
+
+    O SQLite não altera o tipo de uma coluna existente: as colunas NUMERIC de
+    bancos antigos passam a guardar inteiros (a afinidade NUMERIC mantém o
+    valor como INTEGER). PRAGMA user_version marca a conversão como feita;
+    colunas já criadas como INTEGER não são tocadas.
+    """
+    if db.session.execute(text('PRAGMA user_version')).scalar() >= MONEY_IN_CENTS_VERSION:
+        return
+    for table, columns in MONEY_COLUMNS.items():
+        legacy = [column for column in columns if column_type(table, column) not in (None, 'INTEGER')]
+        if legacy:
+            assignments = ', '.join(f'{column} = CAST(ROUND({column} * 100) AS INTEGER)' for column in legacy)
+            db.session.execute(text(f'UPDATE "{table}" SET {assignments}'))
+    db.session.execute(text(f'PRAGMA user_version = {MONEY_IN_CENTS_VERSION}'))
+
+
+def backfill_dedup_hashes(where='1 = 1'):
+    """Recalcula o hash de duplicidade das transações principais que atendem ao filtro.
+
+    O valor do hash é o total da compra, como em create_transaction: o total do
+    InstallmentPlan ou, nos parcelamentos antigos, a soma da principal com as
+    linhas filhas (transaction.amount da principal é só a primeira parcela).
+    """
+    from src.models.transaction import transaction_fingerprint
+
+    rows = db.session.execute(text(f'''
+        SELECT t.id, t.transaction_date, t.description, t.account_id, t.credit_card_id,
+               COALESCE(p.total_amount, t.amount + COALESCE((
+                   SELECT SUM(child.amount) FROM "transaction" child WHERE child.parent_transaction_id = t.id
+               ), 0)) AS total
+        FROM "transaction" t LEFT JOIN installment_plan p ON p.transaction_id = t.id
+        WHERE t.parent_transaction_id IS NULL AND ({where})
+    ''')).fetchall()
+    updates = [
+        {'id': row.id, 'dedup_hash': transaction_fingerprint(
+            date.fromisoformat(str(row.transaction_date)), int(row.total), row.description,
+            row.account_id, row.credit_card_id
+        )}
+        for row in rows
+    ]
+    for start in range(0, len(updates), 1000):
+        db.session.execute(
+            text('UPDATE "transaction" SET dedup_hash = :dedup_hash WHERE id = :id'),
+            updates[start:start + 1000]
+        )
+
+
+@migration
+def add_transaction_dedup_hash():
+    """Hash de duplicidade (data, valor, descrição e conta/cartão) das transações
+    existentes, calculado em Python em lotes (o SQLite não tem sha256)."""
+    if add_column('transaction', 'dedup_hash', 'VARCHAR(64)'):
+        backfill_dedup_hashes()
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_transaction_user_dedup_hash '
+        'ON "transaction" (user_id, dedup_hash)'
+    ))
+
+
+INSTALLMENT_DEDUP_VERSION = 2
+
+
+@migration
+def rehash_installment_purchases():
+    """Parcelamentos cujo hash foi calculado com o valor da parcela (backfill
+    antigo) passam a usar o total da compra. Marcado em PRAGMA user_version."""
+    if db.session.execute(text('PRAGMA user_version')).scalar() >= INSTALLMENT_DEDUP_VERSION:
+        return
+    backfill_dedup_hashes('t.installments > 1')
+    db.session.execute(text(f'PRAGMA user_version = {INSTALLMENT_DEDUP_VERSION}'))
+
+
+@migration
+def add_job_owner():
+    """Processo dono de cada job, para recuperar só os jobs de processos encerrados"""
+    # A tabela de jobs só existe no banco principal (não nos shards)
+    if column_exists('job', 'id'):
+        add_column('job', 'owner', 'VARCHAR(255)')
+
+
+@migration
+def add_installment_plan_range_columns():
+    """Dono e data da última parcela de cada plano, para ledger_rows filtrar os
+    planos por período sem ler as transações dos 24 meses anteriores"""
+    added = add_column('installment_plan', 'user_id', 'INTEGER REFERENCES user (id)')
+    added = add_column('installment_plan', 'last_installment_date', 'DATE') or added
+    if added:
+        # Mesmo cálculo de installment_date_sql: dia da compra limitado ao último dia do mês
+        db.session.execute(text('''
+            UPDATE installment_plan SET
+                user_id = (SELECT t.user_id FROM "transaction" t WHERE t.id = installment_plan.transaction_id),
+                last_installment_date = (
+                    SELECT min(
+                        date(date(t.transaction_date, 'start of month', printf('+%d months', installments - 1)),
+                             printf('+%d days', CAST(strftime('%d', t.transaction_date) AS INTEGER) - 1)),
+                        date(t.transaction_date, 'start of month', printf('+%d months', installments), '-1 day')
+                    )
+                    FROM "transaction" t WHERE t.id = installment_plan.transaction_id
+                )
+        '''))
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_installment_plan_user_last_date '
+        'ON installment_plan (user_id, last_installment_date)'
+    ))
+
+
+@migration
+def add_transaction_user_date_index():
+    """Índice (usuário, data) da paginação por cursor da listagem, sem filtro de tipo."""
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_transaction_user_date ON "transaction" (user_id, transaction_date)'
+    ))
+
+
+@migration
+def add_category_updated_at():
+    """Data da última alteração das categorias (versão do cache de categorias)."""
+    if add_column('category', 'updated_at', 'DATETIME'):
+        db.session.execute(text('UPDATE category SET updated_at = created_at'))
+    db.session.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_category_user_updated ON category (user_id, updated_at)'
+    ))
+
+
+def run_migrations():
+    for func in MIGRATIONS:
+        func()
+    db.session.commit()
@@ -1,11 +1,13 @@
 from src.models.user import db
+from src.models.money import Money, from_cents
 from datetime import datetime
 
 class Account(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    balance = db.Column(db.Numeric(10, 2), default=0.00)
+    balance = db.Column(Money, default=0)
+    opening_balance = db.Column(Money, default=0)  # Saldo antes dos lançamentos (base da conciliação)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -16,7 +18,7 @@ class Account(db.Model):
         return {
             'id': self.id,
             'name': self.name,
-            'balance': float(self.balance) if self.balance else 0.0,
+            'balance': from_cents(self.balance),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
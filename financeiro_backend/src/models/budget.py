@@ -0,0 +1,64 @@
+from src.models.user import db
+from src.models.money import Money, from_cents
+from datetime import datetime, date
+from dateutil.relativedelta import relativedelta
+
+BUDGET_PERIODS = ['monthly', 'yearly']
+
+class Budget(db.Model):
+    """Limite de gastos de uma categoria de despesa por período (mês ou ano).
+
+    O total gasto em cada período fica em BudgetSpend, atualizado a cada
+    escrita de transação, então a consulta de utilização não lê Transaction.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    period = db.Column(db.String(20), nullable=False, default='monthly')  # 'monthly' ou 'yearly'
+    limit_amount = db.Column(Money, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'category_id', 'period', name='uq_budget_user_category_period'),
+    )
+
+    # Relacionamentos (os orçamentos saem junto com a categoria)
+    category = db.relationship('Category', backref=db.backref('budgets', cascade='all, delete-orphan'))
+    spends = db.relationship('BudgetSpend', backref='budget', cascade='all, delete-orphan', passive_deletes=True)
+
+    def __repr__(self):
+        return f'<Budget {self.category_id} ({self.period}): {self.limit_amount}>'
+
+    def period_bounds(self, day):
+        """(início, fim) do período do orçamento que contém a data"""
+        if self.period == 'yearly':
+            start = date(day.year, 1, 1)
+            return start, start + relativedelta(years=1, days=-1)
+        start = date(day.year, day.month, 1)
+        return start, start + relativedelta(months=1, days=-1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'category_id': self.category_id,
+            'period': self.period,
+            'limit_amount': from_cents(self.limit_amount),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class BudgetSpend(db.Model):
+    """Contador do total gasto em um período de um orçamento"""
+    id = db.Column(db.Integer, primary_key=True)
+    budget_id = db.Column(db.Integer, db.ForeignKey('budget.id', ondelete='CASCADE'), nullable=False)
+    period_start = db.Column(db.Date, nullable=False)
+    spent = db.Column(Money, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('budget_id', 'period_start', name='uq_budget_spend_budget_period'),
+    )
+
+    def __repr__(self):
+        return f'<BudgetSpend {self.budget_id} {self.period_start}: {self.spent}>'
@@ -1,5 +1,6 @@
 from src.models.user import db
 from datetime import datetime
+from sqlalchemy import event, inspect
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -8,6 +9,12 @@ class Category(db.Model):
     type = db.Column(db.String(20), nullable=False)  # 'income' ou 'expense'
     is_default = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # (contagem, maior updated_at, maior id) das categorias do usuário: versão do CategoryCache
+    __table_args__ = (
+        db.Index('ix_category_user_updated', 'user_id', 'updated_at'),
+    )
 
     # Relacionamentos
     transactions = db.relationship('Transaction', backref='category', lazy=True)
@@ -24,3 +31,14 @@ class Category(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+
+@event.listens_for(Category, 'after_update')
+def sync_transaction_types(mapper, connection, target):
+    """Mantém Transaction.type (cópia desnormalizada) quando o tipo da categoria muda"""
+    if not inspect(target).attrs.type.history.has_changes():
+        return
+    transaction = db.metadata.tables['transaction']
+    connection.execute(
+        transaction.update().where(transaction.c.category_id == target.id).values(type=target.type)
+    )
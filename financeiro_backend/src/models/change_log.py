@@ -0,0 +1,45 @@
+from src.models.user import db
+from datetime import datetime
+
+SYNC_ENTITIES = ['account', 'credit_card', 'category', 'transaction']
+
+class SyncVersion(db.Model):
+    """Versão de alterações do usuário: cresce a cada escrita registrada no ChangeLog.
+
+    tombstone_floor é a maior versão de exclusão já removida do log; um
+    cliente com versão anterior a ela precisa de uma sincronização completa.
+    """
+    __tablename__ = 'sync_version'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    tombstone_floor = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SyncVersion {self.user_id}: {self.version}>'
+
+
+class ChangeLog(db.Model):
+    """Última alteração de cada registro do usuário (uma linha por registro).
+
+    Cada escrita regrava a linha com a nova versão; deleted=True é a lápide
+    de um registro excluído. GET /api/sync?since=v lê as linhas com versão > v.
+    Para transações entity_id é o id da transação original (todas as parcelas).
+    """
+    __tablename__ = 'change_log'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # Ver SYNC_ENTITIES
+    entity_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'entity', 'entity_id', name='uq_change_log_user_entity'),
+        db.Index('ix_change_log_user_version', 'user_id', 'version'),
+    )
+
+    def __repr__(self):
+        return f'<ChangeLog {self.entity} {self.entity_id} v{self.version}>'
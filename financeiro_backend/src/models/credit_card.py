@@ -1,4 +1,5 @@
 from src.models.user import db
+from src.models.money import Money, from_cents
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 
@@ -7,7 +8,8 @@ class CreditCard(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     closing_day = db.Column(db.Integer, nullable=False)  # Dia do fechamento (1-31)
-    current_balance = db.Column(db.Numeric(10, 2), default=0.00)
+    current_balance = db.Column(Money, default=0)
+    opening_balance = db.Column(Money, default=0)  # Saldo antes dos lançamentos (base da conciliação)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -39,6 +41,13 @@ class CreditCard(db.Model):
             
         return next_closing
 
+    def get_closing_date(self, year, month):
+        """Data de fechamento da fatura de um mês (último dia quando o dia não existe)"""
+        try:
+            return date(year, month, self.closing_day)
+        except ValueError:
+            return date(year, month, 1) + relativedelta(months=1, days=-1)
+
     def get_billing_month_for_date(self, transaction_date):
         """Determina em qual mês da fatura uma transação será incluída"""
         if isinstance(transaction_date, str):
@@ -65,7 +74,7 @@ class CreditCard(db.Model):
             'id': self.id,
             'name': self.name,
             'closing_day': self.closing_day,
-            'current_balance': float(self.current_balance) if self.current_balance else 0.0,
+            'current_balance': from_cents(self.current_balance),
             'next_closing': self.get_next_closing_date().isoformat(),
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
@@ -0,0 +1,29 @@
+from src.models.user import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """Resultado de uma requisição de escrita identificada pelo header Idempotency-Key.
+
+    Reenvios com a mesma chave recebem a resposta gravada sem executar a
+    escrita de novo. As linhas expiram em expires_at e são removidas pela
+    limpeza periódica (flask purge-idempotency-keys).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(255), nullable=False)
+    request_hash = db.Column(db.String(64), nullable=False)  # Método, caminho e corpo da requisição original
+    status_code = db.Column(db.Integer, nullable=True)  # Nulo enquanto a requisição está em processamento
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='uq_idempotency_key_user_key'),
+    )
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key} ({self.status_code})>'
+
+    @property
+    def completed(self):
+        return self.status_code is not None
@@ -0,0 +1,49 @@
+from src.models.user import db
+from src.models.money import Money
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+
+MAX_INSTALLMENTS = 24
+
+class InstallmentPlan(db.Model):
+    """Parcelamento de uma transação: as parcelas são geradas virtualmente a
+    partir da transação principal em vez de gravadas como linhas filhas."""
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # Cópia de Transaction.user_id
+    installments = db.Column(db.Integer, nullable=False)
+    total_amount = db.Column(Money, nullable=False)
+    installment_amount = db.Column(Money, nullable=False)  # Parcelas 1..N-1
+    last_installment_amount = db.Column(Money, nullable=False)  # Absorve a diferença de arredondamento
+    last_installment_date = db.Column(db.Date, nullable=True)  # Data da parcela N: filtra os planos por período
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_installment_plan_user_last_date', 'user_id', 'last_installment_date'),
+    )
+
+    # Relacionamentos
+    transaction = db.relationship('Transaction', backref=db.backref('installment_plan', uselist=False))
+
+    def __repr__(self):
+        return f'<InstallmentPlan {self.transaction_id} ({self.installments}x)>'
+
+    @staticmethod
+    def split_amount(total_amount, installments):
+        """Divide o total (centavos) em parcelas exatas: (valor das N-1 primeiras, valor da última)"""
+        installment_amount = total_amount // installments
+        return installment_amount, total_amount - installment_amount * (installments - 1)
+
+    @staticmethod
+    def last_date_for(transaction_date, installments):
+        """Data da última parcela (mesmo dia, limitado ao último dia do mês)"""
+        return transaction_date + relativedelta(months=installments - 1)
+
+    def amount_for(self, number):
+        return self.last_installment_amount if number == self.installments else self.installment_amount
+
+    def iter_installments(self):
+        """Gera (número, data, valor) de cada parcela sem consultar o banco"""
+        start = self.transaction.transaction_date
+        for number in range(1, self.installments + 1):
+            yield number, start + relativedelta(months=number - 1), self.amount_for(number)
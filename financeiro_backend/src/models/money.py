@@ -0,0 +1,33 @@
+from sqlalchemy.types import TypeDecorator, Integer
+from decimal import Decimal, ROUND_HALF_UP
+
+class Money(TypeDecorator):
+    """Valor monetário guardado como inteiro em centavos.
+
+    No Python o valor também é um int em centavos: somas (inclusive SUM no
+    banco) e divisões de parcelas são exatas. A conversão para reais só
+    acontece na entrada (to_cents) e na serialização (from_cents).
+    """
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, int):
+            raise TypeError(f'Valor monetário deve estar em centavos (int), recebido {value!r}')
+        return value
+
+    def process_result_value(self, value, dialect):
+        # Colunas NUMERIC de bancos antigos podem devolver float com valor inteiro
+        return int(value) if value is not None else None
+
+
+def to_cents(value):
+    """Converte reais (número ou texto, ex.: '12.34') em centavos, arredondando meio para cima"""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    """Centavos em reais para a API (JSON)"""
+    return cents / 100 if cents else 0.0
@@ -0,0 +1,95 @@
+from src.models.user import db
+from src.models.money import Money, from_cents
+from datetime import datetime, date, timedelta
+from dateutil.relativedelta import relativedelta
+
+class RecurringRule(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=True)  # Para débito/PIX
+    credit_card_id = db.Column(db.Integer, db.ForeignKey('credit_card.id'), nullable=True)  # Para cartão
+    description = db.Column(db.String(255), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    payment_type = db.Column(db.String(20), nullable=False)  # 'debit', 'pix', 'credit_card'
+    frequency = db.Column(db.String(20), nullable=False)  # 'monthly' ou 'weekly'
+    interval = db.Column(db.Integer, default=1)  # A cada N meses/semanas
+    day_of_month = db.Column(db.Integer, nullable=True)  # Apenas mensal (1-31)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)
+    next_due_date = db.Column(db.Date, nullable=True, index=True)  # Próxima ocorrência ainda não materializada
+    active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relacionamentos
+    category = db.relationship('Category')
+    account = db.relationship('Account')
+    credit_card = db.relationship('CreditCard')
+
+    def __repr__(self):
+        return f'<RecurringRule {self.description} ({self.frequency})>'
+
+    def _monthly_date(self, year, month):
+        """Data da ocorrência no mês, usando o último dia quando o dia não existe"""
+        day = self.day_of_month or self.start_date.day
+        last_day = (date(year, month, 1) + relativedelta(months=1, days=-1)).day
+        return date(year, month, min(day, last_day))
+
+    def iter_occurrences(self, from_date=None, until=None):
+        """Gera as ocorrências da regra sob demanda, sem gravar nada no banco"""
+        step = self.interval or 1
+        from_date = max(from_date or self.start_date, self.start_date)
+        limit = min(until, self.end_date) if until and self.end_date else (until or self.end_date)
+        if limit is None:
+            raise ValueError('É necessário informar uma data limite para regras sem data final')
+
+        if self.frequency == 'weekly':
+            # Avança direto para a primeira semana >= from_date
+            skipped = max(0, (from_date - self.start_date).days) // (7 * step)
+            current = self.start_date + timedelta(weeks=skipped * step)
+            while current <= limit:
+                if current >= from_date:
+                    yield current
+                current += timedelta(weeks=step)
+        else:
+            months_since = (from_date.year - self.start_date.year) * 12 + (from_date.month - self.start_date.month)
+            index = max(0, months_since // step)
+            while True:
+                month = self.start_date + relativedelta(months=index * step)
+                current = self._monthly_date(month.year, month.month)
+                if current > limit:
+                    break
+                if current >= from_date and current >= self.start_date:
+                    yield current
+                index += 1
+
+    def pending_occurrences(self, until):
+        """Ocorrências ainda não materializadas até a data informada"""
+        if not self.active or self.next_due_date is None:
+            return []
+        return list(self.iter_occurrences(self.next_due_date, until))
+
+    def first_occurrence(self):
+        """Primeira ocorrência a partir da data de início"""
+        return next(self.iter_occurrences(self.start_date, self.start_date + relativedelta(months=(self.interval or 1) + 1)), None)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'amount': from_cents(self.amount),
+            'payment_type': self.payment_type,
+            'frequency': self.frequency,
+            'interval': self.interval,
+            'day_of_month': self.day_of_month,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'next_due_date': self.next_due_date.isoformat() if self.next_due_date else None,
+            'active': self.active,
+            'category': self.category.to_dict() if self.category else None,
+            'account_id': self.account_id,
+            'credit_card_id': self.credit_card_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
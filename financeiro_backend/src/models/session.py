@@ -0,0 +1,20 @@
+from src.models.user import db
+from datetime import datetime
+
+class UserSession(db.Model):
+    """Sessão de login guardada no servidor (o cookie carrega só o sid).
+
+    Fica no banco principal, compartilhada por todos os processos e mantida
+    entre reinícios. As linhas expiram em expires_at, renovado pelo uso, e são
+    removidas pela limpeza periódica (flask purge-sessions).
+    """
+    __tablename__ = 'session'
+
+    sid = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    data = db.Column(db.Text, nullable=False)  # JSON (serializador de sessão do Flask)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<UserSession {self.user_id} ({self.expires_at})>'
@@ -1,6 +1,10 @@
 from src.models.user import db
+from src.models.money import Money, from_cents
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
+from sqlalchemy import event, select, func
+from decimal import Decimal
+import hashlib
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -9,14 +13,22 @@ class Transaction(db.Model):
     account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=True)  # Para débito/PIX
     credit_card_id = db.Column(db.Integer, db.ForeignKey('credit_card.id'), nullable=True)  # Para cartão
     description = db.Column(db.String(255), nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    amount = db.Column(Money, nullable=False)  # Centavos
     transaction_date = db.Column(db.Date, nullable=False)
     payment_type = db.Column(db.String(20), nullable=False)  # 'debit', 'pix', 'credit_card'
+    type = db.Column(db.String(20), nullable=True)  # Cópia de Category.type: 'income' ou 'expense'
+    dedup_hash = db.Column(db.String(64), nullable=True)  # transaction_fingerprint, para detectar duplicatas
     installments = db.Column(db.Integer, default=1)
     installment_number = db.Column(db.Integer, default=1)
     parent_transaction_id = db.Column(db.Integer, db.ForeignKey('transaction.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_transaction_user_type_date', 'user_id', 'type', 'transaction_date'),
+        db.Index('ix_transaction_user_date', 'user_id', 'transaction_date'),
+        db.Index('ix_transaction_user_dedup_hash', 'user_id', 'dedup_hash'),
+    )
+
     # Relacionamentos
     parent_transaction = db.relationship('Transaction', remote_side=[id], backref='child_transactions')
     account = db.relationship('Account', backref='transactions')
@@ -60,9 +72,10 @@ class Transaction(db.Model):
         result = {
             'id': self.id,
             'description': self.description,
-            'amount': float(self.amount) if self.amount else 0.0,
+            'amount': from_cents(self.amount),
             'transaction_date': self.transaction_date.isoformat() if self.transaction_date else None,
             'payment_type': self.payment_type,
+            'type': self.type,
             'installments': self.installments,
             'installment_number': self.installment_number,
             'parent_transaction_id': self.parent_transaction_id,
@@ -79,3 +92,47 @@ class Transaction(db.Model):
         
         return result
 
+
+
+def transaction_fingerprint(transaction_date, amount, description, account_id=None, credit_card_id=None):
+    """Hash de data, valor, descrição normalizada e conta/cartão: duas transações
+    com o mesmo hash são consideradas a mesma (ex.: linha importada duas vezes)"""
+    amount = Decimal(amount).scaleb(-2)  # Centavos formatados como '12.34'
+    description = ' '.join((description or '').split()).casefold()
+    source = f'account:{account_id}' if account_id else f'credit_card:{credit_card_id}'
+    value = f'{transaction_date.isoformat()}|{amount}|{description}|{source}'
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+@event.listens_for(Transaction, 'before_insert')
+def fill_derived_columns(mapper, connection, target):
+    """Preenche o tipo (a partir da categoria) e o hash de duplicidade quando quem criou a transação não informou"""
+    if target.type is None and target.category_id is not None:
+        category = db.metadata.tables['category']
+        target.type = connection.execute(
+            select(category.c.type).where(category.c.id == target.category_id)
+        ).scalar()
+    if target.dedup_hash is None and target.parent_transaction_id is None:
+        target.dedup_hash = transaction_fingerprint(
+            target.transaction_date, target.amount, target.description, target.account_id, target.credit_card_id
+        )
+
+
+@event.listens_for(Transaction, 'before_insert')
+def skip_archived_ids(mapper, connection, target):
+    """Não reutiliza o id de uma transação arquivada.
+
+    Sem AUTOINCREMENT o SQLite usa max(id) + 1 da tabela quente: depois de
+    arquivar (ou excluir) as transações de ids mais altos, uma nova transação
+    receberia o id de uma linha do arquivo (source_id). Só nesse caso o id é
+    escolhido aqui; as duas consultas usam as chaves primárias.
+    """
+    archive = db.metadata.tables.get('transaction_archive')
+    if target.id is not None or archive is None:
+        return
+    archived_max = connection.execute(select(func.max(archive.c.source_id))).scalar()
+    if archived_max is None:
+        return
+    hot_max = connection.execute(select(func.max(Transaction.__table__.c.id))).scalar() or 0
+    if archived_max >= hot_max:
+        target.id = archived_max + 1
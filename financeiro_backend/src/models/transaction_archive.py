@@ -0,0 +1,69 @@
+from src.models.user import db
+from src.models.money import Money, from_cents
+from datetime import datetime
+
+class ArchivedTransaction(db.Model):
+    """Lançamento de um período fechado, movido da tabela transaction pelo arquivador.
+
+    Cada linha é um lançamento já expandido (uma por parcela), no mesmo formato
+    das linhas de ledger_rows, então a leitura não precisa do InstallmentPlan.
+    Lançamentos arquivados são somente leitura.
+    """
+    __tablename__ = 'transaction_archive'
+
+    source_id = db.Column(db.Integer, primary_key=True)  # Id da transação original
+    installment_number = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, nullable=True)  # Nulo nas parcelas 2..N (antes virtuais)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    account_id = db.Column(db.Integer, db.ForeignKey('account.id'), nullable=True)
+    credit_card_id = db.Column(db.Integer, db.ForeignKey('credit_card.id'), nullable=True)
+    description = db.Column(db.String(255), nullable=False)
+    amount = db.Column(Money, nullable=False)
+    transaction_date = db.Column(db.Date, nullable=False)
+    payment_type = db.Column(db.String(20), nullable=False)
+    type = db.Column(db.String(20), nullable=True)
+    installments = db.Column(db.Integer, default=1)
+    parent_transaction_id = db.Column(db.Integer, nullable=True)
+    is_virtual = db.Column(db.Boolean, default=False)
+    created_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_transaction_archive_user_type_date', 'user_id', 'type', 'transaction_date'),
+        db.Index('ix_transaction_archive_user_date', 'user_id', 'transaction_date'),
+    )
+
+    # Relacionamentos
+    category = db.relationship('Category')
+    account = db.relationship('Account')
+    credit_card = db.relationship('CreditCard')
+
+    def __repr__(self):
+        return f'<ArchivedTransaction {self.source_id}:{self.installment_number}>'
+
+    def to_dict(self):
+        """Mesmo formato de Transaction.to_dict / plan_installment_dicts"""
+        result = {
+            'id': self.id if not self.is_virtual else f'{self.source_id}:{self.installment_number}',
+            'description': self.description,
+            'amount': from_cents(self.amount),
+            'transaction_date': self.transaction_date.isoformat() if self.transaction_date else None,
+            'payment_type': self.payment_type,
+            'type': self.type,
+            'installments': self.installments,
+            'installment_number': self.installment_number,
+            'parent_transaction_id': self.parent_transaction_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'category': self.category.to_dict() if self.category else None,
+            'account': self.account.to_dict() if self.account else None,
+            'credit_card': self.credit_card.to_dict() if self.credit_card else None,
+            'due_date': None,
+            'archived': True
+        }
+        if self.is_virtual:
+            result['virtual'] = True
+        if self.credit_card:
+            billing_year, billing_month = self.credit_card.get_billing_month_for_date(self.transaction_date)
+            result['due_date'] = self.credit_card.get_closing_date(billing_year, billing_month).isoformat()
+        return result
@@ -1,33 +1,26 @@
 from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
 from src.models.user import db
 from src.models.account import Account
+from src.models.money import to_cents
+from src.services.reconciliation import account_ledger_net
+from src.services.events import event_broker, balances_delta
+from src.services.sync import record_changes
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
+from decimal import InvalidOperation
 
 accounts_bp = Blueprint('accounts', __name__)
 
-def require_auth():
-    """Decorator para verificar autenticação"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    return None
-
 @accounts_bp.route('/accounts', methods=['GET'])
+@login_required
 def get_accounts():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     accounts = Account.query.filter_by(user_id=user_id).all()
     return jsonify({'accounts': [account.to_dict() for account in accounts]})
 
 @accounts_bp.route('/accounts/<int:account_id>', methods=['GET'])
+@login_required
 def get_account(account_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     account = Account.query.filter_by(id=account_id, user_id=user_id).first()
     
@@ -37,11 +30,8 @@ def get_account(account_id):
     return jsonify({'account': account.to_dict()})
 
 @accounts_bp.route('/accounts/<int:account_id>', methods=['PUT'])
+@login_required
 def update_account(account_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     account = Account.query.filter_by(id=account_id, user_id=user_id).first()
     
@@ -55,10 +45,14 @@ def update_account(account_id):
             account.name = data['name']
         
         if 'balance' in data:
-            account.balance = Decimal(str(data['balance']))
+            account.balance = to_cents(data['balance'])
+            # Ajuste manual: o saldo informado passa a ser a referência da conciliação
+            account.opening_balance = account.balance - account_ledger_net(account.id)
         
         account.updated_at = datetime.utcnow()
+        record_changes(user_id, account=[account.id])
         db.session.commit()
+        event_broker.publish(user_id, 'account.updated', {'balances': balances_delta([account])})
         
         return jsonify({
             'success': True,
@@ -72,26 +66,32 @@ def update_account(account_id):
         return jsonify({'error': f'Erro ao atualizar conta: {str(e)}'}), 500
 
 @accounts_bp.route('/accounts', methods=['POST'])
+@login_required
 def create_account():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     data = request.json
     
     if not data.get('name'):
         return jsonify({'error': 'Nome da conta é obrigatório'}), 400
     
+    try:
+        balance = to_cents(data.get('balance') or 0)
+    except (InvalidOperation, ValueError):
+        return jsonify({'error': 'Saldo inválido'}), 400
+    
     account = Account(
         user_id=user_id,
         name=data['name'],
-        balance=data.get('balance', 0.00)
+        balance=balance,
+        opening_balance=balance
     )
     
     try:
         db.session.add(account)
+        db.session.flush()
+        record_changes(user_id, account=[account.id])
         db.session.commit()
+        event_broker.publish(user_id, 'account.created', {'account': account.to_dict(), 'balances': balances_delta([account])})
         return jsonify({
             'success': True,
             'account': account.to_dict(),
@@ -0,0 +1,142 @@
+from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
+from src.models.user import db
+from src.models.budget import Budget, BUDGET_PERIODS
+from src.models.money import to_cents
+from src.services.category_cache import category_cache
+from src.services.budgets import budget_utilization, rebuild_counters
+from datetime import datetime
+from decimal import InvalidOperation
+
+budgets_bp = Blueprint('budgets', __name__)
+
+def apply_budget_data(budget, data, user_id):
+    """Valida e aplica os campos recebidos no orçamento. Retorna uma resposta de erro ou None"""
+    if 'category_id' in data:
+        category = category_cache.get(user_id, data['category_id'])
+        if not category:
+            return jsonify({'error': 'Categoria não encontrada'}), 404
+        if category.type != 'expense':
+            return jsonify({'error': 'Orçamentos são apenas para categorias de despesa'}), 400
+        budget.category_id = category.id
+
+    if 'period' in data:
+        if data['period'] not in BUDGET_PERIODS:
+            return jsonify({'error': 'Período deve ser "monthly" ou "yearly"'}), 400
+        budget.period = data['period']
+
+    if 'limit_amount' in data:
+        try:
+            budget.limit_amount = to_cents(data['limit_amount'])
+        except (InvalidOperation, ValueError):
+            return jsonify({'error': 'Valor inválido'}), 400
+        if budget.limit_amount <= 0:
+            return jsonify({'error': 'Limite deve ser maior que 0'}), 400
+
+    with db.session.no_autoflush:
+        duplicate = Budget.query.filter(
+            Budget.user_id == user_id,
+            Budget.category_id == budget.category_id,
+            Budget.period == budget.period,
+            Budget.id != budget.id
+        ).first()
+    if duplicate:
+        return jsonify({'error': 'Já existe um orçamento para esta categoria e período'}), 400
+
+    return None
+
+@budgets_bp.route('/budgets', methods=['GET'])
+@login_required
+def get_budgets():
+    user_id = session['user_id']
+
+    reference_date = None
+    if request.args.get('date'):
+        try:
+            reference_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Formato de data inválido'}), 400
+
+    # Utilização lida dos contadores mantidos nas escritas (sem agregar transações)
+    return jsonify({'budgets': budget_utilization(user_id, reference_date)})
+
+@budgets_bp.route('/budgets', methods=['POST'])
+@login_required
+def create_budget():
+    user_id = session['user_id']
+    data = request.json
+
+    required_fields = ['category_id', 'limit_amount']
+    for field in required_fields:
+        if not data.get(field):
+            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+
+    budget = Budget(user_id=user_id, period=data.get('period', 'monthly'))
+    validation_error = apply_budget_data(budget, data, user_id)
+    if validation_error:
+        return validation_error
+
+    try:
+        db.session.add(budget)
+        db.session.flush()
+        # Contadores iniciais a partir das transações já existentes (uma única agregação)
+        rebuild_counters(budget)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'budget': budget.to_dict(),
+            'message': 'Orçamento criado com sucesso'
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao criar orçamento: {str(e)}'}), 500
+
+@budgets_bp.route('/budgets/<int:budget_id>', methods=['PUT'])
+@login_required
+def update_budget(budget_id):
+    user_id = session['user_id']
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+
+    if not budget:
+        return jsonify({'error': 'Orçamento não encontrado'}), 404
+
+    data = request.json
+    previous = (budget.category_id, budget.period)
+    validation_error = apply_budget_data(budget, data, user_id)
+    if validation_error:
+        db.session.rollback()
+        return validation_error
+
+    try:
+        # Nova categoria ou período: os contadores são recalculados
+        if (budget.category_id, budget.period) != previous:
+            rebuild_counters(budget)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'budget': budget.to_dict(),
+            'message': 'Orçamento atualizado com sucesso'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao atualizar orçamento: {str(e)}'}), 500
+
+@budgets_bp.route('/budgets/<int:budget_id>', methods=['DELETE'])
+@login_required
+def delete_budget(budget_id):
+    user_id = session['user_id']
+    budget = Budget.query.filter_by(id=budget_id, user_id=user_id).first()
+
+    if not budget:
+        return jsonify({'error': 'Orçamento não encontrado'}), 404
+
+    try:
+        db.session.delete(budget)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'message': 'Orçamento excluído com sucesso'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao excluir orçamento'}), 500
@@ -1,21 +1,20 @@
 from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
 from src.models.user import db
 from src.models.category import Category
+from src.models.transaction_archive import ArchivedTransaction
+from src.services.category_cache import category_cache
+from src.services.sync import record_changes
+from src.services.categorizer import categorizer
 
 categories_bp = Blueprint('categories', __name__)
 
-def require_auth():
-    """Decorator para verificar autenticação"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    return None
+# Descrições por chamada de POST /categories/suggest
+MAX_SUGGEST_BATCH = 500
 
 @categories_bp.route('/categories', methods=['GET'])
+@login_required
 def get_categories():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     categories = Category.query.filter_by(user_id=user_id).all()
     
@@ -23,12 +22,51 @@ def get_categories():
         'categories': [cat.to_dict() for cat in categories]
     })
 
+@categories_bp.route('/categories/suggest', methods=['GET'])
+@login_required
+def suggest_category():
+    user_id = session['user_id']
+    description = (request.args.get('description') or '').strip()
+    category_type = request.args.get('type')
+    
+    if not description:
+        return jsonify({'error': 'Descrição é obrigatória'}), 400
+    
+    if category_type not in [None, 'income', 'expense']:
+        return jsonify({'error': 'Tipo deve ser "income" ou "expense"'}), 400
+    
+    suggestions = categorizer.suggest(user_id, description, category_type)
+    return jsonify({
+        'suggestion': suggestions[0] if suggestions else None,
+        'alternatives': suggestions[1:]
+    })
+
+@categories_bp.route('/categories/suggest', methods=['POST'])
+@login_required
+def suggest_categories():
+    """Sugestões em lote (importações): todas as descrições usam o mesmo índice"""
+    user_id = session['user_id']
+    data = request.json or {}
+    descriptions = data.get('descriptions')
+    category_type = data.get('type')
+    
+    if not isinstance(descriptions, list) or not all(isinstance(item, str) for item in descriptions):
+        return jsonify({'error': 'descriptions deve ser uma lista de textos'}), 400
+    
+    if len(descriptions) > MAX_SUGGEST_BATCH:
+        return jsonify({'error': f'Máximo de {MAX_SUGGEST_BATCH} descrições por requisição'}), 400
+    
+    if category_type not in [None, 'income', 'expense']:
+        return jsonify({'error': 'Tipo deve ser "income" ou "expense"'}), 400
+    
+    results = categorizer.suggest_many(user_id, descriptions, category_type, limit=1)
+    return jsonify({
+        'suggestions': [suggestions[0] if suggestions else None for suggestions in results]
+    })
+
 @categories_bp.route('/categories', methods=['POST'])
+@login_required
 def create_category():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     data = request.json
     
@@ -39,11 +77,7 @@ def create_category():
         return jsonify({'error': 'Tipo deve ser "income" ou "expense"'}), 400
     
     # Verificar se já existe uma categoria com o mesmo nome e tipo
-    existing = Category.query.filter_by(
-        user_id=user_id,
-        name=data['name'],
-        type=data['type']
-    ).first()
+    existing = category_cache.find(user_id, data['name'], data['type'])
     
     if existing:
         return jsonify({'error': 'Já existe uma categoria com este nome'}), 400
@@ -57,7 +91,10 @@ def create_category():
     
     try:
         db.session.add(category)
+        db.session.flush()
+        record_changes(user_id, category=[category.id])
         db.session.commit()
+        category_cache.invalidate(user_id)
         return jsonify({
             'success': True,
             'category': category.to_dict(),
@@ -68,11 +105,8 @@ def create_category():
         return jsonify({'error': 'Erro ao criar categoria'}), 500
 
 @categories_bp.route('/categories/<int:category_id>', methods=['PUT'])
+@login_required
 def update_category(category_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     category = Category.query.filter_by(id=category_id, user_id=user_id).first()
     
@@ -86,19 +120,17 @@ def update_category(category_id):
     
     if 'name' in data:
         # Verificar se já existe outra categoria com o mesmo nome e tipo
-        existing = Category.query.filter_by(
-            user_id=user_id,
-            name=data['name'],
-            type=category.type
-        ).filter(Category.id != category_id).first()
+        existing = category_cache.find(user_id, data['name'], category.type)
         
-        if existing:
+        if existing and existing != category_id:
             return jsonify({'error': 'Já existe uma categoria com este nome'}), 400
         
         category.name = data['name']
     
     try:
+        record_changes(user_id, category=[category_id])
         db.session.commit()
+        category_cache.invalidate(user_id)
         return jsonify({
             'success': True,
             'category': category.to_dict(),
@@ -109,11 +141,8 @@ def update_category(category_id):
         return jsonify({'error': 'Erro ao atualizar categoria'}), 500
 
 @categories_bp.route('/categories/<int:category_id>', methods=['DELETE'])
+@login_required
 def delete_category(category_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     category = Category.query.filter_by(id=category_id, user_id=user_id).first()
     
@@ -124,12 +153,14 @@ def delete_category(category_id):
         return jsonify({'error': 'Não é possível excluir categorias padrão'}), 400
     
     # Verificar se há transações associadas
-    if category.transactions:
+    if category.transactions or ArchivedTransaction.query.filter_by(category_id=category_id).first():
         return jsonify({'error': 'Não é possível excluir categoria com transações associadas'}), 400
     
     try:
         db.session.delete(category)
+        record_changes(user_id, deleted={'category': [category_id]})
         db.session.commit()
+        category_cache.invalidate(user_id)
         return jsonify({
             'success': True,
             'message': 'Categoria excluída com sucesso'
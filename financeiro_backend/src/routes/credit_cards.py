@@ -1,32 +1,28 @@
 from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
 from src.models.user import db
 from src.models.credit_card import CreditCard
+from src.models.transaction_archive import ArchivedTransaction
+from src.models.money import to_cents
+from src.services.reconciliation import card_ledger_total
+from src.services.events import event_broker, balances_delta
+from src.services.sync import record_changes
+from src.services.read_models import card_rows
+from decimal import InvalidOperation
 from datetime import datetime
 
 credit_cards_bp = Blueprint('credit_cards', __name__)
 
-def require_auth():
-    """Decorator para verificar autenticação"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    return None
-
 @credit_cards_bp.route('/credit-cards', methods=['GET'])
+@login_required
 def get_credit_cards():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
-    credit_cards = CreditCard.query.filter_by(user_id=user_id).all()
+    credit_cards = card_rows(user_id)
     return jsonify({'credit_cards': [card.to_dict() for card in credit_cards]})
 
 @credit_cards_bp.route('/credit-cards/<int:card_id>', methods=['GET'])
+@login_required
 def get_credit_card(card_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     card = CreditCard.query.filter_by(id=card_id, user_id=user_id).first()
     
@@ -36,11 +32,8 @@ def get_credit_card(card_id):
     return jsonify({'credit_card': card.to_dict()})
 
 @credit_cards_bp.route('/credit-cards', methods=['POST'])
+@login_required
 def create_credit_card():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     data = request.json
     
@@ -50,16 +43,25 @@ def create_credit_card():
     if not data.get('closing_day') or not (1 <= data.get('closing_day') <= 31):
         return jsonify({'error': 'Dia de fechamento deve estar entre 1 e 31'}), 400
     
+    try:
+        current_balance = to_cents(data.get('current_balance') or 0)
+    except (InvalidOperation, ValueError):
+        return jsonify({'error': 'Saldo inválido'}), 400
+    
     card = CreditCard(
         user_id=user_id,
         name=data['name'],
         closing_day=data['closing_day'],
-        current_balance=data.get('current_balance', 0.00)
+        current_balance=current_balance,
+        opening_balance=current_balance
     )
     
     try:
         db.session.add(card)
+        db.session.flush()
+        record_changes(user_id, credit_card=[card.id])
         db.session.commit()
+        event_broker.publish(user_id, 'credit_card.created', {'credit_card': card.to_dict(), 'balances': balances_delta(credit_cards=[card])})
         return jsonify({
             'success': True,
             'credit_card': card.to_dict(),
@@ -70,11 +72,8 @@ def create_credit_card():
         return jsonify({'error': 'Erro ao criar cartão'}), 500
 
 @credit_cards_bp.route('/credit-cards/<int:card_id>', methods=['PUT'])
+@login_required
 def update_credit_card(card_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     card = CreditCard.query.filter_by(id=card_id, user_id=user_id).first()
     
@@ -92,12 +91,19 @@ def update_credit_card(card_id):
         card.closing_day = data['closing_day']
     
     if 'current_balance' in data:
-        card.current_balance = data['current_balance']
+        try:
+            card.current_balance = to_cents(data['current_balance'])
+        except (InvalidOperation, ValueError):
+            return jsonify({'error': 'Saldo inválido'}), 400
+        # Ajuste manual: o saldo informado passa a ser a referência da conciliação
+        card.opening_balance = card.current_balance - card_ledger_total(card.id)
     
     card.updated_at = datetime.utcnow()
     
     try:
+        record_changes(user_id, credit_card=[card.id])
         db.session.commit()
+        event_broker.publish(user_id, 'credit_card.updated', {'credit_card': card.to_dict(), 'balances': balances_delta(credit_cards=[card])})
         return jsonify({
             'success': True,
             'credit_card': card.to_dict(),
@@ -108,11 +114,8 @@ def update_credit_card(card_id):
         return jsonify({'error': 'Erro ao atualizar cartão'}), 500
 
 @credit_cards_bp.route('/credit-cards/<int:card_id>', methods=['DELETE'])
+@login_required
 def delete_credit_card(card_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     card = CreditCard.query.filter_by(id=card_id, user_id=user_id).first()
     
@@ -120,12 +123,14 @@ def delete_credit_card(card_id):
         return jsonify({'error': 'Cartão não encontrado'}), 404
     
     # Verificar se há transações associadas
-    if card.transactions:
+    if card.transactions or ArchivedTransaction.query.filter_by(credit_card_id=card_id).first():
         return jsonify({'error': 'Não é possível excluir cartão com transações associadas'}), 400
     
     try:
         db.session.delete(card)
+        record_changes(user_id, deleted={'credit_card': [card_id]})
         db.session.commit()
+        event_broker.publish(user_id, 'credit_card.deleted', {'id': card_id})
         return jsonify({
             'success': True,
             'message': 'Cartão excluído com sucesso'
@@ -1,27 +1,28 @@
 from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
 from src.models.user import db
-from src.models.account import Account
-from src.models.credit_card import CreditCard
-from src.models.transaction import Transaction
-from src.models.category import Category
+from src.models.money import from_cents
+from src.services.category_cache import category_cache
+from src.services.events import transaction_summary
 from datetime import datetime, date
 from dateutil.relativedelta import relativedelta
 from sqlalchemy import func, and_
+from src.services.analytics import build_category_trends
+from src.services.installments import ledger_rows
+from src.services.forecast import ForecastInputs, ForecastEngine, DEFAULT_AVERAGE_MONTHS, MAX_PROJECTION_MONTHS, MAX_AVERAGE_MONTHS
+from src.services.admission import admission_controlled
+from src.services.read_models import account_balance_total, card_rows, recent_transaction_rows
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
-def require_auth():
-    """Decorator para verificar autenticação"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    return None
+# Limites que impedem uma requisição de gerar trabalho sem limite
+MAX_REPORT_MONTHS = 120
+MAX_SCENARIOS = 10
+MAX_WHAT_IF_EVENTS = 100
 
 @dashboard_bp.route('/dashboard', methods=['GET'])
+@login_required
 def get_dashboard():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     
     # Parâmetros de filtro de data (opcional)
@@ -41,59 +42,36 @@ def get_dashboard():
             return jsonify({'error': 'Formato de data inválido'}), 400
     
     # Saldo atual das contas
-    accounts = Account.query.filter_by(user_id=user_id).all()
-    current_balance = sum(float(acc.balance) for acc in accounts)
+    current_balance = from_cents(account_balance_total(user_id))
     
-    # Cartões de crédito
-    credit_cards = CreditCard.query.filter_by(user_id=user_id).all()
+    # Cartões de crédito (linhas somente leitura, sem entidades ORM)
+    credit_cards = card_rows(user_id)
     credit_cards_data = []
     
     for card in credit_cards:
         credit_cards_data.append({
+            'id': card.id,
             'name': card.name,
-            'current_balance': float(card.current_balance),
+            'current_balance': from_cents(card.current_balance),
             'next_closing': card.get_next_closing_date().isoformat()
         })
     
-    # Resumo mensal (baseado no filtro de data)
-    income_query = db.session.query(func.sum(Transaction.amount)).join(Category).filter(
-        and_(
-            Transaction.user_id == user_id,
-            Category.type == 'income',
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        )
-    ).scalar() or 0
-    
-    expense_query = db.session.query(func.sum(Transaction.amount)).join(Category).filter(
-        and_(
-            Transaction.user_id == user_id,
-            Category.type == 'expense',
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        )
-    ).scalar() or 0
-    
-    total_income = float(income_query)
-    total_expenses = float(expense_query)
-    net_balance = total_income - total_expenses
+    # Resumo mensal (baseado no filtro de data), com as parcelas expandidas
+    # Cada tipo é uma faixa no índice (user_id, type, transaction_date)
+    income_ledger = ledger_rows(user_id, start_date, end_date, name='income', transaction_type='income')
+    expense_ledger = ledger_rows(user_id, start_date, end_date, name='expense', transaction_type='expense')
+    # Somas em centavos inteiros, convertidas para reais só na resposta
+    income_total = db.session.query(func.sum(income_ledger.c.amount)).scalar() or 0
+    expense_total = db.session.query(func.sum(expense_ledger.c.amount)).scalar() or 0
+    
+    total_income = from_cents(income_total)
+    total_expenses = from_cents(expense_total)
+    net_balance = from_cents(income_total - expense_total)
     
     # Transações recentes (últimas 10)
-    recent_transactions = Transaction.query.filter_by(user_id=user_id)\
-        .order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())\
-        .limit(10).all()
-    
-    recent_transactions_data = []
-    for t in recent_transactions:
-        recent_transactions_data.append({
-            'id': t.id,
-            'description': t.description,
-            'amount': float(t.amount),
-            'type': t.category.type,
-            'date': t.transaction_date.isoformat(),
-            'payment_type': t.payment_type,
-            'installment_info': f"{t.installment_number}/{t.installments}" if t.installments > 1 else None
-        })
+    recent_transactions = recent_transaction_rows(user_id, limit=10)
+    
+    recent_transactions_data = [transaction_summary(t) for t in recent_transactions]
     
     return jsonify({
         'current_balance': current_balance,
@@ -110,73 +88,104 @@ def get_dashboard():
         'recent_transactions': recent_transactions_data
     })
 
+def parse_what_if(source):
+    """Extrai os parâmetros de simulação (what-if) de um dicionário de entrada"""
+    what_if = {}
+    for key in ['starting_balance', 'income_change_pct', 'expense_change_pct',
+                'extra_monthly_income', 'extra_monthly_expense']:
+        if source.get(key) not in (None, ''):
+            what_if[key] = float(source[key])
+    for key in ['include_averages', 'include_recurring']:
+        if key in source:
+            value = source[key]
+            what_if[key] = value if isinstance(value, bool) else str(value).lower() in ['1', 'true', 'yes']
+    if source.get('invoice_due_days') not in (None, ''):
+        what_if['invoice_due_days'] = int(source['invoice_due_days'])
+    if 'exclude_rule_ids' in source:
+        value = source['exclude_rule_ids']
+        what_if['exclude_rule_ids'] = [int(v) for v in (value.split(',') if isinstance(value, str) else value) if str(v)]
+    if isinstance(source.get('events'), list):
+        if len(source['events']) > MAX_WHAT_IF_EVENTS:
+            raise ValueError('events')
+        what_if['events'] = source['events']
+    return what_if
+
+def projection_range_error(months, average_months):
+    """Mensagem de erro se os meses da projeção estiverem fora dos limites"""
+    if not 1 <= months <= MAX_PROJECTION_MONTHS:
+        return f'months deve estar entre 1 e {MAX_PROJECTION_MONTHS}'
+    if not 1 <= average_months <= MAX_AVERAGE_MONTHS:
+        return f'average_months deve estar entre 1 e {MAX_AVERAGE_MONTHS}'
+    return None
+
+def report_range_error(start_date, end_date):
+    """Mensagem de erro se o período do relatório for invertido ou longo demais"""
+    if start_date > end_date:
+        return 'start_date deve ser anterior a end_date'
+    if end_date > start_date + relativedelta(months=MAX_REPORT_MONTHS):
+        return f'O período do relatório deve ter no máximo {MAX_REPORT_MONTHS} meses'
+    return None
+
 @dashboard_bp.route('/projections', methods=['GET'])
+@login_required
+@admission_controlled(cost=4)
 def get_projections():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
-    months = int(request.args.get('months', 12))
     
-    # Saldo atual das contas
-    accounts = Account.query.filter_by(user_id=user_id).all()
-    current_balance = sum(float(acc.balance) for acc in accounts)
+    try:
+        months = int(request.args.get('months', 12))
+        average_months = int(request.args.get('average_months', DEFAULT_AVERAGE_MONTHS))
+        what_if = parse_what_if(request.args)
+    except ValueError:
+        return jsonify({'error': 'Parâmetros de projeção inválidos'}), 400
     
-    projections = []
-    today = date.today()
+    error = projection_range_error(months, average_months)
+    if error:
+        return jsonify({'error': error}), 400
     
-    for i in range(1, months + 1):
-        projection_date = today + relativedelta(months=i)
-        projection_year = projection_date.year
-        projection_month = projection_date.month
-        
-        # Buscar parcelas que vencem neste mês
-        month_start = date(projection_year, projection_month, 1)
-        month_end = date(projection_year, projection_month, 1) + relativedelta(months=1, days=-1)
-        
-        # Parcelas de cartão de crédito que vencem neste mês
-        installments = Transaction.query.join(Category).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Transaction.payment_type == 'credit_card',
-                Category.type == 'expense',
-                Transaction.transaction_date >= month_start,
-                Transaction.transaction_date <= month_end
-            )
-        ).all()
-        
-        installments_data = []
-        credit_card_expenses = 0
-        
-        for installment in installments:
-            installments_data.append({
-                'description': installment.description,
-                'amount': float(installment.amount),
-                'credit_card': installment.credit_card.name if installment.credit_card else None,
-                'due_date': installment.get_installment_due_date().isoformat() if installment.get_installment_due_date() else None
-            })
-            credit_card_expenses += float(installment.amount)
-        
-        # Projeção simples: saldo atual menos gastos projetados
-        projected_balance = current_balance - (credit_card_expenses * i)
-        
-        projections.append({
-            'month': projection_month,
-            'year': projection_year,
-            'projected_balance': projected_balance,
-            'credit_card_expenses': credit_card_expenses,
-            'installments': installments_data
-        })
+    # Todos os dados são buscados uma vez; o motor percorre os meses em memória
+    inputs = ForecastInputs.load(user_id, months, average_months=average_months)
+    projections = ForecastEngine(inputs).run(what_if)
     
     return jsonify({'projections': projections})
 
+@dashboard_bp.route('/projections/scenarios', methods=['POST'])
+@login_required
+@admission_controlled(cost=6)
+def get_projection_scenarios():
+    user_id = session['user_id']
+    data = request.json or {}
+    
+    try:
+        months = int(data.get('months', 12))
+        average_months = int(data.get('average_months', DEFAULT_AVERAGE_MONTHS))
+        scenarios = [(s.get('name', f'Cenário {i + 1}'), parse_what_if(s)) for i, s in enumerate(data.get('scenarios', []))]
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Parâmetros de projeção inválidos'}), 400
+    
+    error = projection_range_error(months, average_months)
+    if error:
+        return jsonify({'error': error}), 400
+    if len(scenarios) > MAX_SCENARIOS:
+        return jsonify({'error': f'Informe no máximo {MAX_SCENARIOS} cenários'}), 400
+    
+    # Uma única carga de dados atende a projeção base e todas as simulações
+    engine = ForecastEngine(ForecastInputs.load(user_id, months, average_months=average_months))
+    
+    try:
+        results = [{'name': name, 'projections': engine.run(what_if)} for name, what_if in scenarios]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Eventos de simulação inválidos'}), 400
+    
+    return jsonify({
+        'baseline': engine.run(),
+        'scenarios': results
+    })
+
 @dashboard_bp.route('/reports/summary', methods=['GET'])
+@login_required
+@admission_controlled(cost=2)
 def get_reports_summary():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     
     # Parâmetros
@@ -193,62 +202,53 @@ def get_reports_summary():
     except ValueError:
         return jsonify({'error': 'Formato de data inválido'}), 400
     
+    error = report_range_error(start_date, end_date)
+    if error:
+        return jsonify({'error': error}), 400
+    
     if group_by == 'category':
-        # Resumo por categoria
-        income_by_category = db.session.query(
-            Category.name,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction).filter(
+        # Resumo por categoria: agrupa pelo id e resolve os nomes pelo cache
+        ledger = ledger_rows(user_id, start_date, end_date)
+        totals_by_category = db.session.query(
+            ledger.c.category_id,
+            func.sum(ledger.c.amount).label('total')
+        ).filter(
             and_(
-                Transaction.user_id == user_id,
-                Category.type == 'income',
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
+                ledger.c.user_id == user_id,
+                ledger.c.transaction_date >= start_date,
+                ledger.c.transaction_date <= end_date
             )
-        ).group_by(Category.name).all()
+        ).group_by(ledger.c.category_id).all()
         
-        expense_by_category = db.session.query(
-            Category.name,
-            func.sum(Transaction.amount).label('total')
-        ).join(Transaction).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Category.type == 'expense',
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        ).group_by(Category.name).all()
+        income_by_category = {}
+        expense_by_category = {}
+        for category_id, total in totals_by_category:
+            category = category_cache.get(user_id, category_id)
+            if category is None:
+                continue
+            target = income_by_category if category.type == 'income' else expense_by_category
+            target[category.name] = target.get(category.name, 0) + total
         
         return jsonify({
-            'income_by_category': [{'category': name, 'total': float(total)} for name, total in income_by_category],
-            'expenses_by_category': [{'category': name, 'total': float(total)} for name, total in expense_by_category]
+            'income_by_category': [{'category': name, 'total': from_cents(total)} for name, total in income_by_category.items()],
+            'expenses_by_category': [{'category': name, 'total': from_cents(total)} for name, total in expense_by_category.items()]
         })
     
     elif group_by == 'month':
         # Resumo por mês
+        income_ledger = ledger_rows(user_id, start_date, end_date, name='income', transaction_type='income')
+        income_month = func.strftime('%Y-%m', income_ledger.c.transaction_date)
         monthly_income = db.session.query(
-            func.strftime('%Y-%m', Transaction.transaction_date).label('month'),
-            func.sum(Transaction.amount).label('total')
-        ).join(Category).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Category.type == 'income',
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        ).group_by(func.strftime('%Y-%m', Transaction.transaction_date)).all()
+            income_month.label('month'),
+            func.sum(income_ledger.c.amount).label('total')
+        ).group_by(income_month).all()
         
+        expense_ledger = ledger_rows(user_id, start_date, end_date, name='expense', transaction_type='expense')
+        expense_month = func.strftime('%Y-%m', expense_ledger.c.transaction_date)
         monthly_expenses = db.session.query(
-            func.strftime('%Y-%m', Transaction.transaction_date).label('month'),
-            func.sum(Transaction.amount).label('total')
-        ).join(Category).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Category.type == 'expense',
-                Transaction.transaction_date >= start_date,
-                Transaction.transaction_date <= end_date
-            )
-        ).group_by(func.strftime('%Y-%m', Transaction.transaction_date)).all()
+            expense_month.label('month'),
+            func.sum(expense_ledger.c.amount).label('total')
+        ).group_by(expense_month).all()
         
         # Combinar dados por mês
         monthly_data = {}
@@ -256,12 +256,12 @@ def get_reports_summary():
         for month, total in monthly_income:
             if month not in monthly_data:
                 monthly_data[month] = {'income': 0, 'expenses': 0}
-            monthly_data[month]['income'] = float(total)
+            monthly_data[month]['income'] = from_cents(total)
         
         for month, total in monthly_expenses:
             if month not in monthly_data:
                 monthly_data[month] = {'income': 0, 'expenses': 0}
-            monthly_data[month]['expenses'] = float(total)
+            monthly_data[month]['expenses'] = from_cents(total)
         
         monthly_totals = []
         for month, data in sorted(monthly_data.items()):
@@ -278,12 +278,59 @@ def get_reports_summary():
         return jsonify({'error': 'group_by deve ser "category" ou "month"'}), 400
 
 
+@dashboard_bp.route('/reports/trends', methods=['GET'])
+@login_required
+@admission_controlled(cost=3)
+def get_reports_trends():
+    user_id = session['user_id']
+    
+    # Parâmetros (padrão: últimos 12 meses)
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    category_type = request.args.get('type')  # 'income', 'expense' ou todos
+    
+    try:
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        else:
+            today = date.today()
+            end_date = date(today.year, today.month, 1) + relativedelta(months=1, days=-1)
+        
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+        else:
+            start_date = date(end_date.year, end_date.month, 1) - relativedelta(months=11)
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido'}), 400
+    
+    error = report_range_error(start_date, end_date)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    if category_type and category_type not in ['income', 'expense']:
+        return jsonify({'error': 'Tipo deve ser "income" ou "expense"'}), 400
+    
+    try:
+        outlier_threshold = float(request.args.get('outlier_threshold', 2.0))
+    except ValueError:
+        return jsonify({'error': 'outlier_threshold inválido'}), 400
+    
+    trends = build_category_trends(user_id, start_date, end_date, category_type, outlier_threshold)
+    
+    return jsonify({
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat()
+        },
+        'months': trends['months'],
+        'categories': trends['categories']
+    })
+
+
 @dashboard_bp.route('/dashboard/monthly-chart', methods=['GET'])
+@login_required
+@admission_controlled(cost=2)
 def get_monthly_chart():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     
     # Calcular dados dos últimos 6 meses
@@ -303,47 +350,24 @@ def get_monthly_chart():
         ]
         month_name = f"{month_names[target_date.month - 1]}/{target_date.year}"
         
-        # Buscar receitas do mês
-        income_query = db.session.query(func.sum(Transaction.amount)).join(Category).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Category.type == 'income',
-                Transaction.transaction_date >= month_start,
-                Transaction.transaction_date <= month_end
-            )
-        ).scalar() or 0
+        # Buscar receitas do mês (parcelas expandidas)
+        income_ledger = ledger_rows(user_id, month_start, month_end, name='income', transaction_type='income')
+        income_query = db.session.query(func.sum(income_ledger.c.amount)).scalar() or 0
         
         # Buscar despesas do mês
-        expense_query = db.session.query(func.sum(Transaction.amount)).join(Category).filter(
-            and_(
-                Transaction.user_id == user_id,
-                Category.type == 'expense',
-                Transaction.transaction_date >= month_start,
-                Transaction.transaction_date <= month_end
-            )
-        ).scalar() or 0
+        expense_ledger = ledger_rows(user_id, month_start, month_end, name='expense', transaction_type='expense')
+        expense_query = db.session.query(func.sum(expense_ledger.c.amount)).scalar() or 0
         
-        receitas = float(income_query)
-        despesas = float(expense_query)
+        receitas = from_cents(income_query)
+        despesas = from_cents(expense_query)
         
         # Calcular projeção (baseada em transações parceladas futuras)
         projecao = 0
         if target_date >= today:  # Apenas para meses futuros
-            # Buscar transações parceladas que afetam este mês
-            parceladas = Transaction.query.join(Category).filter(
-                and_(
-                    Transaction.user_id == user_id,
-                    Transaction.installments > 1,
-                    Category.type == 'expense',
-                    Transaction.transaction_date <= month_end
-                )
-            ).all()
-            
-            for t in parceladas:
-                # Calcular quantas parcelas já foram pagas até este mês
-                months_since = (target_date.year - t.transaction_date.year) * 12 + (target_date.month - t.transaction_date.month)
-                if 0 <= months_since < t.installments:
-                    projecao += float(t.amount) / t.installments
+            # Parcelas de compras parceladas que caem neste mês
+            projecao = from_cents(db.session.query(func.sum(expense_ledger.c.amount)).filter(
+                expense_ledger.c.installments > 1
+            ).scalar())
         
         chart_data.append({
             'month': month_name,
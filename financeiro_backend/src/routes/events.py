@@ -0,0 +1,41 @@
+from flask import Blueprint, Response, request, session, stream_with_context
+from src.auth import login_required
+from src.services.events import event_broker, format_sse
+
+events_bp = Blueprint('events', __name__)
+
+# Comentário enviado periodicamente para manter a conexão aberta em proxies
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+
+@events_bp.route('/events', methods=['GET'])
+@login_required
+def stream_events():
+    user_id = session['user_id']
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    subscription, missed = event_broker.subscribe(user_id, last_event_id)
+
+    def generate():
+        try:
+            yield f'retry: {RETRY_MILLISECONDS}\n\n'
+            for event in missed:
+                yield format_sse(event)
+            while True:
+                if subscription.overflowed:
+                    yield format_sse({'id': event_broker.latest_id(user_id), 'event': 'resync', 'data': {}})
+                    return
+                event = subscription.get(timeout=HEARTBEAT_SECONDS)
+                yield format_sse(event) if event else ': ping\n\n'
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
@@ -0,0 +1,47 @@
+from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
+from src.services.jobs import job_runner, JOB_HANDLERS
+
+jobs_bp = Blueprint('jobs', __name__)
+
+@jobs_bp.route('/jobs', methods=['GET'])
+@login_required
+def get_jobs():
+    user_id = session['user_id']
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'limit deve ser um número inteiro'}), 400
+    return jsonify({'jobs': job_runner.list(user_id=user_id, limit=limit)})
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job(job_id):
+    user_id = session['user_id']
+    job = job_runner.get(job_id, user_id=user_id)
+
+    if not job:
+        return jsonify({'error': 'Job não encontrado'}), 404
+
+    return jsonify({'job': job})
+
+@jobs_bp.route('/jobs', methods=['POST'])
+@login_required
+def create_job():
+    user_id = session['user_id']
+    data = request.json or {}
+    job_type = data.get('type')
+
+    if job_type not in JOB_HANDLERS or not JOB_HANDLERS[job_type]['user_facing']:
+        return jsonify({'error': 'Tipo de job inválido'}), 400
+
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return jsonify({'error': 'params deve ser um objeto'}), 400
+
+    job = job_runner.submit(job_type, params, user_id=user_id)
+    return jsonify({
+        'success': True,
+        'job': job,
+        'message': 'Job enfileirado com sucesso'
+    }), 202
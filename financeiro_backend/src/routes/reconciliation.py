@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
+from src.services.reconciliation import reconcile_all
+from src.services.admission import admission_controlled
+
+reconciliation_bp = Blueprint('reconciliation', __name__)
+
+@reconciliation_bp.route('/reconciliation', methods=['GET'])
+@login_required
+@admission_controlled(cost=3)
+def get_reconciliation():
+    user_id = session['user_id']
+    report = reconcile_all(repair=False, workers=1, user_ids=[user_id])
+    return jsonify(report)
+
+@reconciliation_bp.route('/reconciliation', methods=['POST'])
+@login_required
+@admission_controlled(cost=3)
+def repair_reconciliation():
+    user_id = session['user_id']
+    data = request.json or {}
+
+    try:
+        report = reconcile_all(repair=bool(data.get('repair', True)), workers=1, user_ids=[user_id])
+        return jsonify({
+            'success': True,
+            **report,
+            'message': 'Conciliação concluída com sucesso'
+        })
+    except Exception as e:
+        return jsonify({'error': f'Erro ao conciliar saldos: {str(e)}'}), 500
@@ -0,0 +1,230 @@
+from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
+from src.models.user import db
+from src.models.recurring_rule import RecurringRule
+from src.models.money import to_cents
+from src.models.account import Account
+from src.models.credit_card import CreditCard
+from src.services.category_cache import category_cache
+from datetime import datetime, date
+from dateutil.relativedelta import relativedelta
+from decimal import InvalidOperation
+
+recurring_bp = Blueprint('recurring', __name__)
+
+# Horizonte máximo da listagem de ocorrências futuras
+MAX_OCCURRENCE_MONTHS = 120
+
+def apply_rule_data(rule, data, user_id):
+    """Valida e aplica os campos recebidos na regra. Retorna uma resposta de erro ou None"""
+    if 'description' in data:
+        if not data['description']:
+            return jsonify({'error': 'Campo description é obrigatório'}), 400
+        rule.description = data['description']
+
+    if 'amount' in data:
+        try:
+            rule.amount = to_cents(data['amount'])
+        except (InvalidOperation, ValueError):
+            return jsonify({'error': 'Valor inválido'}), 400
+
+    if 'category_id' in data:
+        category = category_cache.get(user_id, data['category_id'])
+        if not category:
+            return jsonify({'error': 'Categoria não encontrada'}), 404
+        rule.category_id = category.id
+
+    if 'frequency' in data:
+        if data['frequency'] not in ['monthly', 'weekly']:
+            return jsonify({'error': 'Frequência deve ser "monthly" ou "weekly"'}), 400
+        rule.frequency = data['frequency']
+
+    if 'interval' in data:
+        try:
+            interval = int(data['interval'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Intervalo inválido'}), 400
+        if interval < 1:
+            return jsonify({'error': 'Intervalo deve ser maior que 0'}), 400
+        rule.interval = interval
+
+    if 'day_of_month' in data:
+        day_of_month = data['day_of_month']
+        if day_of_month is not None:
+            try:
+                day_of_month = int(day_of_month)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Dia do mês inválido'}), 400
+            if not (1 <= day_of_month <= 31):
+                return jsonify({'error': 'Dia do mês deve estar entre 1 e 31'}), 400
+        rule.day_of_month = day_of_month
+
+    try:
+        if 'start_date' in data:
+            rule.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        if 'end_date' in data:
+            rule.end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data['end_date'] else None
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido'}), 400
+
+    if rule.end_date and rule.start_date and rule.end_date < rule.start_date:
+        return jsonify({'error': 'end_date deve ser posterior a start_date'}), 400
+
+    if 'payment_type' in data:
+        if data['payment_type'] not in ['debit', 'pix', 'credit_card']:
+            return jsonify({'error': 'Tipo de pagamento inválido'}), 400
+        rule.payment_type = data['payment_type']
+
+    if rule.payment_type in ['debit', 'pix']:
+        account_id = data.get('account_id', rule.account_id)
+        if not account_id:
+            return jsonify({'error': 'Conta é obrigatória para débito/PIX'}), 400
+        account = Account.query.filter_by(id=account_id, user_id=user_id).first()
+        if not account:
+            return jsonify({'error': 'Conta não encontrada'}), 404
+        rule.account_id = account.id
+        rule.credit_card_id = None
+    elif rule.payment_type == 'credit_card':
+        credit_card_id = data.get('credit_card_id', rule.credit_card_id)
+        if not credit_card_id:
+            return jsonify({'error': 'Cartão é obrigatório para pagamento no cartão de crédito'}), 400
+        credit_card = CreditCard.query.filter_by(id=credit_card_id, user_id=user_id).first()
+        if not credit_card:
+            return jsonify({'error': 'Cartão não encontrado'}), 404
+        rule.credit_card_id = credit_card.id
+        rule.account_id = None
+
+    if 'active' in data:
+        rule.active = bool(data['active'])
+
+    return None
+
+@recurring_bp.route('/recurring-rules', methods=['GET'])
+@login_required
+def get_recurring_rules():
+    user_id = session['user_id']
+    rules = RecurringRule.query.filter_by(user_id=user_id).order_by(RecurringRule.next_due_date).all()
+    return jsonify({'recurring_rules': [rule.to_dict() for rule in rules]})
+
+@recurring_bp.route('/recurring-rules', methods=['POST'])
+@login_required
+def create_recurring_rule():
+    user_id = session['user_id']
+    data = request.json
+
+    required_fields = ['description', 'amount', 'category_id', 'payment_type', 'frequency', 'start_date']
+    for field in required_fields:
+        if not data.get(field):
+            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+
+    rule = RecurringRule(user_id=user_id, interval=1, active=True)
+
+    try:
+        validation_error = apply_rule_data(rule, data, user_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Dados inválidos'}), 400
+    if validation_error:
+        return validation_error
+
+    # As ocorrências não são gravadas agora: apenas a próxima data pendente
+    rule.next_due_date = rule.first_occurrence()
+
+    try:
+        db.session.add(rule)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'recurring_rule': rule.to_dict(),
+            'message': 'Lançamento recorrente criado com sucesso'
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao criar lançamento recorrente'}), 500
+
+@recurring_bp.route('/recurring-rules/<int:rule_id>', methods=['PUT'])
+@login_required
+def update_recurring_rule(rule_id):
+    user_id = session['user_id']
+    rule = RecurringRule.query.filter_by(id=rule_id, user_id=user_id).first()
+
+    if not rule:
+        return jsonify({'error': 'Lançamento recorrente não encontrado'}), 404
+
+    data = request.json
+    was_active = rule.active
+
+    try:
+        validation_error = apply_rule_data(rule, data, user_id)
+    except (TypeError, ValueError):
+        db.session.rollback()
+        return jsonify({'error': 'Dados inválidos'}), 400
+    if validation_error:
+        db.session.rollback()
+        return validation_error
+
+    # Mudanças no calendário recalculam a próxima ocorrência sem reabrir as já gravadas
+    schedule_fields = {'frequency', 'interval', 'day_of_month', 'start_date', 'end_date', 'active'}
+    if schedule_fields & set(data.keys()):
+        if rule.active and not was_active:
+            # Regra retomada: as ocorrências do período pausado não são lançadas
+            pending_from = max(date.today(), rule.start_date)
+        else:
+            pending_from = max(rule.next_due_date or date.today(), rule.start_date)
+        horizon = pending_from + relativedelta(months=(rule.interval or 1) + 1)
+        rule.next_due_date = next(rule.iter_occurrences(pending_from, horizon), None)
+
+    rule.updated_at = datetime.utcnow()
+
+    try:
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'recurring_rule': rule.to_dict(),
+            'message': 'Lançamento recorrente atualizado com sucesso'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao atualizar lançamento recorrente'}), 500
+
+@recurring_bp.route('/recurring-rules/<int:rule_id>', methods=['DELETE'])
+@login_required
+def delete_recurring_rule(rule_id):
+    user_id = session['user_id']
+    rule = RecurringRule.query.filter_by(id=rule_id, user_id=user_id).first()
+
+    if not rule:
+        return jsonify({'error': 'Lançamento recorrente não encontrado'}), 404
+
+    try:
+        # Transações já materializadas permanecem no histórico
+        db.session.delete(rule)
+        db.session.commit()
+        return jsonify({
+            'success': True,
+            'message': 'Lançamento recorrente excluído com sucesso'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro ao excluir lançamento recorrente'}), 500
+
+@recurring_bp.route('/recurring-rules/<int:rule_id>/occurrences', methods=['GET'])
+@login_required
+def get_recurring_occurrences(rule_id):
+    user_id = session['user_id']
+    rule = RecurringRule.query.filter_by(id=rule_id, user_id=user_id).first()
+
+    if not rule:
+        return jsonify({'error': 'Lançamento recorrente não encontrado'}), 404
+
+    try:
+        months = int(request.args.get('months', 12))
+    except ValueError:
+        return jsonify({'error': 'months inválido'}), 400
+    if not 1 <= months <= MAX_OCCURRENCE_MONTHS:
+        return jsonify({'error': f'months deve estar entre 1 e {MAX_OCCURRENCE_MONTHS}'}), 400
+    until = date.today() + relativedelta(months=months)
+
+    return jsonify({
+        'recurring_rule_id': rule.id,
+        'occurrences': [d.isoformat() for d in rule.pending_occurrences(until)]
+    })
@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify, request, session
+from src.auth import login_required
+from src.services.sync import sync_changes
+
+sync_bp = Blueprint('sync', __name__)
+
+@sync_bp.route('/sync', methods=['GET'])
+@login_required
+def get_changes():
+    user_id = session['user_id']
+    
+    # Versão devolvida pela última sincronização do cliente (0 ou ausente: carga completa)
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'since inválido'}), 400
+    
+    if since < 0:
+        return jsonify({'error': 'since inválido'}), 400
+    
+    return jsonify(sync_changes(user_id, since))
@@ -1,78 +1,140 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request, session, current_app
+from src.auth import login_required
 from src.models.user import db
-from src.models.transaction import Transaction
+from src.models.transaction import Transaction, transaction_fingerprint
 from src.models.account import Account
+from src.models.money import to_cents, from_cents
 from src.models.credit_card import CreditCard
-from src.models.category import Category
+from src.services.category_cache import category_cache
+from src.services.events import event_broker, transaction_summary, balances_delta
+from src.services.idempotency import idempotent
+from src.services.admission import admission_controlled
+from src.services.budgets import record_spend, transaction_entries
+from src.services.sync import record_changes
+from src.services.categorizer import categorizer, DEFAULT_MIN_CONFIDENCE
 from datetime import datetime, date
-from dateutil.relativedelta import relativedelta
-from sqlalchemy import and_, or_
-from decimal import Decimal, InvalidOperation
+import base64
+import binascii
+import json
+from sqlalchemy import tuple_
+from decimal import InvalidOperation
+from src.services.bulk import bulk_apply, BULK_ACTIONS
+from src.services.archive import find_archived_duplicate
+from src.services.installments import ledger_rows, ledger_row_dicts, page_floor_date, plan_installment_dicts, create_plan
+from src.models.installment_plan import MAX_INSTALLMENTS
 
 transactions_bp = Blueprint('transactions', __name__)
 
-def require_auth():
-    """Decorator para verificar autenticação"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Não autenticado'}), 401
-    return None
+# Máximo de lançamentos por página na listagem
+MAX_PAGE_SIZE = 100
+
+# Tratamento de transação idêntica já existente (mesmo hash de data, valor, descrição e conta/cartão):
+# 'allow' cria mesmo assim (padrão), 'skip' devolve a existente e 'reject' responde 409
+DUPLICATE_POLICIES = ['allow', 'skip', 'reject']
+
+def encode_cursor(row):
+    """Cursor opaco com a chave de ordenação da última linha da página"""
+    key = [row.transaction_date.isoformat(), row.source_id, row.installment_number]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """(data, source_id, parcela) do cursor; ValueError se inválido"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        day, source_id, installment_number = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(day), int(source_id), int(installment_number)
+    except (binascii.Error, TypeError, ValueError):
+        raise ValueError('cursor')
 
 @transactions_bp.route('/transactions', methods=['GET'])
+@login_required
 def get_transactions():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     
     # Parâmetros de filtro
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     transaction_type = request.args.get('type')  # 'income' ou 'expense'
-    page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 20))
-    
-    # Query base
-    query = Transaction.query.filter_by(user_id=user_id)
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = min(max(int(request.args.get('limit', 20)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'Paginação inválida'}), 400
     
     # Filtros de data
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.transaction_date >= start_date)
         except ValueError:
             return jsonify({'error': 'Formato de data inválido para start_date'}), 400
     
     if end_date:
         try:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.transaction_date <= end_date)
         except ValueError:
             return jsonify({'error': 'Formato de data inválido para end_date'}), 400
     
-    # Filtro por tipo (baseado na categoria)
-    if transaction_type:
-        query = query.join(Category).filter(Category.type == transaction_type)
+    # Cursor da paginação por keyset (ausente na primeira página)
+    key = None
+    if request.args.get('cursor'):
+        try:
+            key = decode_cursor(request.args['cursor'])
+        except ValueError:
+            return jsonify({'error': 'Cursor inválido'}), 400
+        # Nenhuma linha da página seguinte é posterior à data do cursor, e uma parcela
+        # nunca vem antes da compra: a data vira limite também na tabela base
+        if not end_date or key[0] < end_date:
+            end_date = key[0]
+    
+    # Paginação por cursor (keyset): sem COUNT nem OFFSET. As `limit + 1` linhas seguintes
+    # da tabela base (e do arquivo) pelo índice de data dão o piso da janela; só as
+    # compras dessa janela e os planos com parcelas nela são expandidos
+    if 'cursor' in request.args:
+        floor = page_floor_date(user_id, key, limit + 1, start_date or None, end_date or None,
+                                transaction_type=transaction_type or None)
+        if floor is not None and (not start_date or floor > start_date):
+            start_date = floor
+    
+    # Query base: lançamentos com as parcelas expandidas, filtrados por tipo (Transaction.type)
+    ledger = ledger_rows(user_id, start_date or None, end_date or None, transaction_type=transaction_type or None)
+    query = db.session.query(
+        ledger.c.source_id, ledger.c.installment_number, ledger.c.archived, ledger.c.transaction_date
+    )
     
-    # Ordenação e paginação
-    query = query.order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())
+    # Ordenação total (data, transação, parcela): base da paginação por cursor. Os ids
+    # crescem com a criação, então o desempate segue a ordem de lançamento
+    query = query.order_by(
+        ledger.c.transaction_date.desc(), ledger.c.source_id.desc(), ledger.c.installment_number.desc()
+    )
+    
+    if 'cursor' in request.args:
+        if key is not None:
+            query = query.filter(
+                tuple_(ledger.c.transaction_date, ledger.c.source_id, ledger.c.installment_number) < key
+            )
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return jsonify({
+            'transactions': ledger_row_dicts(rows),
+            'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+            'has_more': has_more
+        })
     
     total = query.count()
-    transactions = query.offset((page - 1) * limit).limit(limit).all()
+    rows = query.offset((page - 1) * limit).limit(limit).all()
     
     return jsonify({
-        'transactions': [t.to_dict() for t in transactions],
+        'transactions': ledger_row_dicts(rows),
         'total': total,
         'page': page,
         'pages': (total + limit - 1) // limit
     })
 
 @transactions_bp.route('/transactions', methods=['POST'])
+@login_required
+@idempotent
 def create_transaction():
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     data = request.json
     
@@ -82,8 +144,24 @@ def create_transaction():
         if not data.get(field):
             return jsonify({'error': f'Campo {field} é obrigatório'}), 400
     
+    # category_id "auto": categoria sugerida pelo histórico de descrições do usuário
+    category_id = data['category_id']
+    suggestion = None
+    if category_id == 'auto':
+        if data.get('type') not in [None, 'income', 'expense']:
+            return jsonify({'error': 'Tipo deve ser "income" ou "expense"'}), 400
+        suggestions = categorizer.suggest(user_id, data['description'], data.get('type'), limit=1)
+        min_confidence = current_app.config.get('CATEGORIZER_MIN_CONFIDENCE', DEFAULT_MIN_CONFIDENCE)
+        if not suggestions or suggestions[0]['confidence'] < min_confidence:
+            return jsonify({
+                'error': 'Não foi possível sugerir uma categoria; informe category_id',
+                'suggestion': suggestions[0] if suggestions else None
+            }), 422
+        suggestion = suggestions[0]
+        category_id = suggestion['category_id']
+    
     # Validar categoria
-    category = Category.query.filter_by(id=data['category_id'], user_id=user_id).first()
+    category = category_cache.get(user_id, category_id)
     if not category:
         return jsonify({'error': 'Categoria não encontrada'}), 404
     
@@ -126,58 +204,59 @@ def create_transaction():
     
     # Se for cartão de crédito e mais de 1 parcela, validar
     if data['payment_type'] == 'credit_card' and installments > 1:
-        if installments > 24:
-            return jsonify({'error': 'Máximo de 24 parcelas'}), 400
+        if installments > MAX_INSTALLMENTS:
+            return jsonify({'error': f'Máximo de {MAX_INSTALLMENTS} parcelas'}), 400
     elif data['payment_type'] in ['debit', 'pix'] and installments > 1:
         return jsonify({'error': 'Débito e PIX não podem ser parcelados'}), 400
     
+    on_duplicate = data.get('on_duplicate', 'allow')
+    if on_duplicate not in DUPLICATE_POLICIES:
+        return jsonify({'error': 'on_duplicate deve ser allow, skip ou reject'}), 400
+    
     try:
         # Criar transação principal
         try:
-            amount = Decimal(str(data['amount']))
+            amount = to_cents(data['amount'])
         except (InvalidOperation, ValueError):
             return jsonify({'error': 'Valor inválido'}), 400
-            
-        installment_amount = amount / installments if installments > 1 else amount
         
+        # Detector de duplicatas (usado por importações): busca pelo índice (user_id, dedup_hash)
+        # e, para datas de períodos arquivados, nas transações arquivadas do mesmo dia
+        dedup_hash = transaction_fingerprint(transaction_date, amount, data['description'], account_id, credit_card_id)
+        if on_duplicate != 'allow':
+            existing = Transaction.query.filter_by(user_id=user_id, dedup_hash=dedup_hash).first()
+            if not existing:
+                existing = find_archived_duplicate(user_id, transaction_date, dedup_hash)
+            if existing:
+                if on_duplicate == 'reject':
+                    return jsonify({'error': 'Transação duplicada', 'transaction_id': existing.id}), 409
+                return jsonify({
+                    'success': True,
+                    'duplicate': True,
+                    'transaction': existing.to_dict(),
+                    'message': 'Transação já registrada'
+                })
+            
         main_transaction = Transaction(
             user_id=user_id,
             category_id=category.id,
             account_id=account_id,
             credit_card_id=credit_card_id,
             description=data['description'],
-            amount=installment_amount,
+            amount=amount,
             transaction_date=transaction_date,
             payment_type=data['payment_type'],
+            type=category.type,
+            dedup_hash=dedup_hash,
             installments=installments,
             installment_number=1
         )
         
         db.session.add(main_transaction)
-        db.session.flush()  # Para obter o ID
-        
-        created_transactions = [main_transaction]
         
-        # Criar parcelas adicionais se necessário
+        # Parcelas adicionais são geradas virtualmente a partir do plano
         if installments > 1:
-            for i in range(2, installments + 1):
-                installment_date = transaction_date + relativedelta(months=i-1)
-                
-                installment_transaction = Transaction(
-                    user_id=user_id,
-                    category_id=category.id,
-                    credit_card_id=credit_card_id,
-                    description=f"{data['description']} - {i}/{installments}",
-                    amount=installment_amount,
-                    transaction_date=installment_date,
-                    payment_type=data['payment_type'],
-                    installments=installments,
-                    installment_number=i,
-                    parent_transaction_id=main_transaction.id
-                )
-                
-                db.session.add(installment_transaction)
-                created_transactions.append(installment_transaction)
+            create_plan(main_transaction, amount)
         
         # Atualizar saldos
         if data['payment_type'] in ['debit', 'pix']:
@@ -194,38 +273,82 @@ def create_transaction():
                 credit_card.current_balance += amount
                 credit_card.updated_at = datetime.utcnow()
         
+        # Contadores dos orçamentos da categoria, na mesma transação do banco
+        entries = transaction_entries(main_transaction)
+        budget_alerts = record_spend(user_id, category.id, entries) if category.type == 'expense' else []
+        
+        db.session.flush()
+        version = record_changes(user_id, transaction=[main_transaction.id], account=[account_id], credit_card=[credit_card_id])
         db.session.commit()
+        categorizer.learn(user_id, main_transaction.description, category.id, version)
         
-        return jsonify({
+        event_broker.publish(user_id, 'transaction.created', {
+            'transaction': transaction_summary(main_transaction),
+            'entries': [{'date': entry_date.isoformat(), 'amount': from_cents(value)} for entry_date, value in entries],
+            'balances': balances_delta([main_transaction.account], [main_transaction.credit_card])
+        })
+        for alert in budget_alerts:
+            event_broker.publish(user_id, 'budget.threshold', alert)
+        
+        response = {
             'success': True,
             'transaction': main_transaction.to_dict(),
-            'installments_created': [t.to_dict(include_relations=False) for t in created_transactions],
+            'installments_created': plan_installment_dicts(main_transaction, include_relations=False),
+            'budget_alerts': budget_alerts,
             'message': 'Transação criada com sucesso'
-        }), 201
+        }
+        if suggestion:
+            response['category_suggestion'] = suggestion
+        return jsonify(response), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Erro ao criar transação: {str(e)}'}), 500
 
+@transactions_bp.route('/transactions/<int:transaction_id>:<int:installment_number>', methods=['DELETE'])
+@login_required
+def delete_virtual_installment(transaction_id, installment_number):
+    """Parcelas geradas pelo plano têm id "principal:número" e não existem como linha"""
+    user_id = session['user_id']
+    transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
+    
+    if not transaction or not transaction.installment_plan \
+            or not 1 < installment_number <= transaction.installment_plan.installments:
+        return jsonify({'error': 'Transação não encontrada'}), 404
+    
+    return jsonify({'error': 'Não é possível excluir parcela individual. Exclua a transação principal.'}), 400
+
 @transactions_bp.route('/transactions/<int:transaction_id>', methods=['DELETE'])
+@login_required
 def delete_transaction(transaction_id):
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     user_id = session['user_id']
     transaction = Transaction.query.filter_by(id=transaction_id, user_id=user_id).first()
     
     if not transaction:
         return jsonify({'error': 'Transação não encontrada'}), 404
     
+    # Lançamentos e dados do evento coletados antes da exclusão
+    entries = transaction_entries(transaction)
+    deleted_event = {
+        'id': transaction.id,
+        'type': transaction.type,
+        'entries': [{'date': entry_date.isoformat(), 'amount': from_cents(value)} for entry_date, value in entries]
+    }
+    account, credit_card = transaction.account, transaction.credit_card
+    description, category_id = transaction.description, transaction.category_id
+    deleted_ids = [transaction.id]
+    
     try:
         # Se for uma transação parcelada (principal), excluir todas as parcelas
         if transaction.is_parent_transaction():
+            plan = transaction.installment_plan
             child_transactions = Transaction.query.filter_by(parent_transaction_id=transaction.id).all()
             
-            # Reverter saldos apenas da transação principal
-            total_amount = transaction.amount * transaction.installments
+            # Reverter o total exato do parcelamento (plano ou linhas filhas antigas)
+            if plan:
+                total_amount = plan.total_amount
+            else:
+                total_amount = transaction.amount + sum(child.amount for child in child_transactions)
             
             if transaction.payment_type in ['debit', 'pix'] and transaction.account:
                 if transaction.category.type == 'income':
@@ -239,9 +362,12 @@ def delete_transaction(transaction_id):
                     transaction.credit_card.current_balance -= total_amount
                     transaction.credit_card.updated_at = datetime.utcnow()
             
-            # Excluir parcelas filhas
+            # Excluir o plano e as parcelas filhas (formato antigo)
+            if plan:
+                db.session.delete(plan)
             for child in child_transactions:
                 db.session.delete(child)
+                deleted_ids.append(child.id)
         
         # Se for uma parcela individual, não permitir exclusão
         elif transaction.is_installment():
@@ -261,10 +387,20 @@ def delete_transaction(transaction_id):
                     transaction.credit_card.current_balance -= transaction.amount
                     transaction.credit_card.updated_at = datetime.utcnow()
         
+        if transaction.type == 'expense':
+            record_spend(user_id, transaction.category_id, entries, sign=-1)
+        
         # Excluir a transação principal
         db.session.delete(transaction)
+        version = record_changes(user_id, deleted={'transaction': deleted_ids},
+                                 account=[account.id] if account else [], credit_card=[credit_card.id] if credit_card else [])
         db.session.commit()
         
+        categorizer.forget(user_id, description, category_id, version)
+        
+        deleted_event['balances'] = balances_delta([account], [credit_card])
+        event_broker.publish(user_id, 'transaction.deleted', deleted_event)
+        
         return jsonify({
             'success': True,
             'message': 'Transação excluída com sucesso'
@@ -274,3 +410,97 @@ def delete_transaction(transaction_id):
         db.session.rollback()
         return jsonify({'error': f'Erro ao excluir transação: {str(e)}'}), 500
 
+@transactions_bp.route('/transactions/bulk', methods=['POST'])
+@login_required
+@admission_controlled(cost=4)
+def bulk_transactions():
+    user_id = session['user_id']
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+    action = data.get('action')
+    
+    if action not in BULK_ACTIONS:
+        return jsonify({'error': 'Ação deve ser "delete", "recategorize" ou "move_account"'}), 400
+    
+    # Seleção: lista de IDs e/ou filtro (ao menos um critério é obrigatório)
+    criteria = []
+    ids = data.get('ids')
+    filters = data.get('filter') or {}
+    if not isinstance(filters, dict):
+        return jsonify({'error': 'filter deve ser um objeto'}), 400
+    
+    if ids:
+        if not isinstance(ids, list):
+            return jsonify({'error': 'ids deve ser uma lista'}), 400
+        try:
+            criteria.append(Transaction.id.in_([int(i) for i in ids]))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'ids inválidos'}), 400
+    
+    try:
+        if filters.get('start_date'):
+            criteria.append(Transaction.transaction_date >= datetime.strptime(filters['start_date'], '%Y-%m-%d').date())
+        if filters.get('end_date'):
+            criteria.append(Transaction.transaction_date <= datetime.strptime(filters['end_date'], '%Y-%m-%d').date())
+        for field in ['category_id', 'account_id', 'credit_card_id']:
+            if filters.get(field):
+                criteria.append(getattr(Transaction, field) == int(filters[field]))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Filtro inválido (datas no formato YYYY-MM-DD e ids numéricos)'}), 400
+    
+    for field in ['type', 'payment_type', 'description']:
+        if filters.get(field) and not isinstance(filters[field], str):
+            return jsonify({'error': f'{field} deve ser um texto'}), 400
+    
+    if filters.get('type'):
+        criteria.append(Transaction.type == filters['type'])
+    if filters.get('payment_type'):
+        criteria.append(Transaction.payment_type == filters['payment_type'])
+    if filters.get('description'):
+        criteria.append(Transaction.description.ilike(f"%{filters['description']}%"))
+    
+    if not criteria:
+        return jsonify({'error': 'Informe ids ou ao menos um filtro'}), 400
+    
+    category = None
+    account_id = None
+    credit_card_id = None
+    
+    if action == 'recategorize':
+        category = category_cache.get(user_id, data.get('category_id'))
+        if not category:
+            return jsonify({'error': 'Categoria não encontrada'}), 404
+    
+    elif action == 'move_account':
+        if not data.get('account_id') and not data.get('credit_card_id'):
+            return jsonify({'error': 'Informe account_id e/ou credit_card_id de destino'}), 400
+        if data.get('account_id'):
+            account = Account.query.filter_by(id=data['account_id'], user_id=user_id).first()
+            if not account:
+                return jsonify({'error': 'Conta não encontrada'}), 404
+            account_id = account.id
+        if data.get('credit_card_id'):
+            credit_card = CreditCard.query.filter_by(id=data['credit_card_id'], user_id=user_id).first()
+            if not credit_card:
+                return jsonify({'error': 'Cartão não encontrado'}), 404
+            credit_card_id = credit_card.id
+    
+    try:
+        result = bulk_apply(user_id, criteria, action, category=category,
+                            account_id=account_id, credit_card_id=credit_card_id)
+        if action in ['delete', 'recategorize']:
+            # Índice do categorizador remontado no próximo uso
+            categorizer.invalidate(user_id)
+        # Alteração em massa: os clientes recarregam os dados em vez de aplicar deltas
+        event_broker.publish(user_id, 'transactions.bulk', {'action': action, 'affected': result['affected']})
+        return jsonify({
+            'success': True,
+            'action': action,
+            **result,
+            'message': f"{result['affected']} transações processadas com sucesso"
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erro ao processar transações: {str(e)}'}), 500
@@ -1,22 +1,41 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
+from src.auth import current_user
+from src.services.passwords import verify_password, needs_rehash, hash_password, dummy_verify
 
 user_bp = Blueprint('auth', __name__)
 
 @user_bp.route('/auth/login', methods=['POST'])
 def login():
-    data = request.json
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
     username = data.get('username')
     password = data.get('password')
     
     if not username or not password:
         return jsonify({'success': False, 'message': 'Usuário e senha são obrigatórios'}), 400
     
+    if not isinstance(username, str) or not isinstance(password, str):
+        return jsonify({'error': 'Usuário e senha devem ser textos'}), 400
+    
     user = User.query.filter_by(username=username).first()
     
-    if user and user.password == password:
+    # Usuário inexistente também paga o custo do hash (não revela quais usuários existem)
+    valid = verify_password(user.password, password) if user else dummy_verify(password)
+    
+    if valid:
+        # Senhas antigas (texto puro ou custo diferente do atual) são regravadas com o hash atual
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+        
+        # Novo identificador de sessão a cada login; o registro do usuário fica em cache na sessão
+        session.clear()
+        session.regenerate()
         session['user_id'] = user.id
         session['username'] = user.username
+        session['user'] = user.to_dict()
         return jsonify({
             'success': True,
             'user': user.to_dict(),
@@ -32,12 +51,11 @@ def logout():
 
 @user_bp.route('/auth/check', methods=['GET'])
 def check_auth():
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user:
-            return jsonify({
-                'authenticated': True,
-                'user': user.to_dict()
-            })
+    user = current_user()
+    if user:
+        return jsonify({
+            'authenticated': True,
+            'user': user
+        })
     
     return jsonify({'authenticated': False}), 401
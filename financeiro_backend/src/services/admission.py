@@ -0,0 +1,173 @@
+from flask import current_app, jsonify, request, session
+from functools import wraps
+from collections import OrderedDict
+import math
+import threading
+import time
+
+
+class TokenBucket:
+    """Créditos de custo de um usuário em uma rota, repostos a `rate` por segundo até `burst`"""
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, cost, rate, burst):
+        """Consome `cost` créditos. Retorna None ou os segundos até haver créditos suficientes"""
+        now = time.monotonic()
+        self.tokens = min(float(burst), self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return None
+        return (cost - self.tokens) / rate if rate > 0 else 60.0
+
+    def refund(self, cost, burst):
+        self.tokens = min(float(burst), self.tokens + cost)
+
+
+class AdmissionController:
+    """Controle de admissão das rotas caras (projeções, relatórios, operações em lote).
+
+    Cada rota tem um custo (ADMISSION_COSTS sobrepõe o custo do decorator).
+    Uma requisição só começa se:
+    - o usuário tiver créditos no token bucket daquela rota (ADMISSION_RATE
+      por segundo, até ADMISSION_BURST), senão 429 com Retry-After. Cada rota
+      tem o seu bucket: carregar o dashboard inteiro (várias rotas de uma vez)
+      não esgota os créditos de nenhuma delas;
+    - o usuário tiver menos de ADMISSION_USER_CONCURRENCY requisições caras
+      em andamento, senão 429;
+    - a soma dos custos em andamento no processo couber em
+      ADMISSION_CAPACITY. Se não couber, a requisição espera em uma fila de
+      até ADMISSION_QUEUE_SIZE posições por até ADMISSION_QUEUE_TIMEOUT
+      segundos; com a fila cheia ou o tempo esgotado a resposta é 503.
+    Assim um usuário não ocupa todas as threads do servidor com consultas
+    pesadas. Os limites valem por processo, como as sessões.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.capacity = 8
+        self.user_concurrency = 2
+        self.queue_size = 16
+        self.queue_timeout = 5.0
+        self.rate = 1.0
+        self.burst = 20
+        self.costs = {}
+        self.max_buckets = 10000
+        self._in_use = 0
+        self._waiting = 0
+        self._user_inflight = {}
+        self._buckets = OrderedDict()
+        self._condition = threading.Condition()
+
+    def init_app(self, app):
+        self.enabled = app.config.setdefault('ADMISSION_ENABLED', True)
+        self.capacity = app.config.setdefault('ADMISSION_CAPACITY', self.capacity)
+        self.user_concurrency = app.config.setdefault('ADMISSION_USER_CONCURRENCY', self.user_concurrency)
+        self.queue_size = app.config.setdefault('ADMISSION_QUEUE_SIZE', self.queue_size)
+        self.queue_timeout = app.config.setdefault('ADMISSION_QUEUE_TIMEOUT', self.queue_timeout)
+        self.rate = app.config.setdefault('ADMISSION_RATE', self.rate)
+        self.burst = app.config.setdefault('ADMISSION_BURST', self.burst)
+        self.costs = app.config.setdefault('ADMISSION_COSTS', {})
+        app.extensions['admission'] = self
+
+    def cost_for(self, endpoint, default):
+        # Nenhum custo passa da capacidade nem do burst, senão a requisição nunca seria admitida
+        return max(1, min(self.costs.get(endpoint, default), self.capacity, self.burst))
+
+    def _bucket(self, user_id, endpoint):
+        key = (user_id, endpoint)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.burst)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def acquire(self, user_id, endpoint, cost):
+        """Admite a requisição ou retorna a resposta de rejeição (429/503)"""
+        with self._condition:
+            # Requisições na fila também contam para o limite do usuário
+            if self._user_inflight.get(user_id, 0) >= self.user_concurrency:
+                return _reject(429, 'Muitas requisições simultâneas; aguarde as anteriores terminarem', 1)
+
+            bucket = self._bucket(user_id, endpoint)
+            retry_after = bucket.take(cost, self.rate, self.burst)
+            if retry_after is not None:
+                return _reject(429, 'Limite de requisições excedido; tente novamente em instantes', retry_after)
+
+            if self._in_use + cost > self.capacity and not self._wait_for_capacity(user_id, cost):
+                bucket.refund(cost, self.burst)
+                return _reject(503, 'Servidor ocupado; tente novamente em instantes', 1)
+
+            self._in_use += cost
+            self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+            return None
+
+    def _wait_for_capacity(self, user_id, cost):
+        """Espera na fila (com o lock) até a capacidade liberar. False com a fila cheia ou no timeout"""
+        if self._waiting >= self.queue_size:
+            return False
+        self._waiting += 1
+        self._user_inflight[user_id] = self._user_inflight.get(user_id, 0) + 1
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while self._in_use + cost > self.capacity:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+        finally:
+            self._waiting -= 1
+            self._decrement_user(user_id)
+
+    def _decrement_user(self, user_id):
+        inflight = self._user_inflight.get(user_id, 1) - 1
+        if inflight:
+            self._user_inflight[user_id] = inflight
+        else:
+            self._user_inflight.pop(user_id, None)
+
+    def release(self, user_id, cost):
+        with self._condition:
+            self._in_use -= cost
+            self._decrement_user(user_id)
+            self._condition.notify_all()
+
+
+def _reject(status, message, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admission_controlled(cost=1):
+    """Aplica o controle de admissão à rota (usar depois de @login_required)"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            controller = current_app.extensions.get('admission')
+            if controller is None or not controller.enabled:
+                return view(*args, **kwargs)
+
+            user_id = session['user_id']
+            weight = controller.cost_for(request.endpoint, cost)
+            rejected = controller.acquire(user_id, request.endpoint, weight)
+            if rejected is not None:
+                return rejected
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(user_id, weight)
+        return wrapper
+    return decorator
+
+
+admission_controller = AdmissionController()
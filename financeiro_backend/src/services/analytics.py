@@ -0,0 +1,130 @@
+from src.models.user import db
+from src.models.money import from_cents
+from src.services.installments import ledger_rows
+from src.services.category_cache import category_cache
+from datetime import date
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func, and_
+
+ROLLING_WINDOWS = (3, 6, 12)
+
+
+def month_keys(start_month, end_month):
+    """Gera as chaves 'YYYY-MM' de start_month até end_month (inclusive)"""
+    keys = []
+    current = date(start_month.year, start_month.month, 1)
+    last = date(end_month.year, end_month.month, 1)
+    while current <= last:
+        keys.append(current.strftime('%Y-%m'))
+        current += relativedelta(months=1)
+    return keys
+
+
+def rolling_means(values, window):
+    """Média móvel usando somas acumuladas (uma passada por série)"""
+    prefix = [0.0]
+    for value in values:
+        prefix.append(prefix[-1] + value)
+    return [
+        (prefix[i + 1] - prefix[i + 1 - window]) / window if i + 1 >= window else None
+        for i in range(len(values))
+    ]
+
+
+def build_category_trends(user_id, start_date, end_date, category_type=None, outlier_threshold=2.0):
+    """Monta as séries mensais por categoria a partir de uma única consulta agrupada.
+
+    A consulta busca também os 11 meses anteriores ao período para que as médias
+    móveis já estejam completas no primeiro mês retornado.
+    """
+    warmup = max(ROLLING_WINDOWS) - 1
+    query_start = date(start_date.year, start_date.month, 1) - relativedelta(months=warmup)
+
+    ledger = ledger_rows(user_id, query_start, end_date, transaction_type=category_type or None)
+    month_column = func.strftime('%Y-%m', ledger.c.transaction_date)
+    filters = [
+        ledger.c.user_id == user_id,
+        ledger.c.transaction_date >= query_start,
+        ledger.c.transaction_date <= end_date
+    ]
+
+    # Agrupa só pelo id; nome e tipo vêm do cache de categorias
+    rows = db.session.query(
+        ledger.c.category_id,
+        month_column.label('month'),
+        func.sum(ledger.c.amount).label('total')
+    ).filter(and_(*filters)).group_by(ledger.c.category_id, month_column).all()
+
+    all_months = month_keys(query_start, end_date)
+    month_index = {key: i for i, key in enumerate(all_months)}
+    offset = warmup
+
+    # Matriz densa categoria x mês preenchida em uma única passada
+    categories = {}
+    matrix = {}
+    for category_id, month, total in rows:
+        category = category_cache.get(user_id, category_id)
+        if category is None:
+            continue
+        if category_id not in matrix:
+            categories[category_id] = {'id': category_id, 'name': category.name, 'type': category.type}
+            matrix[category_id] = [0.0] * len(all_months)
+        matrix[category_id][month_index[month]] = from_cents(total)
+
+    output_months = all_months[offset:]
+    trends = []
+
+    for category_id, values in matrix.items():
+        visible = values[offset:]
+        if not any(visible):
+            continue
+
+        averages = {
+            f'rolling_{window}m': rolling_means(values, window)[offset:]
+            for window in ROLLING_WINDOWS
+        }
+
+        previous = values[offset - 1:-1] if offset else [None] + values[:-1]
+        deltas = []
+        for current, before in zip(visible, previous):
+            if before is None:
+                deltas.append({'absolute': None, 'percent': None})
+            else:
+                deltas.append({
+                    'absolute': current - before,
+                    'percent': ((current - before) / before * 100) if before else None
+                })
+
+        count = len(visible)
+        mean = sum(visible) / count
+        std = (sum((v - mean) ** 2 for v in visible) / count) ** 0.5
+
+        series = []
+        for i, month in enumerate(output_months):
+            z_score = (visible[i] - mean) / std if std else 0.0
+            point = {
+                'month': month,
+                'total': visible[i],
+                'mom_delta': deltas[i]['absolute'],
+                'mom_delta_percent': deltas[i]['percent'],
+                'z_score': z_score,
+                'is_outlier': abs(z_score) >= outlier_threshold
+            }
+            for key, series_values in averages.items():
+                point[key] = series_values[i]
+            series.append(point)
+
+        trends.append({
+            'category': categories[category_id],
+            'total': sum(visible),
+            'mean': mean,
+            'std_dev': std,
+            'series': series
+        })
+
+    trends.sort(key=lambda item: item['total'], reverse=True)
+
+    return {
+        'months': output_months,
+        'categories': trends
+    }
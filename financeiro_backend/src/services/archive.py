@@ -0,0 +1,123 @@
+from src.models.user import db
+from src.models.transaction import Transaction, transaction_fingerprint
+from src.models.installment_plan import InstallmentPlan
+from src.models.transaction_archive import ArchivedTransaction
+from src.services.installments import ledger_rows
+from src.services.sharding import for_each_shard
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select, func, and_, or_, insert, literal
+
+# Meses fechados mantidos na tabela quente; o restante vai para transaction_archive
+ARCHIVE_AFTER_MONTHS = 24
+
+ARCHIVE_COLUMNS = [
+    'id', 'source_id', 'user_id', 'category_id', 'account_id', 'credit_card_id', 'description',
+    'amount', 'transaction_date', 'payment_type', 'type', 'installments', 'installment_number',
+    'parent_transaction_id', 'created_at', 'is_virtual'
+]
+
+
+def find_archived_duplicate(user_id, transaction_date, dedup_hash):
+    """Transação arquivada (linha da parcela 1) com o mesmo hash de duplicidade, ou None.
+
+    O arquivo não guarda dedup_hash: as transações arquivadas do mesmo dia
+    (índice user_id, transaction_date) são comparadas pelo hash do total da
+    compra, a soma das parcelas, como create_transaction calcula.
+    """
+    candidates = db.session.query(
+        ArchivedTransaction.source_id, ArchivedTransaction.description,
+        ArchivedTransaction.account_id, ArchivedTransaction.credit_card_id
+    ).filter(
+        ArchivedTransaction.user_id == user_id,
+        ArchivedTransaction.transaction_date == transaction_date,
+        ArchivedTransaction.installment_number == 1
+    ).all()
+    if not candidates:
+        return None
+
+    totals = dict(db.session.query(ArchivedTransaction.source_id, func.sum(ArchivedTransaction.amount)).filter(
+        ArchivedTransaction.source_id.in_([candidate.source_id for candidate in candidates])
+    ).group_by(ArchivedTransaction.source_id).all())
+    for candidate in candidates:
+        fingerprint = transaction_fingerprint(
+            transaction_date, int(totals[candidate.source_id]), candidate.description,
+            candidate.account_id, candidate.credit_card_id
+        )
+        if fingerprint == dedup_hash:
+            return db.session.get(ArchivedTransaction, (candidate.source_id, 1))
+    return None
+
+
+def default_archive_cutoff(today=None, months=ARCHIVE_AFTER_MONTHS):
+    """Primeiro dia do mês de `months` meses atrás: tudo antes disso é período fechado"""
+    today = today or date.today()
+    return date(today.year, today.month, 1) - relativedelta(months=months)
+
+
+def _archivable_ids(before, last_id, batch_size):
+    """Próximo lote de transações cuja última parcela é anterior à data de corte.
+
+    Parcelamentos antigos em linhas filhas (sem InstallmentPlan) ficam na
+    tabela quente até serem convertidos (convert-installments).
+    """
+    last_installment = func.date(
+        Transaction.transaction_date,
+        func.printf('+%d months', func.coalesce(InstallmentPlan.installments, 1) - 1)
+    )
+    rows = db.session.query(Transaction.id).outerjoin(
+        InstallmentPlan, InstallmentPlan.transaction_id == Transaction.id
+    ).filter(
+        and_(
+            Transaction.id > last_id,
+            Transaction.parent_transaction_id.is_(None),
+            Transaction.transaction_date < before,
+            or_(Transaction.installments <= 1, InstallmentPlan.id.isnot(None)),
+            last_installment < before.isoformat()
+        )
+    ).order_by(Transaction.id).limit(batch_size).all()
+    return [row.id for row in rows]
+
+
+def archive_shard(before, batch_size=500):
+    """Move para transaction_archive os lançamentos anteriores à data no shard atual.
+
+    Cada lote copia as linhas já expandidas (uma por parcela) com INSERT ...
+    SELECT sobre ledger_rows, remove os planos e as transações e confirma em um
+    único commit; saldos e totais não mudam, só a tabela em que as linhas vivem.
+    """
+    archived = 0
+    rows_written = 0
+    last_id = 0
+
+    while True:
+        ids = _archivable_ids(before, last_id, batch_size)
+        if not ids:
+            break
+
+        ledger = ledger_rows(include_archive=False)
+        rows = select(
+            *[ledger.c[name] for name in ARCHIVE_COLUMNS],
+            literal(datetime.utcnow()).label('archived_at')
+        ).where(ledger.c.source_id.in_(ids))
+        db.session.execute(insert(ArchivedTransaction).from_select(ARCHIVE_COLUMNS + ['archived_at'], rows))
+        # rowcount de INSERT ... SELECT não é confiável no SQLite
+        rows_written += ArchivedTransaction.query.filter(ArchivedTransaction.source_id.in_(ids)).count()
+
+        InstallmentPlan.query.filter(InstallmentPlan.transaction_id.in_(ids)).delete(synchronize_session=False)
+        archived += Transaction.query.filter(Transaction.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        last_id = ids[-1]
+
+    return {'transactions_archived': archived, 'rows_written': rows_written}
+
+
+def archive_transactions(before=None, batch_size=500):
+    """archive_shard em todos os shards (corte padrão: ARCHIVE_AFTER_MONTHS meses atrás)"""
+    before = before or default_archive_cutoff()
+    results = for_each_shard(archive_shard, before, batch_size=batch_size)
+    return {
+        'before': before.isoformat(),
+        'transactions_archived': sum(item['transactions_archived'] for item in results),
+        'rows_written': sum(item['rows_written'] for item in results)
+    }
@@ -0,0 +1,237 @@
+from flask import current_app
+from src.services.sharding import sharding
+from contextlib import closing
+from datetime import datetime
+import os
+import re
+import shutil
+import sqlite3
+import time
+
+# Páginas copiadas por passo da API de backup e pausa entre os passos:
+# cada passo segura o banco só pelo tempo de copiar essas páginas, então as
+# requisições continuam escrevendo entre um passo e outro
+DEFAULT_PAGES_PER_STEP = 256
+DEFAULT_STEP_SLEEP = 0.02
+DEFAULT_RETENTION = 14
+DEFAULT_MAX_RESTARTS = 3
+
+SNAPSHOT_NAME = re.compile(r'^\d{8}-\d{6}$')
+MAIN_DATABASE = 'app.db'
+# Arquivos auxiliares do SQLite que acompanham um banco
+SQLITE_SIDECARS = ['-wal', '-shm', '-journal']
+
+
+def backup_dir():
+    return current_app.config.get('BACKUP_DIR') or os.path.join(os.path.dirname(_main_path()), 'backups')
+
+
+def _main_path():
+    from src.models.user import db
+    return db.engine.url.database
+
+
+def _database_files():
+    """(caminho relativo no snapshot, caminho do banco) de cada arquivo SQLite da aplicação"""
+    files = [(MAIN_DATABASE, _main_path())]
+    router = sharding()
+    for shard in router.existing_shards():
+        files.append((os.path.join('shards', shard + '.db'), os.path.join(router.directory, shard + '.db')))
+    return files
+
+
+class BackupRestarted(Exception):
+    pass
+
+
+def copy_database(source_path, target_path, pages=DEFAULT_PAGES_PER_STEP, sleep=DEFAULT_STEP_SLEEP,
+                  max_restarts=DEFAULT_MAX_RESTARTS):
+    """Copia um banco SQLite em uso com a API de backup online, em passos de `pages` páginas.
+
+    Se outra conexão escrever no banco entre dois passos o SQLite recomeça a
+    cópia do início, então o resultado é sempre um retrato consistente. Com
+    escritas contínuas isso pode não terminar nunca: depois de `max_restarts`
+    reinícios a cópia é refeita em um único passo (o banco fica bloqueado para
+    escrita só durante esse passo). Retorna páginas, bytes, passos, reinícios
+    e duração.
+    """
+    state = {'steps': 0, 'restarts': 0, 'remaining': None}
+
+    def pause(status, remaining, total):
+        state['steps'] += 1
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise BackupRestarted()
+        state['remaining'] = remaining
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    started = time.perf_counter()
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    single_step = pages < 0
+    try:
+        try:
+            source.backup(target, pages=pages, progress=pause)
+        except BackupRestarted:
+            single_step = True
+            source.backup(target, pages=-1)
+            state['steps'] += 1
+        page_size = target.execute('PRAGMA page_size').fetchone()[0]
+        page_count = target.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
+    return {
+        'pages': page_count,
+        'bytes': page_count * page_size,
+        'steps': state['steps'],
+        'restarts': state['restarts'],
+        'single_step': single_step,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def create_snapshot(pages=None, sleep=None, keep=None):
+    """Grava um snapshot de todos os bancos (principal e shards) em BACKUP_DIR/<AAAAMMDD-HHMMSS>.
+
+    Os arquivos são escritos em um diretório temporário e verificados com
+    quick_check antes de o snapshot receber o nome final; depois os snapshots
+    além da retenção são removidos.
+    """
+    config = current_app.config
+    pages = pages or config.get('BACKUP_PAGES_PER_STEP', DEFAULT_PAGES_PER_STEP)
+    sleep = config.get('BACKUP_STEP_SLEEP', DEFAULT_STEP_SLEEP) if sleep is None else sleep
+    keep = keep or config.get('BACKUP_RETENTION', DEFAULT_RETENTION)
+    max_restarts = config.get('BACKUP_MAX_RESTARTS', DEFAULT_MAX_RESTARTS)
+
+    name = datetime.now().strftime('%Y%m%d-%H%M%S')
+    root = backup_dir()
+    target_dir = os.path.join(root, name)
+    if os.path.exists(target_dir):
+        raise ValueError(f'Snapshot {name} já existe')
+    partial_dir = target_dir + '.partial'
+    shutil.rmtree(partial_dir, ignore_errors=True)
+
+    started = time.perf_counter()
+    files = []
+    try:
+        for relative_path, source_path in _database_files():
+            target_path = os.path.join(partial_dir, relative_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            result = copy_database(source_path, target_path, pages=pages, sleep=sleep, max_restarts=max_restarts)
+            with closing(sqlite3.connect(target_path)) as connection:
+                check = connection.execute('PRAGMA quick_check').fetchone()[0]
+            if check != 'ok':
+                raise RuntimeError(f'Cópia inválida de {relative_path}: {check}')
+            files.append({'file': relative_path, **result})
+        os.rename(partial_dir, target_dir)
+    except Exception:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+
+    seconds = time.perf_counter() - started
+    total_bytes = sum(item['bytes'] for item in files)
+    return {
+        'snapshot': name,
+        'path': target_dir,
+        'files': files,
+        'bytes': total_bytes,
+        'seconds': seconds,
+        'throughput_mb_s': total_bytes / 1024 / 1024 / seconds if seconds else 0.0,
+        'removed': rotate_snapshots(keep)
+    }
+
+
+def list_snapshots():
+    """Snapshots completos, do mais recente para o mais antigo"""
+    root = backup_dir()
+    if not os.path.isdir(root):
+        return []
+    names = sorted((name for name in os.listdir(root) if SNAPSHOT_NAME.match(name)), reverse=True)
+    result = []
+    for name in names:
+        path = os.path.join(root, name)
+        size = sum(
+            os.path.getsize(os.path.join(directory, file))
+            for directory, _, filenames in os.walk(path) for file in filenames
+        )
+        result.append({
+            'snapshot': name,
+            'created_at': datetime.strptime(name, '%Y%m%d-%H%M%S').isoformat(),
+            'bytes': size
+        })
+    return result
+
+
+def rotate_snapshots(keep):
+    """Remove os snapshots mais antigos, mantendo os `keep` mais recentes"""
+    removed = []
+    for item in list_snapshots()[keep:]:
+        shutil.rmtree(os.path.join(backup_dir(), item['snapshot']))
+        removed.append(item['snapshot'])
+    return removed
+
+
+def restore_snapshot(name, safety_snapshot=True):
+    """Restaura um snapshot sobre os bancos em uso.
+
+    A cópia de volta também usa a API de backup (em um único passo, para que
+    nenhuma conexão veja o banco pela metade). Por padrão um snapshot do estado
+    atual é gravado antes, para permitir desfazer a restauração. Shards em uso
+    que não estão no snapshot (usuários criados depois dele) são movidos para
+    BACKUP_DIR/<nome>.displaced, ao lado do snapshot de segurança, e o
+    resultado é exatamente o conjunto de bancos do snapshot.
+    """
+    if not SNAPSHOT_NAME.match(name or ''):
+        raise ValueError(f'Nome de snapshot inválido: {name}')
+    source_dir = os.path.join(backup_dir(), name)
+    if not os.path.isdir(source_dir):
+        raise ValueError(f'Snapshot {name} não encontrado')
+
+    from src.models.user import db
+    router = sharding()
+    targets = {MAIN_DATABASE: _main_path()}
+    shard_dir = os.path.join(source_dir, 'shards')
+    if os.path.isdir(shard_dir):
+        if not router.enabled:
+            raise ValueError('O snapshot tem shards; defina SHARDING_MODE para restaurá-lo')
+        for file in sorted(os.listdir(shard_dir)):
+            targets[os.path.join('shards', file)] = os.path.join(router.directory, file)
+
+    safety = create_snapshot(keep=len(list_snapshots()) + 1)['snapshot'] if safety_snapshot else None
+
+    # Conexões abertas do pool guardariam páginas antigas em cache
+    db.session.remove()
+    db.engine.dispose()
+    router.dispose_engines()
+
+    started = time.perf_counter()
+    displaced = []
+    stale = [shard for shard in router.existing_shards()
+             if os.path.join('shards', shard + '.db') not in targets]
+    if stale:
+        displaced_dir = os.path.join(
+            backup_dir(), (safety or datetime.now().strftime('%Y%m%d-%H%M%S')) + '.displaced', 'shards'
+        )
+        os.makedirs(displaced_dir, exist_ok=True)
+        for shard in stale:
+            for suffix in [''] + SQLITE_SIDECARS:
+                path = os.path.join(router.directory, shard + '.db' + suffix)
+                if os.path.exists(path):
+                    shutil.move(path, os.path.join(displaced_dir, os.path.basename(path)))
+            displaced.append(os.path.join('shards', shard + '.db'))
+
+    files = []
+    for relative_path, target_path in targets.items():
+        result = copy_database(os.path.join(source_dir, relative_path), target_path, pages=-1, sleep=0)
+        files.append({'file': relative_path, **result})
+    return {
+        'snapshot': name,
+        'safety_snapshot': safety,
+        'files': files,
+        'displaced': displaced,
+        'bytes': sum(item['bytes'] for item in files),
+        'seconds': time.perf_counter() - started
+    }
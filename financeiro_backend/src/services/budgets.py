@@ -0,0 +1,124 @@
+from src.models.user import db
+from src.models.budget import Budget, BudgetSpend
+from src.models.money import from_cents
+from src.services.category_cache import category_cache
+from src.services.installments import ledger_rows
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from datetime import date
+
+# Percentuais do limite que geram alerta quando uma escrita os ultrapassa
+ALERT_THRESHOLDS = [80, 100]
+
+
+def transaction_entries(transaction):
+    """(data, valor) de cada lançamento da transação: parcelas do plano ou linhas filhas antigas"""
+    plan = transaction.installment_plan
+    if plan is not None:
+        entries = [(installment_date, amount) for _, installment_date, amount in plan.iter_installments()]
+    else:
+        entries = [(transaction.transaction_date, transaction.amount)]
+    return entries + [(child.transaction_date, child.amount) for child in transaction.child_transactions]
+
+
+def _increment(budget_id, period_start, delta):
+    """Soma delta ao contador do período com um único upsert. Retorna o novo total"""
+    statement = insert(BudgetSpend).values(budget_id=budget_id, period_start=period_start, spent=delta)
+    statement = statement.on_conflict_do_update(
+        index_elements=['budget_id', 'period_start'],
+        set_={'spent': BudgetSpend.spent + statement.excluded.spent}
+    ).returning(BudgetSpend.spent)
+    return db.session.execute(statement).scalar()
+
+
+def _crossed_thresholds(budget, period_start, before, after):
+    """Alertas dos limites ultrapassados na escrita (de abaixo para acima do limite)"""
+    limit = budget.limit_amount
+    alerts = []
+    for threshold in ALERT_THRESHOLDS:
+        # Comparação em centavos inteiros (sem arredondamento)
+        if before * 100 < limit * threshold <= after * 100:
+            category = category_cache.get(budget.user_id, budget.category_id)
+            alerts.append({
+                'budget_id': budget.id,
+                'category_id': budget.category_id,
+                'category': category.name if category else None,
+                'period': budget.period,
+                'period_start': period_start.isoformat(),
+                'limit_amount': from_cents(limit),
+                'spent': from_cents(after),
+                'threshold': threshold / 100
+            })
+    return alerts
+
+
+def record_spend(user_id, category_id, entries, sign=1):
+    """Aplica os lançamentos de uma despesa aos contadores dos orçamentos da categoria.
+
+    Custo constante por lançamento (busca pela chave única e um upsert), sem
+    reagregar Transaction. Não faz commit; retorna os alertas de limite
+    cruzado para quem chamou publicar depois do commit.
+    """
+    alerts = []
+    for budget in Budget.query.filter_by(user_id=user_id, category_id=category_id).all():
+        deltas = {}
+        for entry_date, amount in entries:
+            period_start, _ = budget.period_bounds(entry_date)
+            deltas[period_start] = deltas.get(period_start, 0) + amount * sign
+        for period_start, delta in deltas.items():
+            spent = _increment(budget.id, period_start, delta)
+            alerts.extend(_crossed_thresholds(budget, period_start, spent - delta, spent))
+    return alerts
+
+
+def rebuild_counters(budget):
+    """Recalcula os contadores do orçamento a partir dos lançamentos (criação, alteração e conciliação)"""
+    BudgetSpend.query.filter_by(budget_id=budget.id).delete(synchronize_session=False)
+
+    ledger = ledger_rows(budget.user_id, transaction_type='expense')
+    period = func.strftime('%Y-01-01' if budget.period == 'yearly' else '%Y-%m-01', ledger.c.transaction_date)
+    rows = db.session.query(period, func.sum(ledger.c.amount))\
+        .filter(ledger.c.category_id == budget.category_id).group_by(period).all()
+    for period_start, total in rows:
+        db.session.add(BudgetSpend(budget_id=budget.id, period_start=date.fromisoformat(period_start), spent=total))
+    return len(rows)
+
+
+def rebuild_user_counters(user_id):
+    """rebuild_counters de todos os orçamentos do usuário (usado após alterações em lote)"""
+    budgets = Budget.query.filter_by(user_id=user_id).all()
+    for budget in budgets:
+        rebuild_counters(budget)
+    return len(budgets)
+
+
+def budget_utilization(user_id, day=None):
+    """Utilização de cada orçamento no período que contém a data, lida apenas dos contadores"""
+    day = day or date.today()
+    budgets = Budget.query.filter_by(user_id=user_id).order_by(Budget.id).all()
+    periods = {budget.id: budget.period_bounds(day) for budget in budgets}
+
+    spent = {}
+    if budgets:
+        rows = db.session.query(BudgetSpend.budget_id, BudgetSpend.period_start, BudgetSpend.spent).filter(
+            BudgetSpend.budget_id.in_(periods.keys()),
+            BudgetSpend.period_start.in_({start for start, _ in periods.values()})
+        ).all()
+        spent = {(budget_id, period_start): value for budget_id, period_start, value in rows}
+
+    result = []
+    for budget in budgets:
+        start, end = periods[budget.id]
+        category = category_cache.get(user_id, budget.category_id)
+        limit = budget.limit_amount
+        value = spent.get((budget.id, start)) or 0
+        result.append({
+            **budget.to_dict(),
+            'category': category.name if category else None,
+            'period_start': start.isoformat(),
+            'period_end': end.isoformat(),
+            'spent': from_cents(value),
+            'remaining': from_cents(limit - value),
+            'utilization': value / limit if limit else 0.0
+        })
+    return result
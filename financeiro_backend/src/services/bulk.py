@@ -0,0 +1,155 @@
+from src.models.user import db
+from src.models.account import Account
+from src.models.credit_card import CreditCard
+from src.models.transaction import Transaction
+from src.models.installment_plan import InstallmentPlan
+from src.models.money import Money
+from src.services.ledger import balance_deltas
+from src.services.budgets import rebuild_user_counters
+from src.services.sync import record_changes
+from datetime import datetime
+from sqlalchemy import func, and_, select, bindparam, case
+
+BULK_ACTIONS = ['delete', 'recategorize', 'move_account']
+
+
+def group_root():
+    """Identificador do parcelamento: a transação principal de cada grupo"""
+    return func.coalesce(Transaction.parent_transaction_id, Transaction.id)
+
+
+def selection_filter(user_id, criteria):
+    """Filtro set-based que seleciona os lançamentos e os parcelamentos completos
+
+    Uma parcela selecionada traz junto a transação principal e as demais
+    parcelas, da mesma forma que delete_transaction trata os parcelamentos.
+    """
+    roots = select(group_root()).where(Transaction.user_id == user_id, *criteria)
+    return and_(Transaction.user_id == user_id, group_root().in_(roots))
+
+
+def aggregate_selection(selection):
+    """Totais da seleção agrupados pelo que afeta os saldos (uma consulta)
+
+    Transações com InstallmentPlan contam pelo total do parcelamento.
+    """
+    return db.session.query(
+        Transaction.payment_type,
+        Transaction.account_id,
+        Transaction.credit_card_id,
+        Transaction.type,
+        func.sum(func.coalesce(InstallmentPlan.total_amount, Transaction.amount)),
+        func.count(Transaction.id)
+    ).outerjoin(InstallmentPlan, InstallmentPlan.transaction_id == Transaction.id)\
+        .filter(selection).group_by(
+        Transaction.payment_type,
+        Transaction.account_id,
+        Transaction.credit_card_id,
+        Transaction.type
+    ).all()
+
+
+def accumulate(deltas, key, value):
+    if key is not None and value:
+        deltas[key] = deltas.get(key, 0) + value
+
+
+def apply_balance_deltas(account_deltas, card_deltas):
+    """Um UPDATE (executemany) por tabela, com uma linha por conta/cartão afetado"""
+    now = datetime.utcnow()
+    account_table = Account.__table__
+    card_table = CreditCard.__table__
+
+    if account_deltas:
+        db.session.execute(
+            account_table.update()
+            .where(account_table.c.id == bindparam('target_id'))
+            .values(balance=account_table.c.balance + bindparam('delta', type_=Money()), updated_at=now),
+            [{'target_id': key, 'delta': value} for key, value in account_deltas.items()]
+        )
+    if card_deltas:
+        db.session.execute(
+            card_table.update()
+            .where(card_table.c.id == bindparam('target_id'))
+            .values(current_balance=card_table.c.current_balance + bindparam('delta', type_=Money()), updated_at=now),
+            [{'target_id': key, 'delta': value} for key, value in card_deltas.items()]
+        )
+
+
+def bulk_apply(user_id, criteria, action, category=None, account_id=None, credit_card_id=None):
+    """Executa a ação em lote com um número constante de comandos SQL"""
+    selection = selection_filter(user_id, criteria)
+    groups = aggregate_selection(selection)
+    affected = sum(count for *_, count in groups)
+
+    account_deltas = {}
+    card_deltas = {}
+    table = Transaction.__table__
+    target_ids = select(Transaction.id).where(selection)
+    # Ids lidos antes da escrita para o log de sincronização
+    selected_ids = db.session.execute(target_ids).scalars().all()
+
+    if action == 'delete':
+        for payment_type, group_account, group_card, category_type, total, _ in groups:
+            account_delta, card_delta = balance_deltas(category_type, payment_type, total)
+            accumulate(account_deltas, group_account, -account_delta)
+            accumulate(card_deltas, group_card, -card_delta)
+        plans = InstallmentPlan.__table__
+        db.session.execute(plans.delete().where(plans.c.transaction_id.in_(target_ids)))
+        db.session.execute(table.delete().where(table.c.id.in_(target_ids)))
+
+    elif action == 'recategorize':
+        for payment_type, group_account, group_card, category_type, total, _ in groups:
+            if category_type == category.type:
+                continue
+            old_account, old_card = balance_deltas(category_type, payment_type, total)
+            new_account, new_card = balance_deltas(category.type, payment_type, total)
+            accumulate(account_deltas, group_account, new_account - old_account)
+            accumulate(card_deltas, group_card, new_card - old_card)
+        db.session.execute(table.update().where(table.c.id.in_(target_ids)).values(category_id=category.id, type=category.type))
+
+    elif action == 'move_account':
+        for payment_type, group_account, group_card, category_type, total, _ in groups:
+            account_delta, card_delta = balance_deltas(category_type, payment_type, total)
+            if account_id and payment_type in ['debit', 'pix'] and group_account != account_id:
+                accumulate(account_deltas, group_account, -account_delta)
+                accumulate(account_deltas, account_id, account_delta)
+            if credit_card_id and payment_type == 'credit_card' and group_card != credit_card_id:
+                accumulate(card_deltas, group_card, -card_delta)
+                accumulate(card_deltas, credit_card_id, card_delta)
+
+        # Um único UPDATE: débito/PIX trocam de conta e cartão troca de cartão
+        values = {}
+        if account_id:
+            values['account_id'] = case(
+                (table.c.payment_type.in_(['debit', 'pix']), account_id),
+                else_=table.c.account_id
+            )
+        if credit_card_id:
+            values['credit_card_id'] = case(
+                (table.c.payment_type == 'credit_card', credit_card_id),
+                else_=table.c.credit_card_id
+            )
+        db.session.execute(table.update().where(table.c.id.in_(target_ids)).values(**values))
+
+    else:
+        raise ValueError(f'Ação inválida: {action}')
+
+    apply_balance_deltas(account_deltas, card_deltas)
+    if action in ['delete', 'recategorize']:
+        # Exclusões e trocas de categoria em lote: contadores dos orçamentos recalculados
+        rebuild_user_counters(user_id)
+    if action == 'delete':
+        record_changes(user_id, deleted={'transaction': selected_ids},
+                       account=account_deltas.keys(), credit_card=card_deltas.keys())
+    else:
+        record_changes(user_id, transaction=selected_ids,
+                       account=account_deltas.keys(), credit_card=card_deltas.keys())
+    db.session.commit()
+    db.session.expire_all()
+
+    return {
+        'affected': affected,
+        'accounts_updated': sorted(account_deltas.keys()),
+        'credit_cards_updated': sorted(card_deltas.keys())
+    }
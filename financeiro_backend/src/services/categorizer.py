@@ -0,0 +1,242 @@
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.transaction_archive import ArchivedTransaction
+from src.models.change_log import SyncVersion
+from src.services.category_cache import category_cache
+from collections import OrderedDict
+from sqlalchemy import func, union_all, select
+import math
+import threading
+import unicodedata
+import zlib
+
+# Espaço dos n-gramas: cada termo vira um inteiro de 20 bits (colisões são raras
+# no vocabulário de um usuário e só somam contagens de termos diferentes)
+FEATURE_BITS = 20
+FEATURE_MASK = (1 << FEATURE_BITS) - 1
+# Descrições distintas (as mais recentes) lidas ao montar o índice de um usuário
+MAX_TRAINING_DESCRIPTIONS = 20000
+# Suavização de Laplace das contagens
+SMOOTHING = 1.0
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+
+def _normalize(text):
+    """Minúsculas, sem acentos e só letras, números e espaços"""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ''.join(char if char.isalnum() else ' ' for char in text)
+
+
+def description_features(description):
+    """Termos hasheados da descrição: palavras, pares de palavras e trigramas de letras.
+
+    Números soltos (datas, parcelas, finais de cartão) são ignorados; os
+    trigramas fazem "UBER *TRIP" e "Uber Trip 1234" caírem nos mesmos termos.
+    """
+    words = [word for word in _normalize(description).split() if not word.isdigit()]
+    terms = ['w:' + word for word in words]
+    terms.extend(f'b:{first} {second}' for first, second in zip(words, words[1:]))
+    for word in words:
+        padded = f' {word} '
+        terms.extend('c:' + padded[i:i + 3] for i in range(len(padded) - 2))
+    return [zlib.crc32(term.encode()) & FEATURE_MASK for term in terms]
+
+
+class UserIndex:
+    """Contagens termo -> categoria de um usuário (Naive Bayes multinomial)"""
+    __slots__ = ('version', 'counts', 'term_totals', 'documents', 'total_documents')
+
+    def __init__(self, version=0):
+        self.version = version  # SyncVersion.version refletida nas contagens
+        self.counts = {}  # termo -> {category_id: contagem}
+        self.term_totals = {}  # category_id -> total de termos
+        self.documents = {}  # category_id -> descrições
+        self.total_documents = 0
+
+    def add(self, features, category_id, weight=1):
+        for feature in features:
+            by_category = self.counts.setdefault(feature, {})
+            count = by_category.get(category_id, 0) + weight
+            if count > 0:
+                by_category[category_id] = count
+            else:
+                by_category.pop(category_id, None)
+                if not by_category:
+                    del self.counts[feature]
+        self.term_totals[category_id] = max(0, self.term_totals.get(category_id, 0) + weight * len(features))
+        documents = self.documents.get(category_id, 0) + weight
+        if documents > 0:
+            self.documents[category_id] = documents
+        else:
+            self.documents.pop(category_id, None)
+            self.term_totals.pop(category_id, None)
+        self.total_documents = max(0, self.total_documents + weight)
+
+    def rank(self, features, candidates):
+        """[(category_id, confiança)] em ordem decrescente; vazio sem nenhum termo conhecido.
+
+        A confiança é a probabilidade entre os candidatos multiplicada pela raiz
+        da fração dos termos da descrição já vistos no histórico (uma palavra
+        nova reduz a confiança sem anular um termo forte como "uber").
+        """
+        known = [self.counts[feature] for feature in features if feature in self.counts]
+        if not known:
+            return []
+        candidates = [category_id for category_id in candidates if category_id in self.documents]
+        if not candidates:
+            return []
+
+        vocabulary = len(self.counts)
+        scores = {}
+        for category_id in candidates:
+            denominator = math.log(self.term_totals[category_id] + SMOOTHING * vocabulary)
+            score = math.log(self.documents[category_id] / self.total_documents)
+            for by_category in known:
+                score += math.log(by_category.get(category_id, 0) + SMOOTHING) - denominator
+            scores[category_id] = score
+
+        # Probabilidades normalizadas entre os candidatos (softmax dos logs)
+        best = max(scores.values())
+        weights = {category_id: math.exp(score - best) for category_id, score in scores.items()}
+        total = sum(weights.values())
+        coverage = math.sqrt(len(known) / len(features))
+        return sorted(((category_id, weight / total * coverage) for category_id, weight in weights.items()),
+                      key=lambda item: item[1], reverse=True)
+
+
+def _current_version(user_id):
+    return db.session.query(SyncVersion.version).filter_by(user_id=user_id).scalar() or 0
+
+
+def _training_rows(user_id):
+    """(descrição, category_id, ocorrências) das transações do usuário, inclusive arquivadas.
+
+    Conta cada transação uma vez (a principal, sem as parcelas).
+    """
+    hot = select(
+        Transaction.description.label('description'),
+        Transaction.category_id.label('category_id'),
+        Transaction.transaction_date.label('transaction_date')
+    ).where(Transaction.user_id == user_id, Transaction.parent_transaction_id.is_(None))
+    archived = select(
+        ArchivedTransaction.description,
+        ArchivedTransaction.category_id,
+        ArchivedTransaction.transaction_date
+    ).where(ArchivedTransaction.user_id == user_id, ArchivedTransaction.installment_number == 1)
+    source = union_all(hot, archived).subquery()
+    return db.session.query(
+        source.c.description, source.c.category_id, func.count()
+    ).group_by(source.c.description, source.c.category_id)\
+        .order_by(func.max(source.c.transaction_date).desc())\
+        .limit(MAX_TRAINING_DESCRIPTIONS).all()
+
+
+class Categorizer:
+    """Sugere a categoria de uma descrição a partir do histórico do usuário.
+
+    O índice de um usuário é montado com uma consulta agrupada e guarda a
+    versão de sincronização do usuário (SyncVersion.version) em que foi lido.
+    Cada uso confere essa versão no banco: escritas de outro processo a movem
+    e o índice é remontado. As escritas deste processo chegam por learn()/
+    forget() com a versão gravada por record_changes: se o índice estava na
+    versão anterior, as contagens são ajustadas sem novo treino; senão o
+    índice é descartado. Alterações em massa chamam invalidate(). O cache é
+    limitado aos max_users usuários usados mais recentemente.
+
+    Um índice cuja versão mudou durante a consulta de treino não é guardado:
+    a consulta pode ter visto só parte das escritas.
+    """
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, user_id):
+        version = _current_version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user_id)
+                return entry
+
+        entry = UserIndex(version)
+        for description, category_id, occurrences in _training_rows(user_id):
+            entry.add(description_features(description), category_id, occurrences)
+        if _current_version(user_id) != version:
+            return entry
+
+        with self._lock:
+            current = self._entries.get(user_id)
+            # Outra thread pode ter montado o mesmo usuário (ou aplicado um learn()) enquanto isso
+            if current is None or current.version < version:
+                self._entries[user_id] = entry
+            entry = self._entries[user_id]
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _update(self, user_id, changes, version):
+        """Aplica [(descrição, category_id, peso)] da escrita que gravou `version`"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            if version is None or entry.version != version - 1:
+                # Houve outras escritas (ou o índice já inclui esta): remonta no próximo uso
+                del self._entries[user_id]
+                return
+            for description, category_id, weight in changes:
+                entry.add(description_features(description), category_id, weight)
+            entry.version = version
+
+    def learn(self, user_id, description, category_id, version=None):
+        self._update(user_id, [(description, category_id, 1)], version)
+
+    def learn_many(self, user_id, items, version=None):
+        """learn() de vários (descrição, category_id) gravados na mesma versão"""
+        self._update(user_id, [(description, category_id, 1) for description, category_id in items], version)
+
+    def forget(self, user_id, description, category_id, version=None):
+        self._update(user_id, [(description, category_id, -1)], version)
+
+    def suggest_many(self, user_id, descriptions, category_type=None, limit=3):
+        """Sugestões para várias descrições com o mesmo índice (uma montagem no máximo)"""
+        entry = self._load(user_id)
+        categories = [
+            category for category in category_cache.all(user_id)
+            if category_type is None or category.type == category_type
+        ]
+        by_id = {category.id: category for category in categories}
+
+        results = []
+        with self._lock:
+            for description in descriptions:
+                ranking = entry.rank(description_features(description), by_id.keys())[:limit]
+                results.append([
+                    {
+                        'category_id': category_id,
+                        'name': by_id[category_id].name,
+                        'type': by_id[category_id].type,
+                        'confidence': round(probability, 4)
+                    }
+                    for category_id, probability in ranking
+                ])
+        return results
+
+    def suggest(self, user_id, description, category_type=None, limit=3):
+        """Categorias mais prováveis para a descrição (lista vazia sem histórico parecido)"""
+        return self.suggest_many(user_id, [description], category_type, limit)[0]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+categorizer = Categorizer()
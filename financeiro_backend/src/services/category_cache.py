@@ -0,0 +1,128 @@
+from flask import g, has_request_context
+from src.models.user import db
+from src.models.category import Category
+from sqlalchemy import func
+from collections import OrderedDict, namedtuple
+import threading
+
+CategoryInfo = namedtuple('CategoryInfo', ['id', 'name', 'type', 'is_default'])
+
+
+def _version(count, updated_at, max_id):
+    return (count or 0, updated_at, max_id)
+
+
+class UserCategories:
+    """Mapas em memória das categorias de um usuário"""
+
+    def __init__(self, categories, version):
+        self.version = version
+        self.by_id = {category.id: category for category in categories}
+        self.by_key = {(category.name, category.type): category.id for category in categories}
+        self.ids_by_type = {}
+        for category in categories:
+            self.ids_by_type.setdefault(category.type, []).append(category.id)
+
+
+class CategoryCache:
+    """Cache por usuário das categorias (id -> nome/tipo e (nome, tipo) -> id).
+
+    Os mapas de um usuário são carregados com uma única consulta e guardam a
+    versão das categorias lidas: (contagem, maior updated_at, maior id). Antes
+    de usar os mapas a versão é conferida no banco (agregado coberto pelo
+    índice ix_category_user_updated), uma vez por requisição ou a cada acesso
+    fora delas; criações, alterações e exclusões feitas por outro processo
+    mudam a versão e os mapas são relidos. invalidate() descarta os mapas do
+    processo logo após uma escrita. O cache é limitado aos max_users usuários
+    usados mais recentemente.
+    """
+
+    def __init__(self, max_users=1024):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _current_version(self, user_id):
+        row = db.session.query(
+            func.count(Category.id), func.max(Category.updated_at), func.max(Category.id)
+        ).filter(Category.user_id == user_id).one()
+        return _version(*row)
+
+    def _checked(self):
+        """Usuários com a versão já conferida nesta requisição (None fora de requisições)"""
+        if not has_request_context():
+            return None
+        return g.setdefault('category_cache_checked', set())
+
+    def _load(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+
+        checked = self._checked()
+        if entry is not None and checked is not None and user_id in checked:
+            return entry
+        if entry is not None and entry.version == self._current_version(user_id):
+            if checked is not None:
+                checked.add(user_id)
+            return entry
+
+        rows = Category.query.with_entities(
+            Category.id, Category.name, Category.type, Category.is_default, Category.updated_at
+        ).filter_by(user_id=user_id).all()
+        version = _version(
+            len(rows),
+            max((row.updated_at for row in rows if row.updated_at is not None), default=None),
+            max((row.id for row in rows), default=None)
+        )
+        entry = UserCategories([CategoryInfo(*row[:4]) for row in rows], version)
+        if checked is not None:
+            checked.add(user_id)
+
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, user_id, category_id):
+        """Categoria do usuário pelo id (None se não existir)"""
+        try:
+            category_id = int(category_id)
+        except (TypeError, ValueError):
+            return None
+        return self._load(user_id).by_id.get(category_id)
+
+    def find(self, user_id, name, category_type):
+        """Id da categoria com o nome e tipo informados (None se não existir)"""
+        return self._load(user_id).by_key.get((name, category_type))
+
+    def ids_by_type(self, user_id, category_type):
+        return list(self._load(user_id).ids_by_type.get(category_type, []))
+
+    def all(self, user_id):
+        return list(self._load(user_id).by_id.values())
+
+    def names(self, user_id):
+        return {category.id: category.name for category in self._load(user_id).by_id.values()}
+
+    def types(self, user_id):
+        return {category.id: category.type for category in self._load(user_id).by_id.values()}
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+        checked = self._checked()
+        if checked is not None:
+            checked.discard(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if has_request_context():
+            g.pop('category_cache_checked', None)
+
+
+category_cache = CategoryCache()
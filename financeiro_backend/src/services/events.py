@@ -0,0 +1,155 @@
+from collections import deque
+import json
+import queue
+import threading
+import time
+from src.models.money import from_cents
+
+# Eventos recentes guardados por usuário para reenvio após reconexão (Last-Event-ID)
+HISTORY_SIZE = 100
+# Histórico e sequência de um usuário sem assinantes são descartados após este
+# tempo sem eventos (segundos); a varredura roda no máximo uma vez por EVICTION_INTERVAL
+HISTORY_TTL = 600
+EVICTION_INTERVAL = 60
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(self, broker, user_id):
+        self.broker = broker
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Pub/sub em memória: cada usuário recebe apenas os próprios eventos.
+
+    Os eventos são pequenos deltas (novo saldo, resumo da transação criada)
+    publicados depois do commit pelas rotas de escrita. Assinantes lentos não
+    bloqueiam quem publica: quando a fila enche, o assinante é marcado e
+    recebe um evento 'resync' para recarregar os dados. Os eventos são locais
+    ao processo.
+
+    Usuários sem assinantes e sem eventos há HISTORY_TTL segundos têm o
+    histórico descartado. A sequência recomeça acima de todas as já
+    descartadas: um cliente que reconecta com um id antigo recebe 'resync'.
+    """
+
+    def __init__(self, history_ttl=HISTORY_TTL):
+        self.history_ttl = history_ttl
+        self._subscribers = {}
+        self._history = {}
+        self._sequences = {}
+        self._published_at = {}
+        # Maior sequência descartada: início das sequências recriadas
+        self._sequence_floor = 0
+        self._next_eviction = 0.0
+        self._lock = threading.Lock()
+
+    def _evict_idle(self, now):
+        """Descarta histórico e sequência dos usuários ociosos (chamado com o lock)"""
+        if now < self._next_eviction:
+            return
+        self._next_eviction = now + EVICTION_INTERVAL
+        cutoff = now - self.history_ttl
+        for user_id in [user_id for user_id, published_at in self._published_at.items()
+                        if published_at <= cutoff and user_id not in self._subscribers]:
+            self._sequence_floor = max(self._sequence_floor, self._sequences.pop(user_id, 0))
+            self._history.pop(user_id, None)
+            del self._published_at[user_id]
+
+    def subscribe(self, user_id, last_event_id=None):
+        """Registra um assinante; devolve (assinatura, eventos perdidos desde last_event_id)"""
+        subscription = Subscription(self, user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            missed = []
+            if last_event_id is not None:
+                history = self._history.get(user_id, ())
+                latest = self._sequences.get(user_id, self._sequence_floor)
+                oldest = history[0]['id'] if history else latest + 1
+                if last_event_id > latest or oldest > last_event_id + 1:
+                    # Histórico não cobre o intervalo (ou o servidor reiniciou): o cliente recarrega
+                    missed = [{'id': latest, 'event': 'resync', 'data': {}}]
+                else:
+                    missed = [event for event in history if event['id'] > last_event_id]
+        return subscription, missed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+            self._evict_idle(time.monotonic())
+
+    def publish(self, user_id, event_type, data):
+        with self._lock:
+            now = time.monotonic()
+            self._evict_idle(now)
+            # Ids sequenciais por usuário, usados para detectar eventos perdidos
+            self._sequences[user_id] = self._sequences.get(user_id, self._sequence_floor) + 1
+            event = {'id': self._sequences[user_id], 'event': event_type, 'data': data}
+            self._history.setdefault(user_id, deque(maxlen=HISTORY_SIZE)).append(event)
+            self._published_at[user_id] = now
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            if subscription.overflowed:
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+        return event
+
+    def latest_id(self, user_id):
+        with self._lock:
+            return self._sequences.get(user_id, self._sequence_floor)
+
+    def subscriber_count(self, user_id=None):
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+def format_sse(event):
+    """Serializa um evento no formato text/event-stream"""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+def transaction_summary(transaction):
+    """Resumo da transação no mesmo formato de recent_transactions do dashboard"""
+    return {
+        'id': transaction.id,
+        'description': transaction.description,
+        'amount': from_cents(transaction.amount),
+        'type': transaction.type,
+        'date': transaction.transaction_date.isoformat(),
+        'payment_type': transaction.payment_type,
+        'installment_info': f"{transaction.installment_number}/{transaction.installments}" if transaction.installments > 1 else None
+    }
+
+
+def balances_delta(accounts=(), credit_cards=()):
+    """Saldos atualizados das contas/cartões afetados por uma escrita"""
+    return {
+        'accounts': [{'id': account.id, 'balance': from_cents(account.balance)} for account in accounts if account],
+        'credit_cards': [
+            {'id': card.id, 'current_balance': from_cents(card.current_balance)} for card in credit_cards if card
+        ]
+    }
+
+
+event_broker = EventBroker()
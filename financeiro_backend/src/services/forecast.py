@@ -0,0 +1,267 @@
+from src.models.user import db
+from src.models.money import from_cents
+from src.services.recurring import virtual_occurrences
+from src.services.read_models import account_balance_total, card_rows, rule_rows
+from src.services.installments import ledger_rows
+from datetime import datetime, date, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import func
+
+DEFAULT_INVOICE_DUE_DAYS = 10
+DEFAULT_AVERAGE_MONTHS = 3
+MAX_INVOICE_LOOKBACK_MONTHS = 2
+# Limites dos parâmetros da API: o custo da projeção cresce com os meses
+MAX_PROJECTION_MONTHS = 120
+MAX_AVERAGE_MONTHS = 24
+
+WHAT_IF_DEFAULTS = {
+    'starting_balance': None,
+    'income_change_pct': 0.0,
+    'expense_change_pct': 0.0,
+    'extra_monthly_income': 0.0,
+    'extra_monthly_expense': 0.0,
+    'include_averages': True,
+    'include_recurring': True,
+    'invoice_due_days': DEFAULT_INVOICE_DUE_DAYS,
+    'exclude_rule_ids': [],
+    'events': []
+}
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def month_end(value):
+    return date(value.year, value.month, 1) + relativedelta(months=1, days=-1)
+
+
+class ForecastInputs:
+    """Dados do usuário carregados uma única vez para o cálculo da previsão.
+
+    O motor trabalha apenas sobre estes valores em memória, então vários
+    cenários (what-if) podem ser simulados sem novas consultas ao banco.
+    """
+
+    def __init__(self, today, months, average_months=DEFAULT_AVERAGE_MONTHS):
+        self.today = today
+        self.months = months
+        self.average_months = average_months
+        self.current_balance = 0.0
+        self.cards = {}
+        self.card_expenses = []
+        self.scheduled = []
+        self.recurring = []
+        self.averages = {'income': 0.0, 'expense': 0.0}
+
+    @classmethod
+    def load(cls, user_id, months, today=None, average_months=DEFAULT_AVERAGE_MONTHS):
+        today = today or date.today()
+        inputs = cls(today, months, average_months)
+        horizon_end = month_end(today + relativedelta(months=months))
+
+        inputs.current_balance = from_cents(account_balance_total(user_id))
+
+        # Linhas somente leitura (sem entidades ORM): a projeção não grava nada
+        inputs.cards = {card.id: card for card in card_rows(user_id)}
+
+        # Lançamentos futuros ou com fatura ainda em aberto (cartão)
+        lookback = month_start(today) - relativedelta(months=MAX_INVOICE_LOOKBACK_MONTHS)
+        ledger = ledger_rows(user_id, lookback, horizon_end)
+        rows = db.session.query(
+            ledger.c.description,
+            ledger.c.amount,
+            ledger.c.transaction_date,
+            ledger.c.payment_type,
+            ledger.c.credit_card_id,
+            ledger.c.type
+        ).all()
+
+        for description, amount, transaction_date, payment_type, credit_card_id, category_type in rows:
+            item = {
+                'description': description,
+                'amount': from_cents(amount),
+                'date': transaction_date,
+                'type': category_type,
+                'credit_card_id': credit_card_id
+            }
+            if payment_type == 'credit_card':
+                if category_type == 'expense' and credit_card_id in inputs.cards:
+                    inputs.card_expenses.append(item)
+            elif transaction_date > today:
+                inputs.scheduled.append(item)
+                # O saldo da conta já foi movido na criação do lançamento, qualquer que seja
+                # a data: ele sai do saldo atual e entra na projeção só na data em que cai
+                inputs.current_balance += -item['amount'] if category_type == 'income' else item['amount']
+
+        rules = rule_rows(user_id)
+        recurring_categories = {rule.category_id for rule in rules}
+        inputs.recurring = virtual_occurrences(rules, horizon_end)
+
+        # Média mensal dos lançamentos avulsos (não parcelados e fora das categorias recorrentes)
+        if average_months > 0:
+            history_end = month_start(today) - timedelta(days=1)
+            history_start = month_start(today) - relativedelta(months=average_months)
+            history_ledger = ledger_rows(user_id, history_start, history_end, name='history')
+            history = db.session.query(
+                history_ledger.c.category_id,
+                history_ledger.c.type,
+                func.sum(history_ledger.c.amount)
+            ).filter(
+                history_ledger.c.installments == 1
+            ).group_by(history_ledger.c.category_id, history_ledger.c.type).all()
+
+            for category_id, category_type, total in history:
+                if category_id in recurring_categories or category_type is None:
+                    continue
+                inputs.averages[category_type] = inputs.averages.get(category_type, 0.0) + from_cents(total) / average_months
+
+        return inputs
+
+
+class ForecastEngine:
+    """Percorre o horizonte mês a mês carregando o saldo adiante"""
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+
+    def _invoice_due_date(self, card, transaction_date, due_days):
+        billing_year, billing_month = card.get_billing_month_for_date(transaction_date)
+        return card.get_closing_date(billing_year, billing_month) + timedelta(days=due_days)
+
+    def _build_events(self, params):
+        """Lista todos os movimentos futuros (data, valor com sinal) para o cenário"""
+        today = self.inputs.today
+        income_factor = 1 + params['income_change_pct'] / 100
+        expense_factor = 1 + params['expense_change_pct'] / 100
+        excluded_rules = set(params['exclude_rule_ids'] or [])
+        events = []
+
+        invoices = {}
+        for item in self.inputs.card_expenses:
+            card = self.inputs.cards[item['credit_card_id']]
+            due_date = self._invoice_due_date(card, item['date'], params['invoice_due_days'])
+            if due_date <= today:
+                continue
+            invoices.setdefault((card.id, due_date), []).append(item)
+
+        if params['include_recurring']:
+            for occurrence in self.inputs.recurring:
+                if occurrence['rule_id'] in excluded_rules:
+                    continue
+                if occurrence['type'] == 'income':
+                    events.append(('income', occurrence['date'], occurrence['amount'] * income_factor, occurrence))
+                elif occurrence['payment_type'] == 'credit_card' and occurrence['credit_card_id'] in self.inputs.cards:
+                    card = self.inputs.cards[occurrence['credit_card_id']]
+                    due_date = self._invoice_due_date(card, occurrence['date'], params['invoice_due_days'])
+                    scaled = dict(occurrence, amount=occurrence['amount'] * expense_factor)
+                    invoices.setdefault((card.id, due_date), []).append(scaled)
+                else:
+                    events.append(('expense', occurrence['date'], occurrence['amount'] * expense_factor, occurrence))
+
+        for item in self.inputs.scheduled:
+            events.append((item['type'], item['date'], item['amount'], item))
+
+        for (card_id, due_date), items in invoices.items():
+            events.append(('invoice', due_date, sum(i['amount'] for i in items), {
+                'credit_card_id': card_id,
+                'credit_card': self.inputs.cards[card_id].name,
+                'items': items
+            }))
+
+        for event in params['events'] or []:
+            event_date = event['date']
+            if isinstance(event_date, str):
+                event_date = datetime.strptime(event_date, '%Y-%m-%d').date()
+            amount = float(event['amount'])
+            events.append(('income' if amount >= 0 else 'expense', event_date, abs(amount), {
+                'description': event.get('description', 'Simulação')
+            }))
+
+        events.sort(key=lambda event: event[1])
+        return events
+
+    def run(self, what_if=None):
+        params = dict(WHAT_IF_DEFAULTS)
+        params.update({key: value for key, value in (what_if or {}).items() if key in WHAT_IF_DEFAULTS})
+
+        today = self.inputs.today
+        balance = self.inputs.current_balance if params['starting_balance'] is None else float(params['starting_balance'])
+        events = self._build_events(params)
+        position = 0
+
+        averaged_income = 0.0
+        averaged_expenses = 0.0
+        if params['include_averages']:
+            averaged_income = self.inputs.averages.get('income', 0.0) * (1 + params['income_change_pct'] / 100)
+            averaged_expenses = self.inputs.averages.get('expense', 0.0) * (1 + params['expense_change_pct'] / 100)
+        averaged_income += float(params['extra_monthly_income'])
+        averaged_expenses += float(params['extra_monthly_expense'])
+
+        # Restante do mês atual: entra no saldo de abertura do primeiro mês projetado
+        current_month_end = month_end(today)
+        while position < len(events) and events[position][1] <= current_month_end:
+            kind, event_date, amount, _ = events[position]
+            position += 1
+            if event_date > today:
+                balance += amount if kind == 'income' else -amount
+
+        projections = []
+        for i in range(1, self.inputs.months + 1):
+            target = today + relativedelta(months=i)
+            last_day = month_end(target)
+            opening_balance = balance
+
+            income = averaged_income
+            expenses = averaged_expenses
+            credit_card_expenses = 0.0
+            installments_data = []
+            invoices_data = []
+            recurring_data = []
+
+            while position < len(events) and events[position][1] <= last_day:
+                kind, event_date, amount, payload = events[position]
+                position += 1
+                if kind == 'income':
+                    income += amount
+                elif kind == 'expense':
+                    expenses += amount
+                else:
+                    credit_card_expenses += amount
+                    invoices_data.append({
+                        'credit_card': payload['credit_card'],
+                        'due_date': event_date.isoformat(),
+                        'amount': amount
+                    })
+                    for item in payload['items']:
+                        installments_data.append({
+                            'description': item['description'],
+                            'amount': item['amount'],
+                            'credit_card': payload['credit_card'],
+                            'due_date': event_date.isoformat()
+                        })
+
+                if 'rule_id' in payload:
+                    recurring_data.append({
+                        'description': payload['description'],
+                        'amount': amount,
+                        'type': kind,
+                        'date': event_date.isoformat()
+                    })
+
+            balance = opening_balance + income - expenses - credit_card_expenses
+
+            projections.append({
+                'month': target.month,
+                'year': target.year,
+                'opening_balance': opening_balance,
+                'income': income,
+                'expenses': expenses,
+                'credit_card_expenses': credit_card_expenses,
+                'projected_balance': balance,
+                'invoices': invoices_data,
+                'installments': installments_data,
+                'recurring': recurring_data
+            })
+
+        return projections
@@ -0,0 +1,114 @@
+from flask import current_app, jsonify, request, session
+from functools import wraps
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.idempotency_key import IdempotencyKey
+import hashlib
+import json
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+DEFAULT_TTL_HOURS = 24
+# Reserva de uma requisição que não terminou (processo reiniciado no meio da escrita)
+# pode ser assumida por um reenvio depois deste tempo
+DEFAULT_LOCK_SECONDS = 60
+
+
+def request_hash():
+    """Hash do método, caminho e corpo (JSON canônico) da requisição atual"""
+    payload = request.get_json(silent=True)
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')) if payload is not None else request.get_data(as_text=True)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode('utf-8')).hexdigest()
+
+
+def _replay(record):
+    response = current_app.response_class(record.response_body, status=record.status_code, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _reserve(user_id, key, fingerprint):
+    """Grava a reserva da chave. Retorna (registro, None) ou (None, resposta a devolver)"""
+    now = datetime.utcnow()
+    ttl = timedelta(hours=current_app.config.get('IDEMPOTENCY_TTL_HOURS', DEFAULT_TTL_HOURS))
+    lock = timedelta(seconds=current_app.config.get('IDEMPOTENCY_LOCK_SECONDS', DEFAULT_LOCK_SECONDS))
+
+    record = IdempotencyKey.query.filter_by(user_id=user_id, key=key).first()
+    if record is not None:
+        if record.expires_at <= now or (not record.completed and record.created_at <= now - lock):
+            # Chave expirada ou reserva abandonada: começa de novo
+            db.session.delete(record)
+            db.session.flush()
+        elif record.request_hash != fingerprint:
+            return None, (jsonify({'error': 'Idempotency-Key já usada com outra requisição'}), 422)
+        elif not record.completed:
+            return None, (jsonify({'error': 'Requisição com esta Idempotency-Key ainda em processamento'}), 409)
+        else:
+            return None, _replay(record)
+
+    record = IdempotencyKey(user_id=user_id, key=key, request_hash=fingerprint, created_at=now, expires_at=now + ttl)
+    db.session.add(record)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outro reenvio reservou a mesma chave ao mesmo tempo
+        db.session.rollback()
+        return None, (jsonify({'error': 'Requisição com esta Idempotency-Key ainda em processamento'}), 409)
+    return record, None
+
+
+def idempotent(view):
+    """Decorator para rotas de escrita: com o header Idempotency-Key, a primeira
+    execução grava a resposta e os reenvios recebem essa mesma resposta.
+
+    Respostas 5xx não são gravadas (a reserva é liberada para nova tentativa).
+    Deve ficar depois de @login_required.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key deve ter no máximo {MAX_KEY_LENGTH} caracteres'}), 400
+
+        user_id = session['user_id']
+        record, response = _reserve(user_id, key, request_hash())
+        if response is not None:
+            return response
+        record_id = record.id
+
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+            db.session.commit()
+            raise
+
+        # A rota pode ter feito rollback: o registro é buscado de novo pelo id
+        if response.status_code >= 500:
+            IdempotencyKey.query.filter_by(id=record_id).delete()
+        else:
+            IdempotencyKey.query.filter_by(id=record_id).update({
+                'status_code': response.status_code,
+                'response_body': response.get_data(as_text=True)
+            })
+        db.session.commit()
+        return response
+    return wrapped
+
+
+def purge_expired_keys(now=None, batch_size=1000):
+    """Remove as chaves expiradas em lotes (usa o índice de expires_at). Retorna o total removido"""
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        ids = [row.id for row in db.session.query(IdempotencyKey.id).filter(IdempotencyKey.expires_at <= now).limit(batch_size)]
+        if not ids:
+            break
+        IdempotencyKey.query.filter(IdempotencyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(ids)
+    return removed
@@ -0,0 +1,350 @@
+from src.models.user import db
+from src.models.transaction import Transaction
+from src.models.installment_plan import InstallmentPlan, MAX_INSTALLMENTS
+from src.models.transaction_archive import ArchivedTransaction
+from src.models.money import Money, from_cents
+from sqlalchemy import select, func, case, literal, and_, or_, cast, type_coerce, union_all, tuple_, Integer, String
+
+
+def _installment_series():
+    """CTE recursiva com os números de parcela 1..MAX_INSTALLMENTS"""
+    series = select(literal(1).label('k')).cte('installment_series', recursive=True)
+    return series.union_all(select(series.c.k + 1).where(series.c.k < MAX_INSTALLMENTS))
+
+
+def archived_through(user_id=None, user_ids=None):
+    """Data do lançamento arquivado mais recente dos usuários (None sem arquivo)"""
+    query = db.session.query(func.max(ArchivedTransaction.transaction_date))
+    if user_id is not None:
+        query = query.filter(ArchivedTransaction.user_id == user_id)
+    if user_ids is not None:
+        query = query.filter(ArchivedTransaction.user_id.in_(user_ids))
+    return query.scalar()
+
+
+def _archive_rows(user_id, user_ids, start_date, end_date, transaction_type):
+    """Linhas do arquivo (já expandidas) com as mesmas colunas de ledger_rows"""
+    a = ArchivedTransaction.__table__
+    filters = []
+    if user_id is not None:
+        filters.append(a.c.user_id == user_id)
+    if user_ids is not None:
+        filters.append(a.c.user_id.in_(user_ids))
+    if transaction_type is not None:
+        filters.append(a.c.type == transaction_type)
+    if start_date is not None:
+        filters.append(a.c.transaction_date >= start_date)
+    if end_date is not None:
+        filters.append(a.c.transaction_date <= end_date)
+    query = select(
+        a.c.id, a.c.source_id, a.c.user_id, a.c.category_id, a.c.account_id, a.c.credit_card_id,
+        a.c.description, a.c.amount, a.c.transaction_date, a.c.payment_type, a.c.type,
+        a.c.installments, a.c.installment_number, a.c.parent_transaction_id, a.c.created_at,
+        a.c.is_virtual, literal(True).label('archived')
+    )
+    return query.where(and_(*filters)) if filters else query
+
+
+def installment_date_sql(start_date, k):
+    """Data da parcela k em SQL: mesmo dia k-1 meses depois, limitado ao último dia do mês"""
+    month_base = func.date(start_date, 'start of month', func.printf('+%d months', k - 1))
+    same_day = func.date(month_base, func.printf('+%d days', cast(func.strftime('%d', start_date), Integer) - 1))
+    month_last_day = func.date(month_base, '+1 month', '-1 day')
+    return func.min(same_day, month_last_day)
+
+
+def ledger_rows(user_id=None, start_date=None, end_date=None, name='ledger', user_ids=None, transaction_type=None,
+                include_archive=True):
+    """Lançamentos com as parcelas expandidas virtualmente, como subconsulta.
+
+    Cada transação sem parcelamento gera uma linha; cada transação com
+    InstallmentPlan gera uma linha por parcela, com data (mesmo dia nos meses
+    seguintes, limitado ao último dia do mês), valor e descrição "- i/N" iguais
+    aos das antigas linhas filhas.
+
+    São duas consultas unidas por UNION ALL: as transações sem plano são lidas
+    como faixa no índice (user_id, type, transaction_date), sem junções; só os
+    planos que alcançam o período (índice (user_id, last_installment_date) do
+    InstallmentPlan) passam pela série de parcelas.
+
+    Os lançamentos arquivados (transaction_archive) entram por UNION ALL
+    apenas quando o período pedido começa antes do último lançamento
+    arquivado; consultas de períodos recentes leem só a tabela quente.
+    """
+    t = Transaction.__table__
+    p = InstallmentPlan.__table__
+
+    user_filters = []
+    if user_id is not None:
+        user_filters.append(t.c.user_id == user_id)
+    if user_ids is not None:
+        user_filters.append(t.c.user_id.in_(user_ids))
+    if transaction_type is not None:
+        user_filters.append(t.c.type == transaction_type)
+
+    # Transações sem plano (avulsas e linhas filhas antigas): a data é a da própria linha.
+    # O EXISTS só é avaliado para as linhas com installments > 1 (índice único do plano)
+    plain_filters = user_filters + [or_(
+        func.coalesce(t.c.installments, 1) <= 1,
+        ~select(p.c.id).where(p.c.transaction_id == t.c.id).exists()
+    )]
+    if start_date is not None:
+        plain_filters.append(t.c.transaction_date >= start_date)
+    if end_date is not None:
+        plain_filters.append(t.c.transaction_date <= end_date)
+    plain = select(
+        t.c.id,
+        t.c.id.label('source_id'),
+        t.c.user_id,
+        t.c.category_id,
+        t.c.account_id,
+        t.c.credit_card_id,
+        t.c.description,
+        t.c.amount,
+        t.c.transaction_date,
+        t.c.payment_type,
+        t.c.type,
+        t.c.installments,
+        t.c.installment_number,
+        t.c.parent_transaction_id,
+        t.c.created_at,
+        literal(False).label('is_virtual'),
+        literal(False).label('archived')
+    ).where(and_(*plain_filters))
+
+    # Planos que têm alguma parcela no período, expandidos pela série 1..N
+    series = _installment_series()
+    k = series.c.k
+    installment_date = case((k == 1, t.c.transaction_date), else_=installment_date_sql(t.c.transaction_date, k))
+    plan_filters = list(user_filters)
+    if user_id is not None:
+        plan_filters.append(p.c.user_id == user_id)
+    if user_ids is not None:
+        plan_filters.append(p.c.user_id.in_(user_ids))
+    if start_date is not None:
+        plan_filters.append(p.c.last_installment_date >= start_date)
+    if end_date is not None:
+        plan_filters.append(t.c.transaction_date <= end_date)
+    plans = select(
+        case((k == 1, t.c.id), else_=None).label('id'),
+        t.c.id.label('source_id'),
+        t.c.user_id,
+        t.c.category_id,
+        t.c.account_id,
+        t.c.credit_card_id,
+        case(
+            (k == 1, t.c.description),
+            else_=t.c.description + ' - ' + cast(k, String) + '/' + cast(p.c.installments, String)
+        ).label('description'),
+        type_coerce(case(
+            (k == p.c.installments, p.c.last_installment_amount),
+            else_=p.c.installment_amount
+        ), Money()).label('amount'),
+        type_coerce(installment_date, db.Date).label('transaction_date'),
+        t.c.payment_type,
+        t.c.type,
+        t.c.installments,
+        k.label('installment_number'),
+        case((k == 1, t.c.parent_transaction_id), else_=t.c.id).label('parent_transaction_id'),
+        t.c.created_at,
+        (k > 1).label('is_virtual'),
+        literal(False).label('archived')
+    ).select_from(
+        p.join(t, t.c.id == p.c.transaction_id).join(series, series.c.k <= p.c.installments)
+    )
+    if plan_filters:
+        plans = plans.where(and_(*plan_filters))
+
+    query = union_all(plain, plans)
+
+    if include_archive:
+        latest_archived = archived_through(user_id, user_ids)
+        if latest_archived is not None and (start_date is None or start_date <= latest_archived):
+            query = union_all(plain, plans, _archive_rows(user_id, user_ids, start_date, end_date, transaction_type))
+
+    rows = query.subquery(name)
+
+    # Filtro final na data já expandida de cada parcela
+    outer_filters = []
+    if start_date is not None:
+        outer_filters.append(rows.c.transaction_date >= start_date)
+    if end_date is not None:
+        outer_filters.append(rows.c.transaction_date <= end_date)
+    if outer_filters:
+        return select(rows).where(and_(*outer_filters)).subquery(f'{name}_range')
+    return rows
+
+
+def page_floor_date(user_id, before=None, count=1, start_date=None, end_date=None, transaction_type=None):
+    """Data da `count`-ésima linha (transação ou arquivada) depois da chave `before` na ordem da listagem.
+
+    before é (data, source_id, parcela) da última linha da página anterior. As
+    linhas da tabela quente (compras, com a data da parcela 1) e do arquivo são
+    percorridas pelos índices de data, sem expandir parcelas. As `count`
+    linhas seguintes da listagem caem todas entre essa data e a do cursor;
+    None quando restam menos de `count` linhas (sem limite inferior).
+    """
+    t = Transaction.__table__
+    a = ArchivedTransaction.__table__
+    floors = []
+    for table, id_column, extra_key in [(t, t.c.id, []), (a, a.c.source_id, [a.c.installment_number])]:
+        filters = [table.c.user_id == user_id]
+        if transaction_type is not None:
+            filters.append(table.c.type == transaction_type)
+        if start_date is not None:
+            filters.append(table.c.transaction_date >= start_date)
+        if end_date is not None:
+            filters.append(table.c.transaction_date <= end_date)
+        if before is not None:
+            filters.append(table.c.transaction_date <= before[0])
+            # Na tabela quente (data, id) identifica a linha; parcelas virtuais de um
+            # plano têm datas posteriores à compra e nunca empatam com ela
+            filters.append(tuple_(table.c.transaction_date, id_column, *extra_key) < tuple(before[:2 + len(extra_key)]))
+        floor = db.session.execute(
+            select(table.c.transaction_date).where(and_(*filters))
+            .order_by(table.c.transaction_date.desc(), id_column.desc(), *[column.desc() for column in extra_key])
+            .offset(count - 1).limit(1)
+        ).scalar()
+        if floor is not None:
+            floors.append(floor)
+    return max(floors) if floors else None
+
+
+def plan_installment_dicts(transaction, include_relations=True):
+    """Representação de cada parcela igual ao to_dict das antigas linhas filhas"""
+    plan = transaction.installment_plan
+    if plan is None:
+        return [transaction.to_dict(include_relations=include_relations)]
+
+    result = []
+    for number, installment_date, amount in plan.iter_installments():
+        data = transaction.to_dict(include_relations=include_relations)
+        if number > 1:
+            data.update({
+                'id': f'{transaction.id}:{number}',
+                'description': f'{transaction.description} - {number}/{plan.installments}',
+                'transaction_date': installment_date.isoformat(),
+                'parent_transaction_id': transaction.id,
+                'virtual': True
+            })
+        data.update({
+            'amount': from_cents(amount),
+            'installment_number': number
+        })
+        if include_relations and transaction.credit_card:
+            billing_year, billing_month = transaction.credit_card.get_billing_month_for_date(installment_date)
+            data['due_date'] = transaction.credit_card.get_closing_date(billing_year, billing_month).isoformat()
+        result.append(data)
+    return result
+
+
+def create_plan(transaction, total_amount):
+    """Cria o parcelamento da transação principal, com valores exatos em centavos"""
+    installment_amount, last_amount = InstallmentPlan.split_amount(total_amount, transaction.installments)
+    transaction.amount = installment_amount
+    plan = InstallmentPlan(
+        transaction=transaction,
+        user_id=transaction.user_id,
+        installments=transaction.installments,
+        last_installment_date=InstallmentPlan.last_date_for(transaction.transaction_date, transaction.installments),
+        total_amount=total_amount,
+        installment_amount=installment_amount,
+        last_installment_amount=last_amount
+    )
+    db.session.add(plan)
+    return plan
+
+
+def convert_legacy_installments(batch_size=500):
+    """Converte parcelamentos antigos (linhas filhas) em InstallmentPlan.
+
+    O total do plano é a soma das linhas existentes, então saldos e relatórios
+    não mudam. As linhas filhas são removidas depois da conversão de cada lote.
+    """
+    converted = 0
+    removed = 0
+    last_id = 0
+
+    while True:
+        parents = Transaction.query.filter(
+            and_(
+                Transaction.id > last_id,
+                Transaction.installments > 1,
+                Transaction.parent_transaction_id.is_(None),
+                ~Transaction.id.in_(select(InstallmentPlan.transaction_id))
+            )
+        ).order_by(Transaction.id).limit(batch_size).all()
+        if not parents:
+            break
+
+        parent_ids = [parent.id for parent in parents]
+
+        # Soma das linhas feita no banco (centavos inteiros)
+        group_id = func.coalesce(Transaction.parent_transaction_id, Transaction.id)
+        totals = dict(db.session.query(group_id, func.sum(Transaction.amount)).filter(
+            or_(Transaction.id.in_(parent_ids), Transaction.parent_transaction_id.in_(parent_ids))
+        ).group_by(group_id).all())
+
+        for parent in parents:
+            total = totals[parent.id]
+            installment_amount = parent.amount
+            db.session.add(InstallmentPlan(
+                transaction_id=parent.id,
+                user_id=parent.user_id,
+                installments=parent.installments,
+                last_installment_date=InstallmentPlan.last_date_for(parent.transaction_date, parent.installments),
+                total_amount=total,
+                installment_amount=installment_amount,
+                last_installment_amount=total - installment_amount * (parent.installments - 1)
+            ))
+            converted += 1
+
+        removed += Transaction.query.filter(Transaction.parent_transaction_id.in_(parent_ids))\
+            .delete(synchronize_session=False)
+        db.session.commit()
+        last_id = parent_ids[-1]
+
+    return {'plans_created': converted, 'rows_removed': removed}
+
+
+def ledger_row_dicts(rows):
+    """Converte linhas (source_id, installment_number, archived) de ledger_rows em dicionários da API"""
+    from sqlalchemy.orm import joinedload
+
+    archived_keys = [(row.source_id, row.installment_number) for row in rows if row.archived]
+    archived = {
+        (item.source_id, item.installment_number): item
+        for item in ArchivedTransaction.query.options(
+            joinedload(ArchivedTransaction.category),
+            joinedload(ArchivedTransaction.account),
+            joinedload(ArchivedTransaction.credit_card)
+        ).filter(
+            tuple_(ArchivedTransaction.source_id, ArchivedTransaction.installment_number).in_(archived_keys)
+        ).all()
+    } if archived_keys else {}
+
+    source_ids = {row.source_id for row in rows if not row.archived}
+    sources = {
+        transaction.id: transaction
+        for transaction in Transaction.query.options(
+            joinedload(Transaction.category),
+            joinedload(Transaction.account),
+            joinedload(Transaction.credit_card),
+            joinedload(Transaction.installment_plan)
+        ).filter(Transaction.id.in_(source_ids)).all()
+    } if source_ids else {}
+
+    expanded = {}
+    result = []
+    for row in rows:
+        if row.archived:
+            result.append(archived[(row.source_id, row.installment_number)].to_dict())
+            continue
+        transaction = sources[row.source_id]
+        if transaction.installment_plan is None:
+            result.append(transaction.to_dict())
+            continue
+        if transaction.id not in expanded:
+            expanded[transaction.id] = plan_installment_dicts(transaction)
+        result.append(expanded[transaction.id][row.installment_number - 1])
+    return result
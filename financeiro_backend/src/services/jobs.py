@@ -0,0 +1,264 @@
+from src.models.user import db
+from src.models.job import Job
+from src.services.sharding import use_user_shard
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import Session
+from datetime import datetime
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+JOB_HANDLERS = {}
+
+# Intervalo mínimo entre gravações de progresso no banco (segundos)
+PROGRESS_FLUSH_INTERVAL = 0.5
+
+
+def register_job(job_type, user_facing=False):
+    """Registra uma função como tipo de job.
+
+    A função recebe (params, ctx), onde ctx.progress(fração, mensagem) informa o
+    andamento e ctx.user_id identifica o dono do job. O retorno deve ser
+    serializável em JSON. Apenas jobs user_facing podem ser criados pela API.
+    """
+    def decorator(func):
+        JOB_HANDLERS[job_type] = {'handler': func, 'user_facing': user_facing}
+        return func
+    return decorator
+
+
+def worker_id():
+    """Identifica o processo dono dos jobs que ele enfileira ("host:pid")"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobContext:
+    """Canal de progresso entregue ao job em execução"""
+
+    def __init__(self, runner, job_id, user_id):
+        self.runner = runner
+        self.job_id = job_id
+        self.user_id = user_id
+
+    def progress(self, fraction, message=None):
+        self.runner._update(self.job_id, progress=max(0.0, min(1.0, float(fraction))), message=message)
+
+
+class JobRunner:
+    """Fila de jobs em processo, executada por um pool de threads.
+
+    O estado dos jobs fica em memória para consulta rápida e, com
+    JOBS_PERSIST habilitado, também na tabela 'job' do SQLite para que o
+    histórico sobreviva a reinícios.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        self.persist = True
+        self.max_history = 200
+        self._jobs = {}
+        self._last_flush = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.persist = app.config.setdefault('JOBS_PERSIST', True)
+        self.max_history = app.config.setdefault('JOBS_MAX_HISTORY', 200)
+        max_workers = app.config.setdefault('JOBS_MAX_WORKERS', 2)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-runner')
+        app.extensions['job_runner'] = self
+
+    def _owner_gone(self, job):
+        """True se o processo que enfileirou o job não existe mais.
+
+        Vários processos (workers do servidor) compartilham a tabela: só os jobs
+        de processos encerrados nesta máquina são considerados interrompidos.
+        Os de outra máquina ficam para a recuperação feita por ela.
+        """
+        if not job.owner:
+            return True  # Jobs gravados antes do registro do dono
+        host, _, pid = job.owner.rpartition(':')
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+        if int(pid) == os.getpid():
+            with self._lock:
+                return job.id not in self._jobs
+        return not _process_alive(int(pid))
+
+    def recover_interrupted(self):
+        """Marca como falhos os jobs persistidos que não terminaram porque o processo dono foi encerrado"""
+        if not self.persist:
+            return 0
+        pending = Job.query.filter(Job.status.in_(['queued', 'running'])).all()
+        interrupted = [job for job in pending if self._owner_gone(job)]
+        for job in interrupted:
+            job.status = 'failed'
+            job.error = 'Job interrompido pelo reinício do servidor'
+            job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return len(interrupted)
+
+    def submit(self, job_type, params=None, user_id=None):
+        """Enfileira um job e retorna seu estado inicial"""
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f'Tipo de job desconhecido: {job_type}')
+
+        job_id = str(uuid.uuid4())
+        state = {
+            'id': job_id,
+            'user_id': user_id,
+            'type': job_type,
+            'status': 'queued',
+            'progress': 0.0,
+            'message': None,
+            'params': params or {},
+            'result': None,
+            'error': None,
+            'created_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job_id] = state
+
+        if self.persist:
+            # Sessão própria: o estado do job não se mistura com a transação da requisição
+            with Session(db.engine) as job_session:
+                job_session.add(Job(
+                    id=job_id,
+                    user_id=user_id,
+                    type=job_type,
+                    status='queued',
+                    params=json.dumps(state['params']),
+                    owner=worker_id(),
+                    created_at=state['created_at']
+                ))
+                job_session.commit()
+
+        self.executor.submit(self._run, job_id)
+        return self._serialize(state)
+
+    def get(self, job_id, user_id=None):
+        """Estado atual do job (memória primeiro, banco como fallback)"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is not None:
+                if user_id is not None and state['user_id'] != user_id:
+                    return None
+                return self._serialize(state)
+
+        if self.persist:
+            query = Job.query.filter_by(id=job_id)
+            if user_id is not None:
+                query = query.filter_by(user_id=user_id)
+            job = query.first()
+            return job.to_dict() if job else None
+        return None
+
+    def list(self, user_id=None, limit=50):
+        """Jobs mais recentes, opcionalmente filtrados por usuário"""
+        if self.persist:
+            query = Job.query
+            if user_id is not None:
+                query = query.filter_by(user_id=user_id)
+            persisted = {job.id: job.to_dict() for job in query.order_by(Job.created_at.desc()).limit(limit).all()}
+        else:
+            persisted = {}
+
+        with self._lock:
+            for job_id, state in self._jobs.items():
+                if user_id is None or state['user_id'] == user_id:
+                    persisted[job_id] = self._serialize(state)
+
+        jobs = sorted(persisted.values(), key=lambda job: job['created_at'] or '', reverse=True)
+        return jobs[:limit]
+
+    def _serialize(self, state):
+        return {
+            'id': state['id'],
+            'type': state['type'],
+            'status': state['status'],
+            'progress': state['progress'],
+            'message': state['message'],
+            'params': state['params'],
+            'result': state['result'],
+            'error': state['error'],
+            'created_at': state['created_at'].isoformat() if state['created_at'] else None,
+            'started_at': state['started_at'].isoformat() if state['started_at'] else None,
+            'finished_at': state['finished_at'].isoformat() if state['finished_at'] else None
+        }
+
+    def _update(self, job_id, force=False, **fields):
+        with self._lock:
+            state = self._jobs[job_id]
+            state.update({key: value for key, value in fields.items() if value is not None or key == 'message'})
+            now = time.monotonic()
+            if not force and now - self._last_flush.get(job_id, 0) < PROGRESS_FLUSH_INTERVAL:
+                return
+            self._last_flush[job_id] = now
+            snapshot = dict(state)
+
+        if self.persist:
+            with Session(db.engine) as job_session:
+                job = job_session.get(Job, job_id)
+                if job is not None:
+                    job.status = snapshot['status']
+                    job.progress = snapshot['progress']
+                    job.message = snapshot['message']
+                    job.result = json.dumps(snapshot['result']) if snapshot['result'] is not None else None
+                    job.error = snapshot['error']
+                    job.started_at = snapshot['started_at']
+                    job.finished_at = snapshot['finished_at']
+                    job_session.commit()
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            with self._lock:
+                state = self._jobs[job_id]
+                handler = JOB_HANDLERS[state['type']]['handler']
+                params = state['params']
+                user_id = state['user_id']
+
+            self._update(job_id, force=True, status='running', started_at=datetime.utcnow())
+            try:
+                with use_user_shard(user_id):
+                    result = handler(params, JobContext(self, job_id, user_id))
+                self._update(job_id, force=True, status='succeeded', progress=1.0,
+                             result=result, finished_at=datetime.utcnow())
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error('Job %s falhou: %s', job_id, traceback.format_exc())
+                self._update(job_id, force=True, status='failed', error=str(e),
+                             finished_at=datetime.utcnow())
+            finally:
+                # Jobs terminados ficam apenas no banco quando há persistência;
+                # sem ela, mantém-se em memória um histórico limitado
+                with self._lock:
+                    self._last_flush.pop(job_id, None)
+                    if self.persist:
+                        self._jobs.pop(job_id, None)
+                    else:
+                        finished = [key for key, value in self._jobs.items() if value['finished_at']]
+                        for key in finished[:max(0, len(finished) - self.max_history)]:
+                            self._jobs.pop(key, None)
+                db.session.remove()
+
+
+job_runner = JobRunner()
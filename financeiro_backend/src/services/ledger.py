@@ -0,0 +1,11 @@
+def balance_deltas(category_type, payment_type, amount):
+    """Efeito de um lançamento nos saldos: (delta da conta, delta do cartão)
+
+    Débito/PIX movimentam a conta imediatamente (receita soma, despesa subtrai).
+    No cartão de crédito apenas despesas aumentam o saldo da fatura.
+    """
+    if payment_type in ['debit', 'pix']:
+        return (amount if category_type == 'income' else -amount), 0
+    if payment_type == 'credit_card' and category_type == 'expense':
+        return 0, amount
+    return 0, 0
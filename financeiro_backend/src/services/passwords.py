@@ -0,0 +1,144 @@
+from flask import current_app, has_app_context
+import base64
+import hashlib
+import hmac
+import secrets
+
+# Parâmetros padrão; podem ser ajustados pela configuração do app (PASSWORD_*)
+DEFAULT_PASSWORD_SETTINGS = {
+    'PASSWORD_HASH_METHOD': 'scrypt',
+    'PASSWORD_SCRYPT_N': 2 ** 14,
+    'PASSWORD_SCRYPT_R': 8,
+    'PASSWORD_SCRYPT_P': 1,
+    'PASSWORD_PBKDF2_ITERATIONS': 600000
+}
+HASH_METHODS = ['scrypt', 'pbkdf2_sha256']
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64encode(value):
+    return base64.b64encode(value).decode('ascii').rstrip('=')
+
+
+def _b64decode(value):
+    return base64.b64decode(value + '=' * (-len(value) % 4))
+
+
+def password_settings(overrides=None):
+    """Parâmetros de custo em uso: padrão < configuração do app < overrides"""
+    settings = dict(DEFAULT_PASSWORD_SETTINGS)
+    if has_app_context():
+        settings.update({key: current_app.config[key] for key in settings if key in current_app.config})
+    settings.update(overrides or {})
+    if settings['PASSWORD_HASH_METHOD'] not in HASH_METHODS:
+        raise ValueError(f"Método de hash desconhecido: {settings['PASSWORD_HASH_METHOD']}")
+    return settings
+
+
+def _derive(method, password, salt, params):
+    if method == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=128 * n * r * p + 1024 * 1024, dklen=KEY_BYTES)
+    (iterations,) = params
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=KEY_BYTES)
+
+
+def _current_params(settings):
+    if settings['PASSWORD_HASH_METHOD'] == 'scrypt':
+        return (settings['PASSWORD_SCRYPT_N'], settings['PASSWORD_SCRYPT_R'], settings['PASSWORD_SCRYPT_P'])
+    return (settings['PASSWORD_PBKDF2_ITERATIONS'],)
+
+
+def _parse(stored):
+    """Separa 'método$parâmetros$salt$hash'. Retorna None para senhas antigas em texto puro"""
+    parts = (stored or '').split('$')
+    if len(parts) != 4 or parts[0] not in HASH_METHODS:
+        return None
+    method, params, salt, key = parts
+    try:
+        params = tuple(int(value) for value in params.split(','))
+        return method, params, _b64decode(salt), _b64decode(key)
+    except ValueError:
+        return None
+
+
+def hash_password(password, overrides=None):
+    settings = password_settings(overrides)
+    method = settings['PASSWORD_HASH_METHOD']
+    params = _current_params(settings)
+    salt = secrets.token_bytes(SALT_BYTES)
+    key = _derive(method, password, salt, params)
+    return f"{method}${','.join(str(value) for value in params)}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def verify_password(stored, password):
+    """Confere a senha em tempo constante; aceita também senhas antigas em texto puro"""
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest((stored or '').encode('utf-8'), password.encode('utf-8'))
+    method, params, salt, key = parsed
+    return hmac.compare_digest(_derive(method, password, salt, params), key)
+
+
+def needs_rehash(stored, overrides=None):
+    """True para senhas em texto puro ou com método/custo diferentes da configuração atual"""
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    settings = password_settings(overrides)
+    return parsed[0] != settings['PASSWORD_HASH_METHOD'] or parsed[1] != _current_params(settings)
+
+
+_dummy_hashes = {}
+
+
+def dummy_verify(password):
+    """Gasta o mesmo tempo de uma verificação real quando o usuário não existe"""
+    settings = password_settings()
+    key = (settings['PASSWORD_HASH_METHOD'], _current_params(settings))
+    if key not in _dummy_hashes:
+        _dummy_hashes[key] = hash_password(secrets.token_hex(8))
+    verify_password(_dummy_hashes[key], password)
+    return False
+
+
+def benchmark_verify(overrides=None, requests=50, threads=1):
+    """Mede a vazão de verificações de senha (o custo dominante do login) no custo informado.
+
+    hashlib libera o GIL durante o cálculo, então threads > 1 mostra quantos
+    logins por segundo o servidor sustenta usando vários núcleos.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    settings = password_settings(overrides)
+    stored = hash_password('benchmark', overrides)
+    latencies = []
+
+    def one(_):
+        started = time.perf_counter()
+        verify_password(stored, 'benchmark')
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    result = {
+        'method': settings['PASSWORD_HASH_METHOD'],
+        'params': _current_params(settings),
+        'requests': requests,
+        'threads': threads,
+        'elapsed': elapsed,
+        'per_second': requests / elapsed if elapsed else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+    }
+    if result['method'] == 'scrypt':
+        n, r, p = result['params']
+        result['memory_per_login_mb'] = 128 * n * r * p / (1024 * 1024)
+    return result
@@ -0,0 +1,221 @@
+from src.models.user import db
+from src.models.account import Account
+from src.models.category import Category
+from src.models.credit_card import CreditCard
+from src.models.recurring_rule import RecurringRule
+from src.models.transaction import Transaction
+from src.services.sharding import use_user_shard
+from src.services.events import transaction_summary
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, and_, insert
+from sqlalchemy.orm import joinedload
+import gc
+import time
+import tracemalloc
+
+# Camada de leitura: consultas Core com só as colunas usadas pela resposta,
+# mapeadas em objetos compactos (sem identity map, estado de sessão ou
+# carregamento tardio). Só para leitura: nada aqui é gravado de volta.
+
+account_table = Account.__table__
+card_table = CreditCard.__table__
+rule_table = RecurringRule.__table__
+transaction_table = Transaction.__table__
+
+# Mesmos atributos lidos por transaction_summary
+RecentTransactionRow = namedtuple('RecentTransactionRow', [
+    'id', 'description', 'amount', 'type', 'transaction_date', 'payment_type', 'installment_number', 'installments'
+])
+
+
+class CardRow:
+    """Cartão somente leitura com os mesmos cálculos de fatura do modelo"""
+    __slots__ = ('id', 'name', 'closing_day', 'current_balance', 'created_at', 'updated_at')
+
+    def __init__(self, id, name, closing_day, current_balance, created_at, updated_at):
+        self.id = id
+        self.name = name
+        self.closing_day = closing_day
+        self.current_balance = current_balance
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    # Os métodos do modelo só leem estes atributos
+    get_next_closing_date = CreditCard.get_next_closing_date
+    get_closing_date = CreditCard.get_closing_date
+    get_billing_month_for_date = CreditCard.get_billing_month_for_date
+    to_dict = CreditCard.to_dict
+
+
+class RuleRow:
+    """Regra recorrente somente leitura, com o tipo da categoria já resolvido"""
+    __slots__ = ('id', 'category_id', 'description', 'amount', 'payment_type', 'account_id', 'credit_card_id',
+                 'frequency', 'interval', 'day_of_month', 'start_date', 'end_date', 'next_due_date', 'active',
+                 'category_type')
+
+    def __init__(self, id, category_id, description, amount, payment_type, account_id, credit_card_id, frequency,
+                 interval, day_of_month, start_date, end_date, next_due_date, active, category_type):
+        self.id = id
+        self.category_id = category_id
+        self.description = description
+        self.amount = amount
+        self.payment_type = payment_type
+        self.account_id = account_id
+        self.credit_card_id = credit_card_id
+        self.frequency = frequency
+        self.interval = interval
+        self.day_of_month = day_of_month
+        self.start_date = start_date
+        self.end_date = end_date
+        self.next_due_date = next_due_date
+        self.active = active
+        self.category_type = category_type
+
+    _monthly_date = RecurringRule._monthly_date
+    iter_occurrences = RecurringRule.iter_occurrences
+    pending_occurrences = RecurringRule.pending_occurrences
+
+
+def account_balance_total(user_id):
+    """Soma dos saldos das contas, em centavos"""
+    return db.session.execute(
+        select(func.coalesce(func.sum(account_table.c.balance), 0)).where(account_table.c.user_id == user_id)
+    ).scalar()
+
+
+def card_rows(user_id):
+    rows = db.session.execute(
+        select(card_table.c.id, card_table.c.name, card_table.c.closing_day, card_table.c.current_balance,
+               card_table.c.created_at, card_table.c.updated_at)
+        .where(card_table.c.user_id == user_id)
+        .order_by(card_table.c.id)
+    )
+    return [CardRow(*row) for row in rows]
+
+
+def recent_transaction_rows(user_id, limit=10):
+    """Últimas transações do usuário (mesma ordem do dashboard)"""
+    rows = db.session.execute(
+        select(transaction_table.c.id, transaction_table.c.description, transaction_table.c.amount,
+               transaction_table.c.type, transaction_table.c.transaction_date, transaction_table.c.payment_type,
+               transaction_table.c.installment_number, transaction_table.c.installments)
+        .where(transaction_table.c.user_id == user_id)
+        .order_by(transaction_table.c.transaction_date.desc(), transaction_table.c.created_at.desc())
+        .limit(limit)
+    )
+    return [RecentTransactionRow(*row) for row in rows]
+
+
+def rule_rows(user_id):
+    """Regras ativas com ocorrências pendentes (entrada da projeção)"""
+    category_table = Category.__table__
+    rows = db.session.execute(
+        select(rule_table.c.id, rule_table.c.category_id, rule_table.c.description, rule_table.c.amount,
+               rule_table.c.payment_type, rule_table.c.account_id, rule_table.c.credit_card_id, rule_table.c.frequency, rule_table.c.interval,
+               rule_table.c.day_of_month, rule_table.c.start_date, rule_table.c.end_date, rule_table.c.next_due_date,
+               rule_table.c.active, func.coalesce(category_table.c.type, 'expense'))
+        .select_from(rule_table.outerjoin(category_table, category_table.c.id == rule_table.c.category_id))
+        .where(and_(
+            rule_table.c.user_id == user_id,
+            rule_table.c.active == True,
+            rule_table.c.next_due_date.isnot(None)
+        ))
+        .order_by(rule_table.c.id)
+    )
+    return [RuleRow(*row) for row in rows]
+
+
+def _measure(func, repeat):
+    """(ms por chamada, pico de memória em KB de uma chamada) com a sessão limpa a cada chamada"""
+    db.session.expunge_all()
+    func()
+    elapsed = 0.0
+    for _ in range(repeat):
+        db.session.expunge_all()
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - started
+
+    db.session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed / repeat * 1000, peak / 1024
+
+
+def benchmark_read_rows(user_id, rows=5000, repeat=5):
+    """Compara entidades ORM e linhas da camada de leitura nas mesmas consultas.
+
+    Gera `rows` cartões, transações e regras para o usuário dentro de uma
+    transação que é desfeita no final (o banco não é alterado).
+    """
+    with use_user_shard(user_id):
+        today = date.today()
+        now = datetime.utcnow()
+        category_id = db.session.execute(
+            select(Category.__table__.c.id).where(Category.__table__.c.user_id == user_id).limit(1)
+        ).scalar()
+        if category_id is None:
+            raise ValueError('O usuário precisa ter ao menos uma categoria')
+
+        try:
+            db.session.execute(insert(card_table), [
+                {'user_id': user_id, 'name': f'Cartão {i}', 'closing_day': i % 28 + 1, 'current_balance': i,
+                 'opening_balance': 0, 'created_at': now, 'updated_at': now}
+                for i in range(rows)
+            ])
+            db.session.execute(insert(transaction_table), [
+                {'user_id': user_id, 'category_id': category_id, 'description': f'Compra {i}', 'amount': 1000 + i,
+                 'transaction_date': today - timedelta(days=i % 365), 'payment_type': 'pix', 'type': 'expense',
+                 'installments': 1, 'installment_number': 1, 'created_at': now, 'updated_at': now}
+                for i in range(rows)
+            ])
+            db.session.execute(insert(rule_table), [
+                {'user_id': user_id, 'category_id': category_id, 'description': f'Regra {i}', 'amount': 500,
+                 'payment_type': 'pix', 'frequency': 'monthly', 'interval': 1, 'start_date': today,
+                 'next_due_date': today, 'active': True, 'created_at': now, 'updated_at': now}
+                for i in range(rows)
+            ])
+
+            def orm_rules():
+                rules = RecurringRule.query.options(joinedload(RecurringRule.category)).filter(
+                    RecurringRule.user_id == user_id,
+                    RecurringRule.active == True,
+                    RecurringRule.next_due_date.isnot(None)
+                ).all()
+                return [(rule.id, rule.category.type if rule.category else 'expense', rule.pending_occurrences(today))
+                        for rule in rules]
+
+            def row_rules():
+                return [(rule.id, rule.category_type, rule.pending_occurrences(today)) for rule in rule_rows(user_id)]
+
+            cases = [
+                ('credit_cards',
+                 lambda: [card.to_dict() for card in CreditCard.query.filter_by(user_id=user_id).all()],
+                 lambda: [card.to_dict() for card in card_rows(user_id)]),
+                ('recent_transactions',
+                 lambda: [transaction_summary(t) for t in Transaction.query.filter_by(user_id=user_id)
+                          .order_by(Transaction.transaction_date.desc(), Transaction.created_at.desc())
+                          .limit(rows).all()],
+                 lambda: [transaction_summary(t) for t in recent_transaction_rows(user_id, limit=rows)]),
+                ('recurring_rules', orm_rules, row_rules),
+            ]
+
+            results = []
+            for name, orm_func, rows_func in cases:
+                orm_ms, orm_kb = _measure(orm_func, repeat)
+                rows_ms, rows_kb = _measure(rows_func, repeat)
+                results.append({
+                    'case': name,
+                    'orm_ms': orm_ms, 'rows_ms': rows_ms,
+                    'orm_kb': orm_kb, 'rows_kb': rows_kb
+                })
+            return {'rows': rows, 'repeat': repeat, 'results': results}
+        finally:
+            db.session.rollback()
@@ -0,0 +1,184 @@
+from src.models.user import db, User
+from src.models.account import Account
+from src.models.credit_card import CreditCard
+from src.models.money import to_cents, from_cents
+from src.services.installments import ledger_rows
+from src.services.sharding import sharding, use_shard
+from src.services.sync import record_changes
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import func, and_, case, update
+from flask import current_app
+
+def ledger_totals(user_ids=None, account_id=None, credit_card_id=None):
+    """Uma consulta agrupada com o efeito líquido dos lançamentos por conta e por cartão.
+
+    Pode ser restrita a um lote de usuários, a uma conta ou a um cartão. Retorna
+    dois dicionários: {account_id: líquido} e {credit_card_id: total}, seguindo
+    as mesmas regras de create_transaction (ver ledger.balance_deltas).
+    Os valores são centavos inteiros, então a comparação com os saldos é exata.
+    """
+    ledger = ledger_rows(user_ids=user_ids)
+    filters = []
+    if account_id is not None:
+        filters.append(ledger.c.account_id == account_id)
+    if credit_card_id is not None:
+        filters.append(ledger.c.credit_card_id == credit_card_id)
+    account_effect = case(
+        (ledger.c.type == 'income', ledger.c.amount),
+        else_=-ledger.c.amount
+    )
+    rows = db.session.query(
+        ledger.c.payment_type,
+        ledger.c.account_id,
+        ledger.c.credit_card_id,
+        func.sum(case(
+            (ledger.c.payment_type.in_(['debit', 'pix']), account_effect),
+            else_=ledger.c.amount
+        ))
+    ).filter(
+        and_(
+            (ledger.c.payment_type.in_(['debit', 'pix'])) |
+            ((ledger.c.payment_type == 'credit_card') & (ledger.c.type == 'expense')),
+            *filters
+        )
+    ).group_by(ledger.c.payment_type, ledger.c.account_id, ledger.c.credit_card_id).all()
+
+    accounts = {}
+    cards = {}
+    for payment_type, row_account_id, row_card_id, total in rows:
+        if payment_type == 'credit_card':
+            if row_card_id is not None:
+                cards[row_card_id] = cards.get(row_card_id, 0) + (total or 0)
+        elif row_account_id is not None:
+            accounts[row_account_id] = accounts.get(row_account_id, 0) + (total or 0)
+    return accounts, cards
+
+
+def account_ledger_net(account_id):
+    """Efeito líquido dos lançamentos de uma conta"""
+    accounts, _ = ledger_totals(account_id=account_id)
+    return accounts.get(account_id, 0)
+
+
+def card_ledger_total(card_id):
+    """Total lançado em um cartão"""
+    _, cards = ledger_totals(credit_card_id=card_id)
+    return cards.get(card_id, 0)
+
+
+def _discrepancy(kind, item_id, user_id, name, stored, expected):
+    return {
+        'kind': kind, 'id': item_id, 'user_id': user_id, 'name': name,
+        'stored': from_cents(stored), 'expected': from_cents(expected), 'difference': from_cents(stored - expected)
+    }
+
+
+def reconcile_users(user_ids):
+    """Compara saldos armazenados com os esperados para um lote de usuários"""
+    account_totals, card_totals = ledger_totals(user_ids=user_ids)
+    discrepancies = []
+    checked = {'accounts': 0, 'credit_cards': 0}
+
+    for account_id, user_id, name, balance, opening in db.session.query(
+        Account.id, Account.user_id, Account.name, Account.balance, Account.opening_balance
+    ).filter(Account.user_id.in_(user_ids)).all():
+        checked['accounts'] += 1
+        expected = (opening or 0) + account_totals.get(account_id, 0)
+        if (balance or 0) != expected:
+            discrepancies.append(_discrepancy('account', account_id, user_id, name, balance or 0, expected))
+
+    for card_id, user_id, name, balance, opening in db.session.query(
+        CreditCard.id, CreditCard.user_id, CreditCard.name, CreditCard.current_balance, CreditCard.opening_balance
+    ).filter(CreditCard.user_id.in_(user_ids)).all():
+        checked['credit_cards'] += 1
+        expected = (opening or 0) + card_totals.get(card_id, 0)
+        if (balance or 0) != expected:
+            discrepancies.append(_discrepancy('credit_card', card_id, user_id, name, balance or 0, expected))
+
+    return checked, discrepancies
+
+
+def repair_discrepancies(discrepancies):
+    """Corrige os saldos divergentes com UPDATEs em lote por chave primária"""
+    now = datetime.utcnow()
+    accounts = [{'id': d['id'], 'balance': to_cents(d['expected']), 'updated_at': now}
+                for d in discrepancies if d['kind'] == 'account']
+    cards = [{'id': d['id'], 'current_balance': to_cents(d['expected']), 'updated_at': now}
+             for d in discrepancies if d['kind'] == 'credit_card']
+    if accounts:
+        db.session.execute(update(Account), accounts)
+    if cards:
+        db.session.execute(update(CreditCard), cards)
+    for user_id in {d['user_id'] for d in discrepancies}:
+        record_changes(
+            user_id,
+            account=[d['id'] for d in discrepancies if d['user_id'] == user_id and d['kind'] == 'account'],
+            credit_card=[d['id'] for d in discrepancies if d['user_id'] == user_id and d['kind'] == 'credit_card']
+        )
+    db.session.commit()
+    return len(accounts) + len(cards)
+
+
+def _reconcile_chunk(app, shard, user_ids):
+    with app.app_context(), use_shard(shard):
+        try:
+            return reconcile_users(user_ids)
+        finally:
+            db.session.remove()
+
+
+def reconcile_all(repair=False, chunk_size=500, workers=4, user_ids=None, progress=None):
+    """Concilia todos os usuários em lotes processados em paralelo.
+
+    A leitura é feita em paralelo (uma consulta agrupada por lote); as
+    correções, quando solicitadas, são gravadas depois em uma única transação.
+    """
+    if user_ids is None:
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id).all()]
+    # Com sharding, cada lote contém apenas usuários do mesmo shard
+    chunks = [
+        (shard, shard_users[i:i + chunk_size])
+        for shard, shard_users in sharding().group_users(user_ids).items()
+        for i in range(0, len(shard_users), chunk_size)
+    ]
+
+    app = current_app._get_current_object()
+    checked = {'accounts': 0, 'credit_cards': 0}
+    discrepancies = []
+
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(lambda chunk: _reconcile_chunk(app, *chunk), chunks)
+            for index, (chunk_checked, chunk_discrepancies) in enumerate(results, start=1):
+                checked['accounts'] += chunk_checked['accounts']
+                checked['credit_cards'] += chunk_checked['credit_cards']
+                discrepancies.extend(chunk_discrepancies)
+                if progress:
+                    progress(index / len(chunks))
+    else:
+        for index, (shard, chunk) in enumerate(chunks, start=1):
+            with use_shard(shard):
+                chunk_checked, chunk_discrepancies = reconcile_users(chunk)
+            checked['accounts'] += chunk_checked['accounts']
+            checked['credit_cards'] += chunk_checked['credit_cards']
+            discrepancies.extend(chunk_discrepancies)
+            if progress:
+                progress(index / len(chunks))
+
+    repaired = 0
+    if repair and discrepancies:
+        by_shard = {}
+        for item in discrepancies:
+            by_shard.setdefault(sharding().shard_for_user(item['user_id']), []).append(item)
+        for shard, items in by_shard.items():
+            with use_shard(shard):
+                repaired += repair_discrepancies(items)
+
+    return {
+        'users_checked': len(user_ids),
+        'accounts_checked': checked['accounts'],
+        'credit_cards_checked': checked['credit_cards'],
+        'discrepancies': discrepancies,
+        'repaired': repaired
+    }
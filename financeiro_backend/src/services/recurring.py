@@ -0,0 +1,152 @@
+from src.models.user import db
+from src.models.account import Account
+from src.models.credit_card import CreditCard
+from src.models.transaction import Transaction
+from src.models.recurring_rule import RecurringRule
+from src.models.money import from_cents
+from src.services.ledger import balance_deltas
+from src.services.sharding import for_each_shard
+from src.services.budgets import record_spend
+from src.services.sync import record_changes
+from src.services.categorizer import categorizer
+from src.services.events import event_broker
+from datetime import datetime, date, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
+
+
+def next_occurrence_after(rule, after_date):
+    """Próxima ocorrência estritamente posterior à data (None se a regra terminou)"""
+    horizon = after_date + relativedelta(months=(rule.interval or 1) + 1)
+    return next(rule.iter_occurrences(after_date + timedelta(days=1), horizon), None)
+
+
+def virtual_occurrences(rules, until):
+    """Ocorrências futuras geradas em memória (não materializadas) até a data limite.
+
+    rules são RuleRow de read_models.rule_rows (com category_type resolvido)
+    """
+    occurrences = []
+    for rule in rules:
+        category_type = rule.category_type
+        amount = from_cents(rule.amount)
+        for occurrence_date in rule.pending_occurrences(until):
+            occurrences.append({
+                'rule_id': rule.id,
+                'description': rule.description,
+                'amount': amount,
+                'type': category_type,
+                'payment_type': rule.payment_type,
+                'account_id': rule.account_id,
+                'credit_card_id': rule.credit_card_id,
+                'date': occurrence_date
+            })
+    occurrences.sort(key=lambda item: item['date'])
+    return occurrences
+
+
+def materialize_due_rules(today=None, batch_size=200, user_id=None):
+    """Grava como transações as ocorrências vencidas, processando as regras em lotes.
+
+    Cada lote é confirmado em um único commit, com os saldos de contas e
+    cartões atualizados uma vez por conta/cartão afetado.
+    """
+    today = today or date.today()
+    last_id = 0
+    created = 0
+    processed_rules = 0
+
+    while True:
+        filters = [
+            RecurringRule.active == True,
+            RecurringRule.next_due_date.isnot(None),
+            RecurringRule.next_due_date <= today,
+            RecurringRule.id > last_id
+        ]
+        if user_id is not None:
+            filters.append(RecurringRule.user_id == user_id)
+
+        rules = RecurringRule.query.options(joinedload(RecurringRule.category)).filter(and_(*filters))\
+            .order_by(RecurringRule.id).limit(batch_size).all()
+        if not rules:
+            break
+
+        account_deltas = {}
+        card_deltas = {}
+        budget_entries = {}
+        created_by_user = {}
+
+        for rule in rules:
+            category_type = rule.category.type if rule.category else 'expense'
+            for occurrence_date in rule.pending_occurrences(today):
+                transaction = Transaction(
+                    user_id=rule.user_id,
+                    category_id=rule.category_id,
+                    account_id=rule.account_id,
+                    credit_card_id=rule.credit_card_id,
+                    description=rule.description,
+                    amount=rule.amount,
+                    transaction_date=occurrence_date,
+                    payment_type=rule.payment_type,
+                    type=category_type,
+                    installments=1,
+                    installment_number=1
+                )
+                db.session.add(transaction)
+                created_by_user.setdefault(rule.user_id, []).append(transaction)
+                account_delta, card_delta = balance_deltas(category_type, rule.payment_type, rule.amount)
+                if account_delta and rule.account_id:
+                    account_deltas[rule.account_id] = account_deltas.get(rule.account_id, 0) + account_delta
+                if card_delta and rule.credit_card_id:
+                    card_deltas[rule.credit_card_id] = card_deltas.get(rule.credit_card_id, 0) + card_delta
+                if category_type == 'expense':
+                    budget_entries.setdefault((rule.user_id, rule.category_id), []).append((occurrence_date, rule.amount))
+                created += 1
+
+            rule.next_due_date = next_occurrence_after(rule, today)
+            rule.updated_at = datetime.utcnow()
+
+        now = datetime.utcnow()
+        if account_deltas:
+            for account in Account.query.filter(Account.id.in_(account_deltas.keys())).all():
+                account.balance = (account.balance or 0) + account_deltas[account.id]
+                account.updated_at = now
+        if card_deltas:
+            for card in CreditCard.query.filter(CreditCard.id.in_(card_deltas.keys())).all():
+                card.current_balance = (card.current_balance or 0) + card_deltas[card.id]
+                card.updated_at = now
+
+        budget_alerts = []
+        for (owner_id, category_id), entries in budget_entries.items():
+            budget_alerts.extend((owner_id, alert) for alert in record_spend(owner_id, category_id, entries))
+
+        db.session.flush()
+        learned = []
+        for owner_id, transactions in created_by_user.items():
+            version = record_changes(
+                owner_id,
+                transaction=[transaction.id for transaction in transactions],
+                account=[transaction.account_id for transaction in transactions if transaction.account_id in account_deltas],
+                credit_card=[transaction.credit_card_id for transaction in transactions if transaction.credit_card_id in card_deltas]
+            )
+            learned.append((owner_id, [(transaction.description, transaction.category_id) for transaction in transactions], version))
+
+        db.session.commit()
+        for owner_id, items, version in learned:
+            categorizer.learn_many(owner_id, items, version)
+        for owner_id, alert in budget_alerts:
+            event_broker.publish(owner_id, 'budget.threshold', alert)
+        processed_rules += len(rules)
+        last_id = rules[-1].id
+
+    return {'rules_processed': processed_rules, 'transactions_created': created}
+
+
+def materialize_all(today=None, batch_size=200):
+    """materialize_due_rules em cada shard (ou uma vez, sem sharding)"""
+    results = for_each_shard(materialize_due_rules, today=today, batch_size=batch_size)
+    return {
+        'rules_processed': sum(result['rules_processed'] for result in results),
+        'transactions_created': sum(result['transactions_created'] for result in results)
+    }
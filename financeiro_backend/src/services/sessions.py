@@ -0,0 +1,156 @@
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from flask.json.tag import TaggedJSONSerializer
+from src.models.user import db
+from src.models.session import UserSession
+from sqlalchemy import select, insert, update, delete
+from datetime import datetime, timedelta
+import secrets
+
+
+class SessionStore:
+    """Sessões guardadas no servidor, na tabela session do banco principal.
+
+    Cada linha guarda os dados da sessão (incluindo o usuário autenticado) e
+    o instante de expiração, renovado pelo uso. Todos os processos enxergam
+    as mesmas sessões e elas sobrevivem a reinícios; as expiradas são
+    ignoradas na leitura e apagadas por purge_expired_sessions.
+
+    As leituras e escritas usam uma conexão própria do engine principal, fora
+    da db.session da requisição (e do shard do usuário).
+    """
+
+    def __init__(self, lifetime=timedelta(days=7), refresh_interval=timedelta(minutes=5)):
+        self.lifetime = lifetime
+        self.refresh_interval = refresh_interval
+        self.serializer = TaggedJSONSerializer()
+
+    def init_app(self, app):
+        self.lifetime = app.permanent_session_lifetime
+        self.refresh_interval = timedelta(
+            seconds=app.config.get('SESSION_REFRESH_SECONDS', self.refresh_interval.total_seconds())
+        )
+        app.session_interface = ServerSessionInterface(self)
+
+    def get(self, sid):
+        table = UserSession.__table__
+        now = datetime.utcnow()
+        with db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.data, table.c.expires_at).where(table.c.sid == sid, table.c.expires_at > now)
+            ).first()
+            if row is None:
+                return None
+            # A expiração desliza com o uso, gravada no máximo uma vez por refresh_interval
+            expires_at = now + self.lifetime
+            if expires_at - row.expires_at >= self.refresh_interval:
+                conn.execute(update(table).where(table.c.sid == sid).values(expires_at=expires_at))
+                conn.commit()
+        try:
+            return self.serializer.loads(row.data)
+        except ValueError:
+            return None
+
+    def set(self, sid, data):
+        table = UserSession.__table__
+        values = {
+            'user_id': data.get('user_id'),
+            'data': self.serializer.dumps(dict(data)),
+            'expires_at': datetime.utcnow() + self.lifetime
+        }
+        with db.engine.begin() as conn:
+            if not conn.execute(update(table).where(table.c.sid == sid).values(**values)).rowcount:
+                conn.execute(insert(table).values(sid=sid, created_at=datetime.utcnow(), **values))
+
+    def delete(self, sid):
+        table = UserSession.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.sid == sid))
+
+    def delete_user(self, user_id):
+        """Encerra todas as sessões de um usuário"""
+        table = UserSession.__table__
+        with db.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.user_id == user_id))
+
+
+def purge_expired_sessions(now=None, batch_size=1000):
+    """Remove as sessões expiradas em lotes (usa o índice de expires_at). Retorna o total removido"""
+    now = now or datetime.utcnow()
+    removed = 0
+    while True:
+        sids = [row.sid for row in db.session.query(UserSession.sid).filter(UserSession.expires_at <= now).limit(batch_size)]
+        if not sids:
+            break
+        UserSession.query.filter(UserSession.sid.in_(sids)).delete(synchronize_session=False)
+        db.session.commit()
+        removed += len(sids)
+    return removed
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Sessão cujo cookie carrega apenas um identificador aleatório"""
+
+    def __init__(self, initial=None, sid=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.previous_sid = None
+
+    def regenerate(self):
+        """Troca o identificador da sessão (usado no login)"""
+        if self.sid is not None:
+            self.previous_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSession(data, sid=sid)
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        if not session:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.modified:
+            return
+
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.set(session.sid, session)
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+session_store = SessionStore()
@@ -0,0 +1,256 @@
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import OrderedDict
+import os
+import re
+import threading
+import zlib
+import sqlalchemy as sa
+
+# Tabelas globais que ficam sempre no banco principal (diretório)
+DIRECTORY_TABLES = {'user', 'job', 'session'}
+SHARDING_MODES = ['user', 'hash']
+SHARD_FILE = re.compile(r'^((?:user|shard)_\d+)\.db$')
+
+_current_shard = ContextVar('current_shard', default=None)
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+def _statement_table(mapper, clause):
+    if mapper is not None:
+        return sa.inspect(mapper).local_table
+    if isinstance(clause, sa.Table):
+        return clause
+    if isinstance(clause, sa.sql.dml.UpdateBase) and isinstance(clause.table, sa.Table):
+        return clause.table
+    return None
+
+
+class ShardedSession(Session):
+    """Sessão que envia as consultas de dados do usuário para o shard ativo.
+
+    Com o modo de sharding desligado, ou fora de um contexto com shard
+    (login, jobs globais, migrações do banco principal), o comportamento é o
+    mesmo da sessão padrão do Flask-SQLAlchemy.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = current_shard()
+        if bind is None and shard is not None:
+            table = _statement_table(mapper, clause)
+            if table is None or table.name not in DIRECTORY_TABLES:
+                return current_app.extensions['sharding'].engine(shard)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ShardRouter:
+    """Resolve o shard de cada usuário e mantém um engine SQLite por shard.
+
+    SHARDING_MODE = None (padrão, banco único), 'user' (um arquivo por usuário)
+    ou 'hash' (SHARD_COUNT arquivos, usuário escolhido por crc32 do id).
+    Os arquivos ficam em SHARD_DIR; as tabelas são criadas no primeiro uso.
+    Só os MAX_SHARD_ENGINES engines usados mais recentemente ficam abertos (no
+    modo 'user' há um arquivo por usuário): o menos usado é descartado com
+    dispose() e recriado quando o shard voltar a ser usado.
+    """
+
+    def __init__(self):
+        self.mode = None
+        self.shard_count = 8
+        self.directory = None
+        self.db = None
+        self.max_engines = 64
+        self._engines = OrderedDict()
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        self.mode = app.config.get('SHARDING_MODE') or None
+        if self.mode is not None and self.mode not in SHARDING_MODES:
+            raise ValueError(f'SHARDING_MODE inválido: {self.mode}')
+        self.shard_count = int(app.config.get('SHARD_COUNT', self.shard_count))
+        self.max_engines = max(1, int(app.config.get('MAX_SHARD_ENGINES', self.max_engines)))
+        self.directory = app.config.get('SHARD_DIR') or os.path.join(app.instance_path, 'shards')
+        self.db = db
+        app.extensions['sharding'] = self
+
+        if self.mode is not None:
+            os.makedirs(self.directory, exist_ok=True)
+
+            @app.before_request
+            def bind_user_shard():
+                from flask import session, g
+                if 'user_id' in session:
+                    g.shard_token = _current_shard.set(self.shard_for_user(session['user_id']))
+
+            @app.teardown_request
+            def release_user_shard(exc=None):
+                from flask import g
+                token = g.pop('shard_token', None)
+                if token is not None:
+                    _current_shard.reset(token)
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def shard_for_user(self, user_id):
+        if self.mode is None:
+            return None
+        if self.mode == 'user':
+            return f'user_{int(user_id)}'
+        return f'shard_{zlib.crc32(str(int(user_id)).encode()) % self.shard_count}'
+
+    def shard_tables(self):
+        return [table for table in self.db.metadata.sorted_tables if table.name not in DIRECTORY_TABLES]
+
+    def engine(self, shard):
+        with self._lock:
+            engine = self._engines.get(shard)
+            if engine is not None:
+                self._engines.move_to_end(shard)
+                return engine
+
+            engine = sa.create_engine(f"sqlite:///{os.path.join(self.directory, shard + '.db')}")
+            if shard not in self._created:
+                self.db.metadata.create_all(engine, tables=self.shard_tables())
+                self._created.add(shard)
+            self._engines[shard] = engine
+            while len(self._engines) > self.max_engines:
+                # Conexões em uso continuam válidas; o pool antigo só deixa de recebê-las
+                _, evicted = self._engines.popitem(last=False)
+                evicted.dispose()
+        return engine
+
+    def dispose_engines(self):
+        """Fecha as conexões abertas dos shards (ex.: antes de restaurar um backup).
+
+        Os engines são descartados e as tabelas conferidas de novo no próximo uso:
+        o arquivo de um shard pode ter sido substituído ou removido.
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._created.clear()
+
+    def existing_shards(self):
+        if self.mode is None or not os.path.isdir(self.directory):
+            return []
+        return sorted(match.group(1) for match in map(SHARD_FILE.match, os.listdir(self.directory)) if match)
+
+    def group_users(self, user_ids):
+        """{shard: [user_ids]} (um único grupo None com o sharding desligado)"""
+        groups = {}
+        for user_id in user_ids:
+            groups.setdefault(self.shard_for_user(user_id), []).append(user_id)
+        return groups
+
+
+def sharding():
+    return current_app.extensions['sharding'] if has_app_context() else None
+
+
+@contextmanager
+def use_shard(shard):
+    """Direciona as consultas de db.session para o shard informado (None = banco principal)"""
+    from src.models.user import db
+
+    # Os objetos carregados pertencem a um único banco: a sessão é descartada
+    # ao trocar de shard (quem chama confirma as alterações antes)
+    switching = current_shard() != shard
+    if switching:
+        db.session.remove()
+    token = _current_shard.set(shard)
+    try:
+        yield
+    finally:
+        if switching:
+            db.session.remove()
+        _current_shard.reset(token)
+
+
+@contextmanager
+def use_user_shard(user_id):
+    """use_shard para o shard do usuário (banco principal se user_id for None)"""
+    with use_shard(sharding().shard_for_user(user_id) if user_id is not None else None):
+        yield
+
+
+def for_each_shard(func, *args, **kwargs):
+    """Executa func em cada shard existente, ou uma vez no banco principal sem sharding"""
+    router = sharding()
+    if not router.enabled:
+        return [func(*args, **kwargs)]
+    results = []
+    for shard in router.existing_shards():
+        with use_shard(shard):
+            results.append(func(*args, **kwargs))
+    return results
+
+
+def _user_filter(table, user_ids):
+    """Filtro das linhas de uma tabela que pertencem aos usuários (direto ou via chave estrangeira)"""
+    if 'user_id' in table.c:
+        return table.c.user_id.in_(user_ids)
+    for foreign_key in table.foreign_keys:
+        parent = foreign_key.column.table
+        if 'user_id' in parent.c:
+            return foreign_key.parent.in_(
+                sa.select(foreign_key.column).where(parent.c.user_id.in_(user_ids))
+            )
+    return None
+
+
+def split_database(purge=False, batch_size=1000):
+    """Copia os dados de cada usuário do banco principal para o seu shard.
+
+    Os ids são preservados (INSERT OR REPLACE), então o comando pode ser
+    executado de novo com segurança. Com purge=True as linhas copiadas são
+    removidas do banco principal ao final.
+    """
+    from src.models.user import db
+
+    router = sharding()
+    if not router.enabled:
+        raise ValueError('Defina SHARDING_MODE para dividir o banco')
+
+    source = db.engine
+    users_table = db.metadata.tables['user']
+    with source.connect() as connection:
+        user_ids = [row[0] for row in connection.execute(sa.select(users_table.c.id))]
+
+    tables = router.shard_tables()
+    copied = {}
+    groups = router.group_users(user_ids)
+
+    for shard, shard_users in groups.items():
+        with source.connect() as reader, router.engine(shard).begin() as writer:
+            for table in tables:
+                condition = _user_filter(table, shard_users)
+                if condition is None:
+                    continue
+                result = reader.execute(sa.select(table).where(condition))
+                while True:
+                    rows = result.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    writer.execute(table.insert().prefix_with('OR REPLACE'), [dict(row._mapping) for row in rows])
+                    copied[table.name] = copied.get(table.name, 0) + len(rows)
+
+    if purge:
+        with source.begin() as connection:
+            for table in reversed(tables):
+                condition = _user_filter(table, user_ids)
+                if condition is not None:
+                    connection.execute(table.delete().where(condition))
+
+    return {'users': len(user_ids), 'shards': len(groups), 'rows_copied': copied, 'purged': purge}
+
+
+shard_router = ShardRouter()
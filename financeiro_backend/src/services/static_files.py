@@ -0,0 +1,121 @@
+from flask import send_file
+import gzip
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote brotli só os arquivos .gz são gerados
+    brotli = None
+
+# Arquivos gerados pelo build do Vite em assets/ com o hash de 8 caracteres no nome
+# (ex.: assets/index-BfX9a2Qd.js). Os arquivos de public/ (favicon.ico,
+# apple-touch-icon.png, service workers) são copiados sem hash e revalidam sempre.
+HASHED_NAME = re.compile(r'^assets/(?:.+/)?[^/]+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.html', '.svg', '.json', '.txt', '.map', '.ico', '.xml'}
+MIN_COMPRESS_SIZE = 1024
+
+
+class StaticEntry:
+    __slots__ = ('path', 'mimetype', 'immutable', 'variants')
+
+    def __init__(self, path, mimetype, immutable):
+        self.path = path
+        self.mimetype = mimetype
+        self.immutable = immutable
+        self.variants = {}
+
+
+class StaticManifest:
+    """Lista dos arquivos estáticos montada uma única vez na inicialização.
+
+    Cada requisição é resolvida com uma busca no dicionário (sem os.path.exists):
+    arquivos do build com hash no nome recebem Cache-Control immutable, irmãos
+    pré-comprimidos (.br/.gz) são servidos conforme o Accept-Encoding e
+    qualquer caminho desconhecido cai no index.html da SPA.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.entries = {}
+        self.index = None
+        self._scan()
+
+    def _scan(self):
+        if not self.folder or not os.path.isdir(self.folder):
+            return
+        files = set()
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                files.add(os.path.relpath(os.path.join(root, name), self.folder).replace(os.sep, '/'))
+
+        for relative in files:
+            if any(relative.endswith(suffix) and relative[:-len(suffix)] in files for _, suffix in ENCODINGS):
+                continue
+            mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+            immutable = bool(HASHED_NAME.match(relative))
+            entry = StaticEntry(os.path.join(self.folder, relative), mimetype, immutable)
+            for encoding, suffix in ENCODINGS:
+                if relative + suffix in files:
+                    entry.variants[encoding] = entry.path + suffix
+            self.entries[relative] = entry
+
+        index = self.entries.get('index.html')
+        if index is not None:
+            index.immutable = False
+            self.index = index
+
+    def resolve(self, path):
+        """Entrada do arquivo pedido, ou o index.html para as rotas da SPA"""
+        return self.entries.get(path) or self.index
+
+    def response(self, path, accept_encodings):
+        entry = self.resolve(path)
+        if entry is None:
+            return None
+
+        file_path = entry.path
+        encoding = None
+        for candidate, _ in ENCODINGS:
+            if candidate in entry.variants and accept_encodings[candidate] > 0:
+                file_path = entry.variants[candidate]
+                encoding = candidate
+                break
+
+        response = send_file(file_path, mimetype=entry.mimetype, conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry.variants:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if entry.immutable else REVALIDATE_CACHE
+        return response
+
+
+def compress_static(folder, min_size=MIN_COMPRESS_SIZE):
+    """Gera os irmãos .gz (e .br, se o pacote brotli estiver instalado) dos arquivos compressíveis"""
+    created = 0
+    for root, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(path) < min_size:
+                continue
+            with open(path, 'rb') as source:
+                data = source.read()
+            outputs = [('.gz', lambda value: gzip.compress(value, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                outputs.append(('.br', lambda value: brotli.compress(value, quality=11)))
+            for suffix, compress in outputs:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target, 'wb') as output:
+                    output.write(compressed)
+                created += 1
+    return created
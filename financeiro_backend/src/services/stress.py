@@ -0,0 +1,313 @@
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Peso de cada operação na carga simulada (ajustável com --mix)
+DEFAULT_MIX = {
+    'login': 5,
+    'create': 25,
+    'create_installments': 10,
+    'delete': 10,
+    'dashboard': 25,
+    'report': 15,
+    'list': 10
+}
+STRESS_PASSWORD = 'stress-test'
+LOCK_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_mix(text):
+    """'create=30,dashboard=20' -> pesos (operações omitidas ficam com peso 0)"""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f'Operação desconhecida: {name}')
+        mix[name] = int(weight)
+    if not any(mix.values()):
+        raise ValueError('Informe ao menos uma operação com peso positivo')
+    return mix
+
+
+def serve():
+    """Processo servidor do stress-test (configurado por variáveis de ambiente).
+
+    Cria os usuários de teste no banco de DATABASE_DIR, registra os erros de
+    lock do SQLite em STRESS_LOCK_LOG (uma linha por erro, de qualquer
+    processo) e atende com o servidor multi-thread do Werkzeug.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    from werkzeug.serving import run_simple
+    from src.main import app
+
+    lock_log = os.environ['STRESS_LOCK_LOG']
+
+    @event.listens_for(Engine, 'handle_error')
+    def record_lock_error(context):
+        message = str(context.original_exception)
+        if any(text in message for text in LOCK_MESSAGES):
+            with open(lock_log, 'a') as log:
+                log.write(f'{os.getpid()} {message}\n')
+
+    with app.app_context():
+        seed_users(int(os.environ['STRESS_USERS']))
+
+    run_simple('127.0.0.1', int(os.environ['STRESS_PORT']), app, threaded=True, use_reloader=False)
+
+
+def seed_users(count):
+    """Usuários stress_1..N com uma categoria de cada tipo, uma conta e um cartão"""
+    from src.models.user import db, User
+    from src.models.category import Category
+    from src.models.account import Account
+    from src.models.credit_card import CreditCard
+    from src.services.passwords import hash_password
+    from src.services.sharding import use_user_shard
+
+    password = None
+    for index in range(1, count + 1):
+        username = f'stress_{index}'
+        if User.query.filter_by(username=username).first():
+            continue
+        password = password or hash_password(STRESS_PASSWORD)
+        user = User(username=username, password=password)
+        db.session.add(user)
+        db.session.commit()
+        with use_user_shard(user.id):
+            db.session.add(Category(user_id=user.id, name='Salário', type='income', is_default=True))
+            db.session.add(Category(user_id=user.id, name='Alimentação', type='expense', is_default=True))
+            db.session.add(Account(user_id=user.id, name='Conta Corrente', balance=0))
+            db.session.add(CreditCard(user_id=user.id, name='Cartão', closing_day=10))
+            db.session.commit()
+
+
+def _wait_ready(base_url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Servidor terminou com código {process.returncode}')
+        try:
+            urllib.request.urlopen(base_url + '/api/auth/check', timeout=1)
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('Servidor não respondeu a tempo')
+
+
+class SimulatedUser:
+    """Cliente HTTP com cookies próprios que executa as operações de um usuário"""
+
+    def __init__(self, base_url, username, rng):
+        self.base_url = base_url
+        self.username = username
+        self.rng = rng
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.created = []
+        self.ids = {}
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with self.opener.open(request, timeout=30) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def login(self):
+        status, _ = self.request('POST', '/api/auth/login', {'username': self.username, 'password': STRESS_PASSWORD})
+        return status
+
+    def load_ids(self):
+        _, categories = self.request('GET', '/api/categories')
+        _, accounts = self.request('GET', '/api/accounts')
+        _, cards = self.request('GET', '/api/credit-cards')
+        for category in categories['categories']:
+            self.ids[category['type']] = category['id']
+        self.ids['account'] = accounts['accounts'][0]['id']
+        self.ids['card'] = cards['credit_cards'][0]['id']
+
+    def _transaction(self, installments):
+        day = date.today() - timedelta(days=self.rng.randrange(365))
+        payload = {
+            'description': f'stress {self.rng.randrange(10 ** 6)}',
+            'amount': f'{self.rng.uniform(1, 500):.2f}',
+            'transaction_date': day.isoformat(),
+            'category_id': self.ids['expense'],
+            'installments': installments
+        }
+        if installments > 1:
+            payload.update(payment_type='credit_card', credit_card_id=self.ids['card'])
+        else:
+            payload.update(payment_type='pix', account_id=self.ids['account'])
+        status, body = self.request('POST', '/api/transactions', payload)
+        if status == 201 and body:
+            self.created.append(body['transaction']['id'])
+        return status
+
+    def run(self, operation):
+        if operation == 'login':
+            return self.login()
+        if operation == 'create':
+            return self._transaction(1)
+        if operation == 'create_installments':
+            return self._transaction(self.rng.randint(2, 12))
+        if operation == 'delete':
+            if not self.created:
+                return self._transaction(1)
+            transaction_id = self.created.pop(self.rng.randrange(len(self.created)))
+            return self.request('DELETE', f'/api/transactions/{transaction_id}')[0]
+        if operation == 'dashboard':
+            return self.request('GET', '/api/dashboard')[0]
+        if operation == 'report':
+            end = date.today()
+            start = end - timedelta(days=self.rng.choice([30, 90, 365]))
+            group_by = self.rng.choice(['category', 'month'])
+            return self.request(
+                'GET', f'/api/reports/summary?start_date={start}&end_date={end}&group_by={group_by}'
+            )[0]
+        if operation == 'list':
+            return self.request('GET', f'/api/transactions?page={self.rng.randint(1, 3)}')[0]
+        raise ValueError(operation)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(samples, elapsed, lock_errors):
+    """Vazão, latências (p50/p95/p99/máx em ms) e taxas de erro por operação e no total"""
+    def stats(items):
+        latencies = sorted(latency for _, latency, _ in items)
+        server_errors = sum(1 for _, _, status in items if status >= 500)
+        failed = sum(1 for _, _, status in items if status >= 400)
+        return {
+            'requests': len(items),
+            'per_second': len(items) / elapsed if elapsed else 0.0,
+            'p50_ms': _percentile(latencies, 0.50) * 1000,
+            'p95_ms': _percentile(latencies, 0.95) * 1000,
+            'p99_ms': _percentile(latencies, 0.99) * 1000,
+            'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+            'server_errors': server_errors,
+            'error_rate': failed / len(items) if items else 0.0
+        }
+
+    operations = {}
+    for sample in samples:
+        operations.setdefault(sample[0], []).append(sample)
+    total = stats(samples)
+    total['lock_errors'] = lock_errors
+    total['lock_error_rate'] = lock_errors / len(samples) if samples else 0.0
+    return {
+        'elapsed': elapsed,
+        'total': total,
+        'operations': {name: stats(items) for name, items in sorted(operations.items())}
+    }
+
+
+def run_stress(users=20, duration=30.0, mix=None, workers=1, port=5900, seed=None, database_dir=None,
+               think_time=0.0):
+    """Sobe o servidor em um banco descartável e aplica a carga mista de vários usuários.
+
+    workers > 1 inicia processos servidores independentes sobre o mesmo
+    arquivo SQLite (como vários workers de produção); como as sessões ficam
+    na memória de cada processo, cada usuário simulado fala sempre com o
+    mesmo processo. Cada usuário é uma thread cliente executando operações
+    sorteadas pelos pesos de `mix` até acabar o tempo.
+    """
+    mix = mix or dict(DEFAULT_MIX)
+    operations = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in operations]
+
+    keep = database_dir is not None
+    database_dir = database_dir or tempfile.mkdtemp(prefix='financeiro-stress-')
+    os.makedirs(database_dir, exist_ok=True)
+    lock_log = os.path.join(database_dir, 'lock-errors.log')
+    open(lock_log, 'w').close()
+
+    servers = []
+    try:
+        for index in range(workers):
+            env = dict(
+                os.environ, DATABASE_DIR=database_dir, STRESS_LOCK_LOG=lock_log,
+                STRESS_USERS=str(users), STRESS_PORT=str(port + index)
+            )
+            servers.append(subprocess.Popen(
+                [sys.executable, '-c', 'from src.services.stress import serve; serve()'],
+                cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ))
+            # O primeiro processo cria o banco e os usuários antes dos demais subirem
+            _wait_ready(f'http://127.0.0.1:{port + index}', servers[-1])
+
+        master = random.Random(seed)
+        clients = []
+        for index in range(users):
+            client = SimulatedUser(
+                f'http://127.0.0.1:{port + index % workers}', f'stress_{index + 1}', random.Random(master.random())
+            )
+            if client.login() != 200:
+                raise RuntimeError(f'Login de {client.username} falhou')
+            client.load_ids()
+            clients.append(client)
+
+        samples = []
+        samples_lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def drive(client):
+            local = []
+            while time.monotonic() < deadline:
+                operation = client.rng.choices(operations, weights)[0]
+                started = time.perf_counter()
+                try:
+                    status = client.run(operation)
+                except OSError:
+                    status = 599  # Conexão recusada ou tempo esgotado
+                local.append((operation, time.perf_counter() - started, status))
+                if think_time:
+                    time.sleep(client.rng.uniform(0, 2 * think_time))
+            with samples_lock:
+                samples.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=drive, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        with open(lock_log) as log:
+            lock_errors = sum(1 for _ in log)
+        result = summarize(samples, elapsed, lock_errors)
+        result.update(users=users, workers=workers, database_dir=database_dir if keep else None)
+        return result
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+        if not keep:
+            shutil.rmtree(database_dir, ignore_errors=True)
@@ -0,0 +1,160 @@
+from src.models.user import db
+from src.models.account import Account
+from src.models.credit_card import CreditCard
+from src.models.category import Category
+from src.models.change_log import ChangeLog, SyncVersion, SYNC_ENTITIES
+from src.services.installments import ledger_rows, ledger_row_dicts
+from sqlalchemy.dialects.sqlite import insert
+from datetime import datetime, timedelta
+from flask import current_app
+
+# Lápides mais antigas que isto são removidas; clientes parados há mais tempo
+# recebem uma sincronização completa
+DEFAULT_TOMBSTONE_DAYS = 90
+# Linhas por INSERT no log (abaixo do limite de parâmetros do SQLite em operações em lote)
+LOG_CHUNK_SIZE = 500
+
+SYNC_MODELS = {'account': Account, 'credit_card': CreditCard, 'category': Category}
+PAYLOAD_KEYS = {'account': 'accounts', 'credit_card': 'credit_cards', 'category': 'categories', 'transaction': 'transactions'}
+
+
+def _next_version(user_id):
+    """Incrementa a versão do usuário com um único upsert. Retorna a nova versão"""
+    statement = insert(SyncVersion).values(user_id=user_id, version=1, tombstone_floor=0)
+    statement = statement.on_conflict_do_update(
+        index_elements=['user_id'],
+        set_={'version': SyncVersion.version + 1}
+    ).returning(SyncVersion.version)
+    return db.session.execute(statement).scalar()
+
+
+def record_changes(user_id, deleted=None, **changed):
+    """Registra alterações no log de sincronização, na mesma transação da escrita (sem commit).
+
+    changed e deleted mapeiam entidade -> ids, ex.:
+    record_changes(user_id, transaction=[10], account=[1], deleted={'category': [3]}).
+    Todas as alterações da chamada recebem a mesma versão.
+    """
+    entries = []
+    for entity, ids, is_deleted in (
+        [(entity, ids, False) for entity, ids in changed.items()] +
+        [(entity, ids, True) for entity, ids in (deleted or {}).items()]
+    ):
+        if entity not in SYNC_ENTITIES:
+            raise ValueError(f'Entidade de sincronização desconhecida: {entity}')
+        entries.extend((entity, int(entity_id), is_deleted) for entity_id in set(ids) if entity_id is not None)
+    if not entries:
+        return None
+
+    version = _next_version(user_id)
+    now = datetime.utcnow()
+    for start in range(0, len(entries), LOG_CHUNK_SIZE):
+        statement = insert(ChangeLog).values([
+            {'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'version': version,
+             'deleted': is_deleted, 'changed_at': now}
+            for entity, entity_id, is_deleted in entries[start:start + LOG_CHUNK_SIZE]
+        ])
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=['user_id', 'entity', 'entity_id'],
+            set_={
+                'version': statement.excluded.version,
+                'deleted': statement.excluded.deleted,
+                'changed_at': statement.excluded.changed_at
+            }
+        ))
+    return version
+
+
+def _load_records(user_id, entity, ids=None):
+    """Dicionários da API dos registros (todos quando ids é None), por id"""
+    if entity == 'transaction':
+        ledger = ledger_rows(user_id)
+        query = db.session.query(ledger.c.source_id, ledger.c.installment_number, ledger.c.archived)
+        if ids is not None:
+            query = query.filter(ledger.c.source_id.in_(ids))
+        rows = query.order_by(ledger.c.source_id, ledger.c.installment_number).all()
+        records = {}
+        for row, record in zip(rows, ledger_row_dicts(rows)):
+            records.setdefault(row.source_id, []).append(record)
+        return records
+
+    model = SYNC_MODELS[entity]
+    query = model.query.filter(model.user_id == user_id)
+    if ids is not None:
+        query = query.filter(model.id.in_(ids))
+    return {record.id: [record.to_dict()] for record in query.all()}
+
+
+def sync_changes(user_id, since=0):
+    """Registros alterados e excluídos desde a versão `since`.
+
+    since=0, uma versão posterior à atual (banco restaurado) ou anterior às
+    lápides já removidas devolvem tudo com full=True: o cliente substitui os
+    dados locais. Transações vêm expandidas (uma linha por parcela); o
+    cliente troca todas as linhas de cada transação alterada (id ou
+    parent_transaction_id igual ao id original) e remove as das excluídas.
+    """
+    state = db.session.get(SyncVersion, user_id)
+    version = state.version if state else 0
+    floor = state.tombstone_floor if state else 0
+    full = since <= 0 or since > version or since < floor
+
+    changes = {key: [] for key in PAYLOAD_KEYS.values()}
+    deleted = {key: [] for key in PAYLOAD_KEYS.values()}
+
+    if full:
+        for entity, key in PAYLOAD_KEYS.items():
+            for records in _load_records(user_id, entity).values():
+                changes[key].extend(records)
+    else:
+        log = db.session.query(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.deleted).filter(
+            ChangeLog.user_id == user_id,
+            ChangeLog.version > since,
+            ChangeLog.version <= version
+        ).all()
+        by_entity = {}
+        for entity, entity_id, is_deleted in log:
+            if is_deleted:
+                deleted[PAYLOAD_KEYS[entity]].append(entity_id)
+            else:
+                by_entity.setdefault(entity, []).append(entity_id)
+        for entity, ids in by_entity.items():
+            records = _load_records(user_id, entity, ids)
+            key = PAYLOAD_KEYS[entity]
+            for entity_id in ids:
+                if entity_id in records:
+                    changes[key].extend(records[entity_id])
+                else:
+                    # Alterado e depois removido sem passar pelo log (ex.: em cascata)
+                    deleted[key].append(entity_id)
+
+    return {
+        'version': version,
+        'since': since,
+        'full': full,
+        'changes': changes,
+        'deleted': deleted
+    }
+
+
+def purge_tombstones(older_than_days=None, now=None):
+    """Remove as lápides antigas e sobe o tombstone_floor dos usuários afetados. Retorna o total removido"""
+    if older_than_days is None:
+        older_than_days = current_app.config.get('SYNC_TOMBSTONE_DAYS', DEFAULT_TOMBSTONE_DAYS)
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    floors = db.session.query(ChangeLog.user_id, db.func.max(ChangeLog.version)).filter(
+        ChangeLog.deleted == True,
+        ChangeLog.changed_at < cutoff
+    ).group_by(ChangeLog.user_id).all()
+    removed = 0
+    for user_id, floor in floors:
+        removed += ChangeLog.query.filter(
+            ChangeLog.user_id == user_id,
+            ChangeLog.deleted == True,
+            ChangeLog.version <= floor
+        ).delete(synchronize_session=False)
+        SyncVersion.query.filter(SyncVersion.user_id == user_id).update(
+            {'tombstone_floor': db.func.max(SyncVersion.tombstone_floor, floor)}, synchronize_session=False
+        )
+    db.session.commit()
+    return removed
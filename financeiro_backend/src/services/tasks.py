@@ -0,0 +1,110 @@
+from src.models.user import db
+from src.models.credit_card import CreditCard
+from src.services.jobs import register_job
+from src.services.recurring import materialize_all
+from src.services.reconciliation import ledger_totals, reconcile_all
+from src.services.idempotency import purge_expired_keys
+from src.services.sessions import purge_expired_sessions
+from src.services.budgets import rebuild_user_counters
+from src.services.archive import archive_transactions
+from src.services.backup import create_snapshot
+from src.services.sync import purge_tombstones, record_changes
+from src.services.sharding import for_each_shard
+from datetime import datetime
+
+
+@register_job('recurring.materialize')
+def materialize_recurring_job(params, ctx):
+    """Materializa as ocorrências vencidas de todos os usuários"""
+    ctx.progress(0.0, 'Materializando lançamentos recorrentes')
+    return materialize_all(batch_size=int(params.get('batch_size', 200)))
+
+
+@register_job('credit_card.recompute_balance', user_facing=True)
+def recompute_credit_card_balance_job(params, ctx):
+    """Recalcula o saldo dos cartões do usuário a partir dos lançamentos"""
+    query = CreditCard.query.filter_by(user_id=ctx.user_id)
+    if params.get('credit_card_id'):
+        query = query.filter_by(id=int(params['credit_card_id']))
+    cards = query.all()
+
+    _, totals = ledger_totals(user_ids=[ctx.user_id])
+
+    updated = []
+    for index, card in enumerate(cards, start=1):
+        expected = (card.opening_balance or 0) + totals.get(card.id, 0)
+        if card.current_balance != expected:
+            card.current_balance = expected
+            card.updated_at = datetime.utcnow()
+            updated.append(card.id)
+        ctx.progress(index / len(cards), f'Cartão {card.name} recalculado')
+
+    record_changes(ctx.user_id, credit_card=updated)
+    db.session.commit()
+    return {'cards_checked': len(cards), 'cards_updated': updated}
+
+
+@register_job('balances.reconcile')
+def reconcile_balances_job(params, ctx):
+    """Concilia os saldos de todos os usuários (uso administrativo)"""
+    result = reconcile_all(
+        repair=bool(params.get('repair')),
+        chunk_size=int(params.get('chunk_size', 500)),
+        workers=int(params.get('workers', 4)),
+        progress=lambda fraction: ctx.progress(fraction, 'Conciliando saldos')
+    )
+    result['discrepancies'] = len(result['discrepancies'])
+    return result
+
+
+@register_job('balances.reconcile_user', user_facing=True)
+def reconcile_user_balances_job(params, ctx):
+    """Concilia os saldos do próprio usuário"""
+    return reconcile_all(repair=bool(params.get('repair')), workers=1, user_ids=[ctx.user_id])
+
+
+@register_job('idempotency.purge')
+def purge_idempotency_keys_job(params, ctx):
+    """Remove as Idempotency-Keys expiradas de todos os usuários"""
+    ctx.progress(0.0, 'Removendo chaves de idempotência expiradas')
+    return {'removed': sum(for_each_shard(purge_expired_keys))}
+
+
+@register_job('sessions.purge')
+def purge_sessions_job(params, ctx):
+    """Remove as sessões de login expiradas"""
+    ctx.progress(0.0, 'Removendo sessões expiradas')
+    return {'removed': purge_expired_sessions()}
+
+
+@register_job('budgets.rebuild', user_facing=True)
+def rebuild_budgets_job(params, ctx):
+    """Recalcula os contadores de gastos dos orçamentos do usuário"""
+    rebuilt = rebuild_user_counters(ctx.user_id)
+    db.session.commit()
+    return {'budgets_rebuilt': rebuilt}
+
+
+@register_job('transactions.archive')
+def archive_transactions_job(params, ctx):
+    """Arquiva os lançamentos de períodos fechados de todos os usuários"""
+    ctx.progress(0.0, 'Arquivando lançamentos antigos')
+    before = datetime.strptime(params['before'], '%Y-%m-%d').date() if params.get('before') else None
+    return archive_transactions(before=before, batch_size=int(params.get('batch_size', 500)))
+
+
+@register_job('database.backup')
+def backup_database_job(params, ctx):
+    """Grava um snapshot online dos bancos e aplica a retenção"""
+    ctx.progress(0.0, 'Copiando os bancos')
+    result = create_snapshot(keep=int(params['keep']) if params.get('keep') else None)
+    result['files'] = len(result['files'])
+    return result
+
+
+@register_job('sync.purge_tombstones')
+def purge_sync_tombstones_job(params, ctx):
+    """Remove do log de sincronização as lápides antigas de todos os usuários"""
+    ctx.progress(0.0, 'Removendo lápides antigas')
+    days = int(params['days']) if params.get('days') else None
+    return {'removed': sum(for_each_shard(purge_tombstones, days))}
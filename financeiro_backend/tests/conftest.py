@@ -0,0 +1,86 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# O app cria o banco na importação: cada execução dos testes usa um diretório próprio
+os.environ.setdefault('DATABASE_DIR', tempfile.mkdtemp(prefix='financeiro-tests-'))
+os.environ.setdefault('STATIC_MANIFEST', '0')
+
+from src.main import app as flask_app
+from src.models.user import db, User
+from src.models.account import Account
+from src.models.category import Category
+from src.models.credit_card import CreditCard
+from src.services.passwords import hash_password
+
+PASSWORD = 'senha-de-teste'
+
+
+class UserData:
+    """Usuário de teste com uma categoria de cada tipo, uma conta e um cartão"""
+
+    def __init__(self, user_id, expense_id, income_id, account_id, credit_card_id):
+        self.id = user_id
+        self.expense_id = expense_id
+        self.income_id = income_id
+        self.account_id = account_id
+        self.credit_card_id = credit_card_id
+
+
+@pytest.fixture(scope='session')
+def app():
+    flask_app.config['TESTING'] = True
+    flask_app.config['ADMISSION_ENABLED'] = False
+    flask_app.extensions['admission'].enabled = False
+    return flask_app
+
+
+@pytest.fixture
+def user(app):
+    """Usuário novo por teste: os dados de um teste não aparecem nos outros"""
+    with app.app_context():
+        user = User(username=f'teste-{uuid.uuid4().hex[:12]}', password=hash_password(PASSWORD))
+        db.session.add(user)
+        db.session.flush()
+        expense = Category(user_id=user.id, name='Mercado', type='expense', is_default=False)
+        income = Category(user_id=user.id, name='Salário', type='income', is_default=False)
+        account = Account(user_id=user.id, name='Conta', balance=0)
+        card = CreditCard(user_id=user.id, name='Cartão', closing_day=10)
+        db.session.add_all([expense, income, account, card])
+        db.session.commit()
+        return UserData(user.id, expense.id, income.id, account.id, card.id), user.username
+
+
+@pytest.fixture
+def client(app, user):
+    data, username = user
+    client = app.test_client()
+    response = client.post('/api/auth/login', json={'username': username, 'password': PASSWORD})
+    assert response.status_code == 200
+    client.user = data
+    return client
+
+
+@pytest.fixture
+def create_transaction(client):
+    """POST /api/transactions com os dados padrão do usuário de teste"""
+    def create(amount, transaction_date, **fields):
+        body = {
+            'description': 'Compra',
+            'amount': amount,
+            'transaction_date': transaction_date,
+            'category_id': client.user.expense_id,
+            'payment_type': 'debit',
+            'account_id': client.user.account_id
+        }
+        if fields.get('payment_type') == 'credit_card':
+            body.pop('account_id')
+            body['credit_card_id'] = client.user.credit_card_id
+        body.update(fields)
+        return client.post('/api/transactions', json=body)
+    return create
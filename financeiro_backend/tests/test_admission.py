@@ -0,0 +1,14 @@
+from src.services.admission import AdmissionController
+
+
+def test_cost_never_exceeds_capacity_or_burst():
+    controller = AdmissionController()
+    controller.capacity = 8
+    controller.burst = 3
+    controller.costs = {'dashboard.get_projections': 10}
+
+    # Custo acima do burst nunca caberia no bucket do usuário
+    assert controller.cost_for('dashboard.get_projections', 4) == 3
+    assert controller.cost_for('transactions.bulk_transactions', 2) == 2
+    bucket = controller._bucket(1, 'dashboard.get_projections')
+    assert bucket.take(controller.cost_for('dashboard.get_projections', 4), controller.rate, controller.burst) is None
@@ -0,0 +1,54 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+
+def spent_by_period(client, day=None):
+    query = {'date': day.isoformat()} if day else {}
+    budgets = client.get('/api/budgets', query_string=query).get_json()['budgets']
+    return {budget['period']: budget['spent'] for budget in budgets}
+
+
+def create_budgets(client):
+    for period, limit_amount in [('monthly', 100), ('yearly', 1000)]:
+        response = client.post('/api/budgets', json={
+            'category_id': client.user.expense_id, 'limit_amount': limit_amount, 'period': period
+        })
+        assert response.status_code == 201
+
+
+def test_budget_only_for_expense_categories(client):
+    response = client.post('/api/budgets', json={'category_id': client.user.income_id, 'limit_amount': 100})
+    assert response.status_code == 400
+
+
+def test_counters_include_spending_before_budget(client, create_transaction):
+    today = date.today()
+    create_transaction(30, today.isoformat())
+    create_budgets(client)
+
+    assert spent_by_period(client) == {'monthly': 30.0, 'yearly': 30.0}
+
+
+def test_counters_follow_installments_and_deletes(client, create_transaction):
+    today = date.today()
+    create_budgets(client)
+
+    response = create_transaction(80, today.isoformat())
+    assert [alert['threshold'] for alert in response.get_json()['budget_alerts']] == [0.8]
+
+    response = create_transaction(300, today.isoformat(), payment_type='credit_card', installments=3)
+    transaction_id = response.get_json()['transaction']['id']
+
+    # Cada parcela conta no mês em que cai
+    assert spent_by_period(client)['monthly'] == 180.0
+    assert spent_by_period(client, today + relativedelta(months=1))['monthly'] == 100.0
+
+    client.delete(f'/api/transactions/{transaction_id}')
+    assert spent_by_period(client) == {'monthly': 80.0, 'yearly': 80.0}
+
+    response = client.post('/api/transactions/bulk', json={
+        'action': 'delete', 'filter': {'category_id': client.user.expense_id}
+    })
+    assert response.get_json()['affected'] == 1
+    assert spent_by_period(client) == {'monthly': 0.0, 'yearly': 0.0}
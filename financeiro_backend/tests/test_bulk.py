@@ -0,0 +1,16 @@
+import pytest
+
+
+@pytest.mark.parametrize('body', [
+    ['delete'],
+    {'action': 'delete', 'filter': ['category_id']},
+    {'action': 'delete', 'filter': {'category_id': 'abc'}},
+    {'action': 'delete', 'filter': {'account_id': [1]}},
+    {'action': 'delete', 'filter': {'start_date': 20260101}},
+    {'action': 'delete', 'filter': {'end_date': '01/01/2026'}},
+    {'action': 'delete', 'filter': {'type': ['expense']}},
+])
+def test_invalid_input_is_rejected(client, body):
+    response = client.post('/api/transactions/bulk', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,46 @@
+from datetime import date
+
+from src.models.transaction import Transaction
+from src.models.user import db
+from src.services import categorizer as categorizer_module
+from src.services.categorizer import categorizer
+from src.services.sync import record_changes
+
+
+def suggestion(client, description):
+    response = client.get('/api/categories/suggest', query_string={'description': description})
+    return response.get_json()['suggestion']
+
+
+def test_writes_from_another_process_rebuild_the_index(app, client, create_transaction):
+    create_transaction(10, date.today().isoformat(), description='Supermercado Extra')
+    assert suggestion(client, 'Netflix') is None
+
+    # Escrita sem learn(), como a de outro processo: a versão de sincronização muda
+    with app.app_context():
+        transaction = Transaction(
+            user_id=client.user.id, category_id=client.user.income_id, account_id=client.user.account_id,
+            description='Netflix.com', amount=1000, transaction_date=date.today(), payment_type='pix', type='income'
+        )
+        db.session.add(transaction)
+        db.session.flush()
+        record_changes(client.user.id, transaction=[transaction.id])
+        db.session.commit()
+
+    assert suggestion(client, 'Netflix')['category_id'] == client.user.income_id
+
+
+def test_own_writes_update_the_index_without_retraining(client, create_transaction, monkeypatch):
+    create_transaction(10, date.today().isoformat(), description='Supermercado Extra')
+    assert suggestion(client, 'Uber') is None
+
+    def no_training(user_id):
+        raise AssertionError('índice remontado')
+
+    monkeypatch.setattr(categorizer_module, '_training_rows', no_training)
+    response = create_transaction(10, date.today().isoformat(), description='Uber Trip')
+    assert suggestion(client, 'Uber')['category_id'] == client.user.expense_id
+
+    client.delete(f"/api/transactions/{response.get_json()['transaction']['id']}")
+    assert suggestion(client, 'Uber') is None
+    assert client.user.id in categorizer._entries
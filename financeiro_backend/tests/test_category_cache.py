@@ -0,0 +1,36 @@
+from src.models.category import Category
+from src.models.user import db
+from src.services.category_cache import category_cache
+
+
+def test_changes_from_another_process_are_seen(app, client):
+    user_id = client.user.id
+    with app.app_context():
+        assert category_cache.get(user_id, client.user.expense_id).name == 'Mercado'
+
+        # Escritas sem invalidate(), como as de outro processo
+        db.session.get(Category, client.user.expense_id).name = 'Feira'
+        db.session.commit()
+        assert category_cache.get(user_id, client.user.expense_id).name == 'Feira'
+
+        db.session.delete(db.session.get(Category, client.user.income_id))
+        db.session.commit()
+        assert category_cache.get(user_id, client.user.income_id) is None
+        assert category_cache.ids_by_type(user_id, 'income') == []
+
+        category = Category(user_id=user_id, name='Bônus', type='income')
+        db.session.add(category)
+        db.session.commit()
+        assert category_cache.find(user_id, 'Bônus', 'income') == category.id
+
+
+def test_version_is_checked_once_per_request(app, client):
+    with app.test_request_context():
+        category_cache.get(client.user.id, client.user.expense_id)
+        db.session.get(Category, client.user.expense_id).name = 'Feira'
+        db.session.commit()
+        # Mapas já conferidos nesta requisição
+        assert category_cache.get(client.user.id, client.user.expense_id).name == 'Mercado'
+
+    with app.test_request_context():
+        assert category_cache.get(client.user.id, client.user.expense_id).name == 'Feira'
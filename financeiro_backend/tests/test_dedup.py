@@ -0,0 +1,82 @@
+from datetime import date
+
+from sqlalchemy import update
+
+from src.migrations import backfill_dedup_hashes
+from src.models.user import db
+from src.models.transaction import Transaction, transaction_fingerprint
+from src.services.archive import archive_transactions
+
+
+def clear_hashes(user_id):
+    db.session.execute(update(Transaction).where(Transaction.user_id == user_id).values(dedup_hash=None))
+    db.session.commit()
+
+
+def stored_hash(transaction_id):
+    db.session.expire_all()
+    return db.session.get(Transaction, transaction_id).dedup_hash
+
+
+def test_backfill_hashes_plan_total(app, client, create_transaction):
+    purchase_date = date(2026, 3, 15)
+    response = create_transaction('100.00', purchase_date.isoformat(), description='TV',
+                                  payment_type='credit_card', installments=3)
+    transaction_id = response.get_json()['transaction']['id']
+
+    with app.app_context():
+        original = stored_hash(transaction_id)
+        clear_hashes(client.user.id)
+        backfill_dedup_hashes()
+        db.session.commit()
+        assert stored_hash(transaction_id) == original == transaction_fingerprint(
+            purchase_date, 10000, 'TV', None, client.user.credit_card_id
+        )
+
+
+def test_backfill_hashes_legacy_child_rows(app, client, create_transaction):
+    purchase_date = date(2025, 5, 20)
+    with app.app_context():
+        fields = dict(user_id=client.user.id, category_id=client.user.expense_id,
+                      credit_card_id=client.user.credit_card_id, description='Geladeira',
+                      payment_type='credit_card', type='expense', installments=3)
+        parent = Transaction(amount=3334, transaction_date=purchase_date, installment_number=1, **fields)
+        db.session.add(parent)
+        db.session.flush()
+        for number in [2, 3]:
+            db.session.add(Transaction(amount=3333, transaction_date=purchase_date, installment_number=number,
+                                       parent_transaction_id=parent.id, **fields))
+        db.session.commit()
+        parent_id = parent.id
+
+        clear_hashes(client.user.id)
+        backfill_dedup_hashes()
+        db.session.commit()
+        assert stored_hash(parent_id) == transaction_fingerprint(
+            purchase_date, 10000, 'Geladeira', None, client.user.credit_card_id
+        )
+
+    # Reimportar a mesma compra (valor total) é detectado como duplicata
+    response = create_transaction('100.00', purchase_date.isoformat(), description='Geladeira',
+                                  payment_type='credit_card', installments=3, on_duplicate='reject')
+    assert response.status_code == 409
+    assert response.get_json()['transaction_id'] == parent_id
+
+
+def test_duplicate_of_archived_transaction(app, client, create_transaction):
+    purchase_date = date(2020, 1, 10)
+    body = dict(description='Notebook', payment_type='credit_card', installments=3)
+    assert create_transaction(300, purchase_date.isoformat(), **body).status_code == 201
+    with app.app_context():
+        assert archive_transactions()['transactions_archived'] >= 1
+
+    response = create_transaction(300, purchase_date.isoformat(), on_duplicate='reject', **body)
+    assert response.status_code == 409
+
+    response = create_transaction(300, purchase_date.isoformat(), on_duplicate='skip', **body)
+    assert response.status_code == 200
+    assert response.get_json()['duplicate'] is True
+    assert response.get_json()['transaction']['archived'] is True
+
+    # Outro valor não é duplicata
+    assert create_transaction(301, purchase_date.isoformat(), on_duplicate='reject', **body).status_code == 201
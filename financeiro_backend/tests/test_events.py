@@ -0,0 +1,34 @@
+from src.services.events import EventBroker
+
+
+def test_idle_users_are_evicted():
+    broker = EventBroker(history_ttl=0)
+    for _ in range(3):
+        broker.publish(1, 'transaction.created', {})
+    subscription, _ = broker.subscribe(2)
+    broker.publish(2, 'transaction.created', {})
+
+    broker._next_eviction = 0
+    broker.publish(3, 'transaction.created', {})
+    # O usuário 2 ainda tem assinante; o 3 acabou de publicar
+    assert set(broker._history) == set(broker._sequences) == {2, 3}
+
+    subscription.close()
+    broker._next_eviction = 0
+    broker.publish(3, 'transaction.created', {})
+    assert set(broker._history) == {3}
+
+
+def test_client_of_evicted_user_gets_resync():
+    broker = EventBroker(history_ttl=0)
+    for _ in range(3):
+        broker.publish(1, 'transaction.created', {})
+    broker._next_eviction = 0
+    broker.publish(2, 'transaction.created', {})
+    assert 1 not in broker._sequences
+
+    # Sequência recriada acima das descartadas: o id antigo não parece atual
+    event = broker.publish(1, 'transaction.created', {})
+    assert event['id'] > 3
+    _, missed = broker.subscribe(1, last_event_id=2)
+    assert [item['event'] for item in missed] == ['resync']
@@ -0,0 +1,47 @@
+from datetime import date
+
+import pytest
+
+from src.models.money import to_cents, from_cents
+
+
+@pytest.mark.parametrize('value, cents', [
+    (12.34, 1234),
+    ('12.34', 1234),
+    (0.1, 10),
+    ('0.005', 1),
+    (-7.775, -778),
+    (100, 10000),
+])
+def test_to_cents(value, cents):
+    assert to_cents(value) == cents
+
+
+def test_from_cents():
+    assert from_cents(1234) == 12.34
+    assert from_cents(0) == 0.0
+    assert from_cents(None) == 0.0
+
+
+def test_invalid_amount_is_rejected(create_transaction):
+    response = create_transaction('abc', date.today().isoformat(), payment_type='pix')
+    assert response.status_code == 400
+
+
+def test_balances_are_exact(client, create_transaction):
+    for amount in [0.1, 0.2, 0.3]:
+        response = create_transaction(amount, date.today().isoformat(), payment_type='pix',
+                                      category_id=client.user.income_id)
+        assert response.status_code == 201
+
+    accounts = client.get('/api/accounts').get_json()['accounts']
+    assert [account['balance'] for account in accounts] == [0.6]
+
+
+def test_installments_sum_to_total(create_transaction):
+    response = create_transaction('100.00', date.today().isoformat(), payment_type='credit_card', installments=3)
+    assert response.status_code == 201
+
+    amounts = [item['amount'] for item in response.get_json()['installments_created']]
+    assert len(amounts) == 3
+    assert sum(to_cents(amount) for amount in amounts) == 10000
@@ -0,0 +1,36 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+
+def projections(client, months=4):
+    response = client.get('/api/projections', query_string={'months': months, 'average_months': 1})
+    assert response.status_code == 200
+    return response.get_json()['projections']
+
+
+def test_future_debit_is_counted_once(client, create_transaction):
+    today = date.today()
+    create_transaction(1000, today.isoformat(), payment_type='pix', category_id=client.user.income_id)
+    response = create_transaction(300, (today + relativedelta(months=2)).isoformat())
+    assert response.status_code == 201
+
+    # O saldo da conta já desconta o débito agendado
+    accounts = client.get('/api/accounts').get_json()['accounts']
+    assert [account['balance'] for account in accounts] == [700.0]
+
+    months = projections(client)
+    assert months[0]['opening_balance'] == 1000.0
+    assert months[0]['projected_balance'] == 1000.0
+    assert months[1]['expenses'] == 300.0
+    assert [month['projected_balance'] for month in months[1:]] == [700.0, 700.0, 700.0]
+
+
+def test_future_income_is_counted_once(client, create_transaction):
+    future = date.today() + relativedelta(months=1)
+    create_transaction(500, future.isoformat(), payment_type='pix', category_id=client.user.income_id)
+
+    months = projections(client, months=2)
+    assert months[0]['opening_balance'] == 0.0
+    assert months[0]['income'] == 500.0
+    assert [month['projected_balance'] for month in months] == [500.0, 500.0]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from src.models.session import UserSession
+from src.models.user import db
+from src.services.sessions import SessionStore, purge_expired_sessions
+
+
+def test_session_survives_a_new_store(app, client):
+    # Outro processo (ou o mesmo depois de reiniciar) lê a sessão do banco
+    original = app.session_interface
+    SessionStore().init_app(app)
+    try:
+        assert client.get('/api/auth/check').status_code == 200
+    finally:
+        app.session_interface = original
+
+
+def test_expired_session_is_rejected_and_purged(app, client):
+    with app.app_context():
+        db.session.execute(
+            update(UserSession).where(UserSession.user_id == client.user.id)
+            .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        db.session.commit()
+    assert client.get('/api/auth/check').status_code == 401
+
+    with app.app_context():
+        assert purge_expired_sessions() >= 1
+        assert UserSession.query.filter_by(user_id=client.user.id).count() == 0
+
+
+def test_logout_deletes_session(app, client):
+    with app.app_context():
+        assert UserSession.query.filter_by(user_id=client.user.id).count() == 1
+    client.post('/api/auth/logout')
+    with app.app_context():
+        assert UserSession.query.filter_by(user_id=client.user.id).count() == 0
+    assert client.get('/api/auth/check').status_code == 401
@@ -0,0 +1,56 @@
+from datetime import date, datetime, timedelta
+
+from src.services.sync import purge_tombstones
+
+
+def sync(client, since):
+    response = client.get('/api/sync', query_string={'since': since})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_invalid_since(client):
+    assert client.get('/api/sync?since=x').status_code == 400
+    assert client.get('/api/sync?since=-1').status_code == 400
+
+
+def test_deletes_are_sent_as_tombstones(client, create_transaction):
+    create_transaction(10, date.today().isoformat())
+    version = sync(client, 0)['version']
+
+    response = create_transaction(300, date.today().isoformat(), payment_type='credit_card', installments=3)
+    transaction_id = response.get_json()['transaction']['id']
+    changes = sync(client, version)
+    assert not changes['full']
+    # Parcelas geradas pelo plano vão junto, com os ids virtuais
+    assert [item['id'] for item in changes['changes']['transactions']] == [
+        transaction_id, f'{transaction_id}:2', f'{transaction_id}:3'
+    ]
+    version = changes['version']
+
+    client.delete(f'/api/transactions/{transaction_id}')
+    changes = sync(client, version)
+    assert changes['deleted']['transactions'] == [transaction_id]
+    assert changes['changes']['transactions'] == []
+    assert [card['id'] for card in changes['changes']['credit_cards']] == [client.user.credit_card_id]
+
+    # Nada mudou desde a última versão
+    changes = sync(client, changes['version'])
+    assert not changes['full']
+    assert all(not items for items in changes['changes'].values())
+
+
+def test_purged_tombstones_force_full_sync(app, client, create_transaction):
+    response = create_transaction(10, date.today().isoformat())
+    transaction_id = response.get_json()['transaction']['id']
+    version = sync(client, 0)['version']
+    client.delete(f'/api/transactions/{transaction_id}')
+
+    with app.app_context():
+        purge_tombstones(0, now=datetime.utcnow() + timedelta(seconds=5))
+
+    # Quem sincronizou antes da limpeza não veria a exclusão: recebe a carga completa
+    changes = sync(client, version)
+    assert changes['full']
+    assert transaction_id not in [item['id'] for item in changes['changes']['transactions']]
+    assert not sync(client, changes['version'])['full']
@@ -0,0 +1,74 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from src.services.archive import archive_transactions
+
+
+def walk(client, limit, **filters):
+    """Ids de todas as páginas percorridas por cursor"""
+    ids = []
+    cursor = ''
+    while True:
+        response = client.get('/api/transactions', query_string={'limit': limit, 'cursor': cursor, **filters})
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page['transactions']) <= limit
+        ids += [transaction['id'] for transaction in page['transactions']]
+        if not page['has_more']:
+            assert page['next_cursor'] is None
+            return ids
+        cursor = page['next_cursor']
+
+
+def listing(client, **filters):
+    response = client.get('/api/transactions', query_string={'limit': 100, **filters})
+    return [transaction['id'] for transaction in response.get_json()['transactions']]
+
+
+def create_history(create_transaction):
+    today = date.today()
+    for months_ago in range(6):
+        day = (today - relativedelta(months=months_ago)).isoformat()
+        create_transaction(10 + months_ago, day)
+        create_transaction(20 + months_ago, day)
+    create_transaction(300, (today - relativedelta(months=2)).isoformat(), payment_type='credit_card', installments=4)
+
+
+def test_cursor_pages_match_offset_listing(client, create_transaction):
+    create_history(create_transaction)
+    expected = listing(client)
+    assert len(expected) == 16
+
+    for limit in [1, 3, 5]:
+        assert walk(client, limit) == expected
+
+
+def test_cursor_pages_with_date_filter(client, create_transaction):
+    create_history(create_transaction)
+    start = (date.today() - relativedelta(months=3)).isoformat()
+    end = (date.today() - relativedelta(months=1)).isoformat()
+
+    expected = listing(client, start_date=start, end_date=end)
+    assert walk(client, 2, start_date=start, end_date=end) == expected
+    # Parcelas virtuais do parcelamento dentro do período
+    assert any(isinstance(transaction_id, str) for transaction_id in expected)
+
+
+def test_cursor_pages_include_archive(app, client, create_transaction):
+    old = date.today() - relativedelta(years=3)
+    create_transaction(50, old.isoformat(), payment_type='credit_card', installments=3)
+    create_transaction(70, old.isoformat())
+    create_history(create_transaction)
+    with app.app_context():
+        archive_transactions()
+
+    expected = listing(client)
+    assert len(expected) == 20
+    assert walk(client, 3) == expected
+
+
+def test_invalid_cursor(client):
+    response = client.get('/api/transactions', query_string={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Cursor inválido'}
@@ -4,6 +4,7 @@ import { BalanceCard } from './BalanceCard';
 import { CreditCardCard } from './CreditCardCard';
 import { ProjectionTimeline } from './ProjectionTimeline';
 import { RecentTransactions } from './RecentTransactions';
+import { TransactionList } from '../transactions/TransactionList';
 import MonthlyChart from './MonthlyChart';
 import SettingsModal from '../settings/SettingsModal';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
@@ -172,6 +173,9 @@ export const Dashboard = ({ onNewTransaction }) => {
         transactions={dashboardData?.recent_transactions || []}
       />
 
+      {/* Histórico completo (lista virtualizada, paginada por cursor) */}
+      <TransactionList />
+
       {/* Modal de Configurações */}
       <SettingsModal
         isOpen={showSettings}
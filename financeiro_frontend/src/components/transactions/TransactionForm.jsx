@@ -9,10 +9,16 @@ import { RadioGroup, RadioGroupItem } from '@/components/ui/radio-group';
 import { Alert, AlertDescription } from '@/components/ui/alert';
 import { Loader2 } from 'lucide-react';
 
+const SUGGESTION_DELAY_MS = 300;
+const SUGGESTION_MIN_CONFIDENCE = 0.5;
+
 export const TransactionForm = ({ isOpen, onClose, onSuccess }) => {
-  const { accounts, creditCards, categories, createTransaction } = useApp();
+  const { accounts, creditCards, categories, createTransaction, suggestCategory } = useApp();
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  // Categoria preenchida pela sugestão até o usuário escolher uma manualmente
+  const [categoryTouched, setCategoryTouched] = useState(false);
+  const [suggestedCategoryId, setSuggestedCategoryId] = useState('');
   
   const [formData, setFormData] = useState({
     type: 'expense',
@@ -41,9 +47,31 @@ export const TransactionForm = ({ isOpen, onClose, onSuccess }) => {
         installments: 1
       });
       setError('');
+      setCategoryTouched(false);
+      setSuggestedCategoryId('');
     }
   }, [isOpen, accounts, creditCards]);
 
+  // Sugere a categoria enquanto a descrição é digitada (uma consulta por pausa na digitação)
+  useEffect(() => {
+    const description = formData.description.trim();
+    if (!isOpen || categoryTouched || description.length < 3) return;
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      const suggestion = await suggestCategory(description, formData.type);
+      if (cancelled || !suggestion || suggestion.confidence < SUGGESTION_MIN_CONFIDENCE) return;
+      const categoryId = suggestion.category_id.toString();
+      setSuggestedCategoryId(categoryId);
+      setFormData(prev => ({ ...prev, category_id: categoryId }));
+    }, SUGGESTION_DELAY_MS);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [formData.description, formData.type, categoryTouched, isOpen]);
+
   const handleInputChange = (field, value) => {
     setFormData(prev => ({
       ...prev,
@@ -210,7 +238,10 @@ export const TransactionForm = ({ isOpen, onClose, onSuccess }) => {
             <Label>Categoria</Label>
             <Select
               value={formData.category_id}
-              onValueChange={(value) => handleInputChange('category_id', value)}
+              onValueChange={(value) => {
+                setCategoryTouched(true);
+                handleInputChange('category_id', value);
+              }}
             >
               <SelectTrigger>
                 <SelectValue placeholder="Selecione uma categoria" />
@@ -223,6 +254,9 @@ export const TransactionForm = ({ isOpen, onClose, onSuccess }) => {
                 ))}
               </SelectContent>
             </Select>
+            {!categoryTouched && suggestedCategoryId && formData.category_id === suggestedCategoryId && (
+              <p className="text-xs text-muted-foreground mt-1">Sugerida pelo histórico de transações</p>
+            )}
           </div>
 
           {/* Forma de Pagamento */}
@@ -0,0 +1,179 @@
+import { useEffect, useRef, useState } from 'react';
+import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
+import { Button } from '@/components/ui/button';
+import { Skeleton } from '@/components/ui/skeleton';
+import { RefreshCw } from 'lucide-react';
+import { useApp } from '../../contexts/AppContext';
+import { TransactionRow } from './TransactionRow';
+
+// Lista virtualizada: só as linhas visíveis (mais uma margem) ficam no DOM
+const ROW_HEIGHT = 76;
+const VIEWPORT_HEIGHT = 480;
+const OVERSCAN_ROWS = 6;
+// A próxima página é buscada quando faltam estas linhas para o fim do que já foi carregado
+const PREFETCH_ROWS = 40;
+// Páginas com itens mantidas de cada lado da janela visível; as demais guardam só
+// o cursor e a contagem (voltar a elas lê o cache de páginas do AppContext)
+const KEEP_PAGES = 3;
+
+export const TransactionList = ({ filters = {} }) => {
+  const { loadTransactionPage, transactionsVersion, transactionPageSize } = useApp();
+  const emptyPage = (cursor) => ({ cursor, items: null, count: transactionPageSize, nextCursor: null, loaded: false });
+
+  const [pages, setPages] = useState(() => [emptyPage('')]);
+  const [scrollTop, setScrollTop] = useState(0);
+  const [stale, setStale] = useState(false);
+  const [error, setError] = useState(null);
+  const containerRef = useRef(null);
+  const frameRef = useRef(null);
+  const versionRef = useRef(transactionsVersion);
+  const filterKey = JSON.stringify(filters);
+
+  const reset = () => {
+    setPages([emptyPage('')]);
+    setStale(false);
+    setError(null);
+    setScrollTop(0);
+    if (containerRef.current) {
+      containerRef.current.scrollTop = 0;
+    }
+  };
+
+  // Todas as páginas, exceto a última, estão cheias: a linha i está na página i / tamanho
+  const totalRows = pages.reduce((sum, page) => sum + page.count, 0);
+  const start = Math.max(0, Math.floor(scrollTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+  const end = Math.min(totalRows, Math.ceil((scrollTop + VIEWPORT_HEIGHT) / ROW_HEIGHT) + OVERSCAN_ROWS);
+  const firstPage = Math.floor(start / transactionPageSize);
+  const lastPage = Math.floor(Math.max(end - 1, 0) / transactionPageSize);
+
+  useEffect(reset, [filterKey]);
+
+  // Transações criadas ou excluídas: no topo a lista recarrega sozinha; mais
+  // abaixo as linhas mudariam sob o usuário, então só avisa
+  useEffect(() => {
+    if (versionRef.current === transactionsVersion) return;
+    versionRef.current = transactionsVersion;
+    if (firstPage === 0) {
+      reset();
+    } else {
+      setStale(true);
+    }
+  }, [transactionsVersion]);
+
+  // Carrega as páginas sem itens na janela visível (e uma de cada lado)
+  useEffect(() => {
+    let cancelled = false;
+    pages.forEach((page, index) => {
+      if (page.items || index < firstPage - 1 || index > lastPage + 1) return;
+      loadTransactionPage(filters, page.cursor)
+        .then((data) => {
+          if (cancelled) return;
+          setPages((current) => (
+            current[index] && current[index].cursor === page.cursor
+              ? current.map((item, i) => (i === index ? {
+                cursor: item.cursor,
+                items: data.transactions,
+                count: data.transactions.length,
+                nextCursor: data.next_cursor,
+                loaded: true,
+              } : item))
+              : current
+          ));
+        })
+        .catch((err) => {
+          if (!cancelled) setError(err.message);
+        });
+    });
+    // Pedidos repetidos reaproveitam a mesma requisição (deduplicação no AppContext)
+    return () => {
+      cancelled = true;
+    };
+  }, [pages, firstPage, lastPage, filterKey]);
+
+  // Pré-carrega a próxima página antes de o usuário chegar ao fim
+  useEffect(() => {
+    const last = pages[pages.length - 1];
+    if (last.loaded && last.nextCursor && end + PREFETCH_ROWS >= totalRows) {
+      setPages((current) => (
+        current[current.length - 1] === last ? [...current, emptyPage(last.nextCursor)] : current
+      ));
+    }
+  }, [pages, end, totalRows]);
+
+  // Libera os itens das páginas longe da janela visível (memória limitada)
+  useEffect(() => {
+    const far = (index) => index < firstPage - KEEP_PAGES || index > lastPage + KEEP_PAGES;
+    setPages((current) => (
+      current.some((page, index) => page.items && far(index))
+        ? current.map((page, index) => (page.items && far(index) ? { ...page, items: null } : page))
+        : current
+    ));
+  }, [firstPage, lastPage]);
+
+  useEffect(() => () => {
+    if (frameRef.current) cancelAnimationFrame(frameRef.current);
+  }, []);
+
+  // Um setState por quadro, com a posição mais recente
+  const handleScroll = () => {
+    if (frameRef.current) return;
+    frameRef.current = requestAnimationFrame(() => {
+      frameRef.current = null;
+      if (containerRef.current) setScrollTop(containerRef.current.scrollTop);
+    });
+  };
+
+  const rows = [];
+  for (let index = start; index < end; index += 1) {
+    const page = pages[Math.floor(index / transactionPageSize)];
+    const item = page && page.items ? page.items[index % transactionPageSize] : null;
+    rows.push(
+      <div key={item ? item.id : `placeholder-${index}`} className="pb-3" style={{ height: ROW_HEIGHT }}>
+        {item ? <TransactionRow transaction={item} /> : <Skeleton className="h-full w-full rounded-lg" />}
+      </div>
+    );
+  }
+
+  const isEmpty = pages.length === 1 && pages[0].loaded && pages[0].count === 0;
+
+  return (
+    <Card>
+      <CardHeader className="flex flex-row items-center justify-between">
+        <CardTitle>Histórico de Transações</CardTitle>
+        {stale && (
+          <Button variant="outline" size="sm" onClick={reset}>
+            <RefreshCw className="h-4 w-4 mr-2" />
+            Novas transações
+          </Button>
+        )}
+      </CardHeader>
+      <CardContent>
+        {error ? (
+          <div className="text-center py-4 text-muted-foreground">
+            <p>{error}</p>
+            <Button variant="outline" size="sm" className="mt-2" onClick={reset}>
+              Tentar novamente
+            </Button>
+          </div>
+        ) : isEmpty ? (
+          <div className="text-center py-4 text-muted-foreground">
+            <p>Nenhuma transação encontrada</p>
+          </div>
+        ) : (
+          <div
+            ref={containerRef}
+            onScroll={handleScroll}
+            className="overflow-y-auto"
+            style={{ maxHeight: VIEWPORT_HEIGHT }}
+          >
+            <div style={{ height: totalRows * ROW_HEIGHT, position: 'relative' }}>
+              <div style={{ transform: `translateY(${start * ROW_HEIGHT}px)` }}>
+                {rows}
+              </div>
+            </div>
+          </div>
+        )}
+      </CardContent>
+    </Card>
+  );
+};
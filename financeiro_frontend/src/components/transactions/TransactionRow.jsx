@@ -0,0 +1,85 @@
+import { memo } from 'react';
+import { Badge } from '@/components/ui/badge';
+import { ArrowUpRight, ArrowDownRight, CreditCard, Banknote } from 'lucide-react';
+import { format } from 'date-fns';
+import { ptBR } from 'date-fns/locale';
+
+const formatDate = (dateString) => {
+  try {
+    return format(new Date(dateString), 'dd/MM', { locale: ptBR });
+  } catch {
+    return dateString;
+  }
+};
+
+const getPaymentIcon = (paymentType) => {
+  switch (paymentType) {
+    case 'credit_card':
+      return <CreditCard className="h-3 w-3" />;
+    case 'pix':
+    case 'debit':
+      return <Banknote className="h-3 w-3" />;
+    default:
+      return null;
+  }
+};
+
+const getPaymentLabel = (paymentType) => {
+  switch (paymentType) {
+    case 'credit_card':
+      return 'Cartão';
+    case 'pix':
+      return 'PIX';
+    case 'debit':
+      return 'Débito';
+    default:
+      return paymentType;
+  }
+};
+
+// Aceita tanto o resumo do dashboard (date, installment_info) quanto as
+// linhas de /api/transactions (transaction_date, installment_number/installments)
+const installmentInfo = (transaction) => {
+  if (transaction.installment_info) return transaction.installment_info;
+  if (transaction.installments > 1) return `${transaction.installment_number}/${transaction.installments}`;
+  return null;
+};
+
+export const TransactionRow = memo(({ transaction }) => {
+  const isIncome = transaction.type === 'income';
+  const info = installmentInfo(transaction);
+
+  return (
+    <div className="flex items-center justify-between p-3 border rounded-lg">
+      <div className="flex items-center space-x-3 min-w-0">
+        <div className={`p-2 rounded-full ${isIncome ? 'bg-green-100 text-green-600' : 'bg-red-100 text-red-600'}`}>
+          {isIncome ? (
+            <ArrowUpRight className="h-4 w-4" />
+          ) : (
+            <ArrowDownRight className="h-4 w-4" />
+          )}
+        </div>
+
+        <div className="min-w-0">
+          <p className="font-medium truncate">{transaction.description}</p>
+          <div className="flex items-center gap-2 text-sm text-muted-foreground">
+            <span>{formatDate(transaction.date || transaction.transaction_date)}</span>
+            <Badge variant="outline" className="text-xs">
+              {getPaymentIcon(transaction.payment_type)}
+              <span className="ml-1">{getPaymentLabel(transaction.payment_type)}</span>
+            </Badge>
+            {info && (
+              <Badge variant="secondary" className="text-xs">
+                {info}
+              </Badge>
+            )}
+          </div>
+        </div>
+      </div>
+
+      <div className={`text-right font-medium ${isIncome ? 'text-green-600' : 'text-red-600'}`}>
+        {isIncome ? '+' : '-'}R$ {transaction.amount.toLocaleString('pt-BR', { minimumFractionDigits: 2 })}
+      </div>
+    </div>
+  );
+});
@@ -1,8 +1,13 @@
-import { createContext, useContext, useState, useEffect } from 'react';
+import { createContext, useContext, useState, useEffect, useRef } from 'react';
 import { useAuth } from './AuthContext';
 
 const AppContext = createContext();
 
+// Listagem paginada por cursor (/api/transactions?cursor=...): tamanho da
+// página e quantas páginas ficam no cache em memória (as menos usadas saem)
+const TRANSACTION_PAGE_SIZE = 50;
+const MAX_CACHED_PAGES = 40;
+
 export const useApp = () => {
   const context = useContext(AppContext);
   if (!context) {
@@ -19,6 +24,12 @@ export const AppProvider = ({ children }) => {
   const [transactions, setTransactions] = useState([]);
   const [dashboardData, setDashboardData] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [liveUpdates, setLiveUpdates] = useState(false);
+  const [transactionsVersion, setTransactionsVersion] = useState(0);
+  const eventSourceRef = useRef(null);
+  const pageCacheRef = useRef(new Map());
+  const pageRequestsRef = useRef(new Map());
+  const pageGenerationRef = useRef(0);
 
   // Carregar dados quando o usuário estiver autenticado
   useEffect(() => {
@@ -31,9 +42,115 @@ export const AppProvider = ({ children }) => {
       setCategories({ income: [], expense: [] });
       setTransactions([]);
       setDashboardData(null);
+      invalidateTransactionPages();
     }
   }, [isAuthenticated]);
 
+  // Atualizações em tempo real via SSE (/api/events): aplica os deltas
+  // recebidos em vez de recarregar tudo após cada escrita
+  useEffect(() => {
+    if (!isAuthenticated || typeof EventSource === 'undefined') {
+      return undefined;
+    }
+
+    const source = new EventSource('/api/events');
+    eventSourceRef.current = source;
+    const listen = (type, handler) => {
+      source.addEventListener(type, (event) => handler(JSON.parse(event.data)));
+    };
+
+    source.onopen = () => setLiveUpdates(true);
+    source.onerror = () => setLiveUpdates(false);
+
+    listen('transaction.created', (data) => {
+      invalidateTransactionPages();
+      applyBalances(data.balances);
+      applyTransactionTotals(data.transaction.type, data.entries, 1);
+      setDashboardData((current) => current && {
+        ...current,
+        recent_transactions: [data.transaction, ...current.recent_transactions].slice(0, 10),
+      });
+    });
+    listen('transaction.deleted', (data) => {
+      invalidateTransactionPages();
+      applyBalances(data.balances);
+      applyTransactionTotals(data.type, data.entries, -1);
+      setDashboardData((current) => current && {
+        ...current,
+        recent_transactions: current.recent_transactions.filter((t) => t.id !== data.id),
+      });
+    });
+    listen('account.created', () => loadAccounts());
+    listen('account.updated', (data) => applyBalances(data.balances));
+    listen('credit_card.created', () => loadCreditCards());
+    listen('credit_card.updated', () => loadCreditCards());
+    listen('credit_card.deleted', () => Promise.all([loadCreditCards(), loadDashboard()]));
+    // Alterações em lote ou eventos perdidos: recarrega os dados completos
+    listen('transactions.bulk', () => {
+      invalidateTransactionPages();
+      loadInitialData();
+    });
+    listen('resync', () => {
+      invalidateTransactionPages();
+      loadInitialData();
+    });
+
+    return () => {
+      source.close();
+      eventSourceRef.current = null;
+      setLiveUpdates(false);
+    };
+  }, [isAuthenticated]);
+
+  const applyBalances = (balances) => {
+    if (!balances) return;
+    const accountBalances = new Map(balances.accounts.map((a) => [a.id, a.balance]));
+    const cardBalances = new Map(balances.credit_cards.map((c) => [c.id, c.current_balance]));
+
+    if (accountBalances.size > 0) {
+      setAccounts((current) => {
+        const updated = current.map((account) => (
+          accountBalances.has(account.id) ? { ...account, balance: accountBalances.get(account.id) } : account
+        ));
+        setDashboardData((dashboard) => dashboard && {
+          ...dashboard,
+          current_balance: updated.reduce((sum, account) => sum + account.balance, 0),
+        });
+        return updated;
+      });
+    }
+    if (cardBalances.size > 0) {
+      const withBalance = (card) => (
+        cardBalances.has(card.id) ? { ...card, current_balance: cardBalances.get(card.id) } : card
+      );
+      setCreditCards((current) => current.map(withBalance));
+      setDashboardData((dashboard) => dashboard && {
+        ...dashboard,
+        credit_cards: dashboard.credit_cards.map(withBalance),
+      });
+    }
+  };
+
+  const applyTransactionTotals = (type, entries, sign) => {
+    setDashboardData((current) => {
+      if (!current) return current;
+      const { start_date: start, end_date: end } = current.monthly_summary.period;
+      const amount = entries
+        .filter((entry) => entry.date >= start && entry.date <= end)
+        .reduce((sum, entry) => sum + entry.amount, 0) * sign;
+      if (amount === 0) return current;
+
+      const summary = { ...current.monthly_summary };
+      if (type === 'income') {
+        summary.total_income += amount;
+      } else {
+        summary.total_expenses += amount;
+      }
+      summary.net_balance = summary.total_income - summary.total_expenses;
+      return { ...current, monthly_summary: summary };
+    });
+  };
+
   const loadInitialData = async () => {
     setLoading(true);
     try {
@@ -107,6 +224,58 @@ export const AppProvider = ({ children }) => {
     }
   };
 
+  // Páginas já carregadas ficam em cache (LRU) e pedidos iguais em andamento
+  // são compartilhados: rolar para cima e para baixo não repete requisições
+  const loadTransactionPage = (filters = {}, cursor = '') => {
+    const params = new URLSearchParams({ limit: TRANSACTION_PAGE_SIZE, cursor });
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) params.append(key, value);
+    });
+    const key = params.toString();
+
+    const cache = pageCacheRef.current;
+    if (cache.has(key)) {
+      const page = cache.get(key);
+      cache.delete(key);
+      cache.set(key, page);
+      return Promise.resolve(page);
+    }
+
+    const pending = pageRequestsRef.current.get(key);
+    if (pending) return pending;
+
+    const generation = pageGenerationRef.current;
+    const request = fetch(`/api/transactions?${params}`)
+      .then(async (response) => {
+        if (!response.ok) {
+          throw new Error(`Erro ${response.status} ao carregar transações`);
+        }
+        const page = await response.json();
+        // Resposta de antes de uma invalidação não entra no cache
+        if (generation === pageGenerationRef.current) {
+          cache.set(key, page);
+          while (cache.size > MAX_CACHED_PAGES) {
+            cache.delete(cache.keys().next().value);
+          }
+        }
+        return page;
+      })
+      .finally(() => {
+        if (pageRequestsRef.current.get(key) === request) {
+          pageRequestsRef.current.delete(key);
+        }
+      });
+    pageRequestsRef.current.set(key, request);
+    return request;
+  };
+
+  const invalidateTransactionPages = () => {
+    pageGenerationRef.current += 1;
+    pageCacheRef.current.clear();
+    pageRequestsRef.current.clear();
+    setTransactionsVersion((version) => version + 1);
+  };
+
   const loadDashboard = async (filters = {}) => {
     try {
       const params = new URLSearchParams();
@@ -138,12 +307,15 @@ export const AppProvider = ({ children }) => {
       const data = await response.json();
 
       if (data.success) {
-        // Recarregar dados após criar transação
-        await Promise.all([
-          loadAccounts(),
-          loadCreditCards(),
-          loadDashboard(),
-        ]);
+        // Recarregar dados após criar transação (com o SSE conectado, os deltas já chegam pelo stream)
+        if (!liveUpdates) {
+          invalidateTransactionPages();
+          await Promise.all([
+            loadAccounts(),
+            loadCreditCards(),
+            loadDashboard(),
+          ]);
+        }
         return { success: true, data: data.transaction };
       } else {
         return { success: false, message: data.error };
@@ -163,12 +335,15 @@ export const AppProvider = ({ children }) => {
       const data = await response.json();
 
       if (data.success) {
-        // Recarregar dados após excluir transação
-        await Promise.all([
-          loadAccounts(),
-          loadCreditCards(),
-          loadDashboard(),
-        ]);
+        // Recarregar dados após excluir transação (com o SSE conectado, os deltas já chegam pelo stream)
+        if (!liveUpdates) {
+          invalidateTransactionPages();
+          await Promise.all([
+            loadAccounts(),
+            loadCreditCards(),
+            loadDashboard(),
+          ]);
+        }
         return { success: true };
       } else {
         return { success: false, message: data.error };
@@ -252,6 +427,20 @@ export const AppProvider = ({ children }) => {
     }
   };
 
+  // Categoria mais provável para a descrição, aprendida do histórico do usuário
+  const suggestCategory = async (description, type) => {
+    try {
+      const params = new URLSearchParams({ description, type });
+      const response = await fetch(`/api/categories/suggest?${params}`);
+      if (!response.ok) return null;
+      const data = await response.json();
+      return data.suggestion;
+    } catch (error) {
+      console.error('Erro ao sugerir categoria:', error);
+      return null;
+    }
+  };
+
   const value = {
     accounts,
     creditCards,
@@ -259,13 +448,18 @@ export const AppProvider = ({ children }) => {
     transactions,
     dashboardData,
     loading,
+    liveUpdates,
+    transactionsVersion,
+    transactionPageSize: TRANSACTION_PAGE_SIZE,
     loadTransactions,
+    loadTransactionPage,
     loadDashboard,
     createTransaction,
     deleteTransaction,
     updateAccount,
     createCreditCard,
     createCategory,
+    suggestCategory,
     refreshData: loadInitialData,
   };
 